@@ -0,0 +1,117 @@
+import pandas as pd
+import streamlit as st
+from BalanceSheet import BalanceSheet
+
+
+def display_balance_sheet(balance_sheet):
+    st.title("Balance Sheet")
+    
+
+
+    # Display Assets
+    assets_data = {
+        'Categories': ['Cash', 'Accounts Receivable', 'Inventory', 'Other Current Assets', 'Other Asset'],
+        'Amount': [balance_sheet.assets["Cash"], balance_sheet.assets["Accounts Receivable"], balance_sheet.assets["inventory"], balance_sheet.assets["Other Current Assets"], balance_sheet.otherAsset]
+    }
+    assets_df = pd.DataFrame(assets_data, columns=['Categories', 'Amount'])
+    st.subheader("Assets:")
+    st.table(assets_df)
+
+    # Display Net PPE
+    net_ppe_data = {
+        'Categories': ['Gross PP&E', 'Accumulated Depreciation', 'Net PPE'],
+        'Amount': [balance_sheet.gross_ppe, balance_sheet.accumulated_depreciation, balance_sheet.calculate_net_ppe()]
+    }
+    net_ppe_df = pd.DataFrame(net_ppe_data, columns=['Categories', 'Amount'])
+    st.subheader("Net PPE:")
+    st.table(net_ppe_df)
+
+    # Display Total Assets
+    total_assets_data = {
+        'Categories': ['Total Assets'],
+        'Amount': [balance_sheet.calculate_total_assets()]
+    }
+    total_assets_df = pd.DataFrame(total_assets_data, columns=['Categories', 'Amount'])
+    st.subheader("Total Assets:")
+    st.table(total_assets_df)
+
+    # Display Liabilities
+    liabilities_data = {
+        'Categories': list(balance_sheet.liabilities.keys()),
+        'Amount': list(balance_sheet.liabilities.values())
+    }
+    liabilities_df = pd.DataFrame(liabilities_data, columns=['Categories', 'Amount'])
+    st.subheader("Liabilities:")
+    st.table(liabilities_df)
+
+    # Display Equity
+    equity_data = {
+        'Categories': list(balance_sheet.equity.keys()),
+        'Amount': list(balance_sheet.equity.values())
+    }
+    equity_df = pd.DataFrame(equity_data, columns=['Categories', 'Amount'])
+    st.subheader("Equity:")
+    st.table(equity_df)
+
+    # Display Total Liabilities and Equity
+    total_liabilities_and_equity_data = {
+        'Categories': ['Total Liabilities and Equity'],
+        'Amount': [balance_sheet.calculate_total_liabilities_and_equity()]
+    }
+    total_liabilities_and_equity_df = pd.DataFrame(total_liabilities_and_equity_data, columns=['Categories', 'Amount'])
+    st.subheader("Total Liabilities and Equity:")
+    st.table(total_liabilities_and_equity_df)
+
+    # Plot the stacked bar chart
+    st.subheader("Balance Sheet Chart")
+    data = {
+        'Categories': ['Assets', 'Liabilities', 'Shareholders_Equity'],
+        'Amount': [balance_sheet.calculate_total_assets(), balance_sheet.calculate_total_liabilities(), balance_sheet.calculate_total_equity()]
+    }
+    df = pd.DataFrame(data)
+    pivoted_df = df.pivot(columns='Categories', values='Amount')
+    st.bar_chart(pivoted_df)
+
+
+def main():
+    st.set_page_config(page_title="Balance Sheet App", page_icon="💰")
+    
+    
+    # Sidebar for input fields
+    st.sidebar.title("Balance Sheet Inputs")
+
+    assets = {
+        "Cash": st.sidebar.number_input("Cash", value=0.0),
+        "Accounts Receivable": st.sidebar.number_input("Accounts Receivable", value=13.0),
+        "inventory": st.sidebar.number_input("Inventory", value=8.5),
+        "Other Current Assets": st.sidebar.number_input("Other Current Assets", value=1.0),
+    }
+
+    otherAsset_value = st.sidebar.number_input("Other Asset", value=0.0)
+    gross_ppe_value = st.sidebar.number_input("Gross PP&E", value=287.2)
+    accumulated_depreciation_value = st.sidebar.number_input("Accumulated Depreciation", value=30.0)
+    goodwill_value = st.sidebar.number_input("Goodwill", value=5.0)
+
+    liabilities = {
+        "Accounts Payable": st.sidebar.number_input("Accounts Payable", value=9.0),
+        "Accrued Liabilities": st.sidebar.number_input("Accrued Liabilities", value=2.1),
+        "Other Current Liabilities": st.sidebar.number_input("Other Current Liabilities", value=0.0),
+        "Revolving Credit Facility": st.sidebar.number_input("Revolving Credit Facility", value=18.9),
+        "Term Loan": st.sidebar.number_input("Term Loan", value=160.0),
+        "Unsecured Debt": st.sidebar.number_input("Unsecured Debt", value=50.0),
+        "Other Liabilities": st.sidebar.number_input("Other Liabilities", value=2.0),
+    }
+
+    equity = {
+        "Retained Earnings": st.sidebar.number_input("Retained Earnings", value=32.7),
+        "Common Stock": st.sidebar.number_input("Common Stock", value=10.0),
+    }
+
+    # Pass the parameters to create an instance of BalanceSheet
+    balance_sheet = BalanceSheet(assets, otherAsset_value, liabilities, equity, gross_ppe_value, accumulated_depreciation_value, goodwill_value)
+
+    # Display the balance sheet
+    display_balance_sheet(balance_sheet)
+
+if __name__ == "__main__":
+    main()
@@ -1,379 +1,303 @@
-import streamlit as st
+import numpy as np
 import pandas as pd
-
+from Instrumentation import instrument_methods
+from LineItemGraph import LineItemGraph, changed_inputs
+from Periods import ProjectionPeriods, by_year
+from Schema import coerce_assumptions
+
+# Bump whenever the projection changes, so results persisted by
+# Cache.persisted_result under an older version are not reused
+MODEL_VERSION = 1
+
+# Projected balance sheet lines, in the column order of calculate_all_line_items
+LINE_ITEMS = [
+    "Inventory",
+    "Accounts Receivable",
+    "Other Current Assets",
+    "Total Current Assets",
+    "Net PP&E",
+    "Goodwill",
+    "Other Assets",
+    "Total Assets",
+    "Accounts Payable",
+    "Accrued Liabilities",
+    "Other Current Liabilities",
+    "Total Current Liabilities",
+    "Total Liabilities",
+    "Common Stock",
+    "Total Shareholders Equity",
+    "Total Liabilities and Equity",
+]
+
+# Assumption keys the projection reads
+ASSUMPTIONS = [
+    "Days Inventory",
+    "Days Accounts Receivable",
+    "Other Current Assets",
+    "Other Assets",
+    "Days Payable",
+    "Accrued Liabilities as % of COGS",
+    "Other Current Liabilities as % of COGS",
+    "Other Liabilities",
+    "Common Stock",
+]
+
+# Lines that are plain arithmetic of other lines and assumptions, as
+# (formula, operands); Export writes them as live spreadsheet formulas
+FORMULAS = {
+    "Total Current Assets": ("{0}+{1}+{2}", ["Inventory", "Accounts Receivable", "Other Current Assets"]),
+    "Total Assets": ("{0}+{1}+{2}+{3}", ["Total Current Assets", "Net PP&E", "Goodwill", "Other Assets"]),
+    "Total Current Liabilities": (
+        "{0}+{1}+{2}",
+        ["Accounts Payable", "Accrued Liabilities", "Other Current Liabilities"],
+    ),
+    "Total Liabilities": ("{0}+{1}", ["Total Current Liabilities", "Other Liabilities"]),
+    "Total Liabilities and Equity": ("{0}+{1}", ["Total Liabilities", "Total Shareholders Equity"]),
+}
+
+
+@instrument_methods("calculate_")
 class BalanceSheetpro:
-    # ... (your existing BalanceSheet class code)
-    def __init__(self, assumptions, historical_data):
-        self.assumptions = assumptions
+    # Default number of projected periods
+    projection_years = 5
+
+    def __init__(self, assumptions, historical_data, periods=None, frequency="annual", day_count="actual/365"):
+        # Assumptions are coerced to numbers once, so the nodes never coerce
+        self.assumptions = coerce_assumptions(assumptions)
         self.historical_data = historical_data
-        
-    def calculate_inventory(self):
+        self.periods = self.projection_years if periods is None else periods
+        self.period_index = ProjectionPeriods(self.historical_data["Year"].iloc[-1], self.periods, frequency)
+        self.projected_years = self.period_index.labels
+        # Days-based ratios are expressed against this many days per year
+        self.year_days = self.period_index.year_days(day_count)
+        self.graph = self.build_graph()
+        self._projection = None
+
+    def build_graph(self):
+        # Each line item is a node listing the line items it is built from, so
+        # totals share the already computed children instead of rebuilding them
+        graph = LineItemGraph("BalanceSheetpro")
+        graph.add(
+            "Inventory",
+            self._inventory,
+            assumptions=["Days Inventory"],
+            columns=["Cost of Goods Sold (COGS)"],
+        )
+        graph.add(
+            "Accounts Receivable",
+            self._accounts_receivable,
+            assumptions=["Days Accounts Receivable"],
+            columns=["Revenue"],
+        )
+        graph.add("Other Current Assets", self._other_current_assets, assumptions=["Other Current Assets"])
+        graph.add(
+            "Total Current Assets",
+            self._total_current_assets,
+            ["Inventory", "Accounts Receivable", "Other Current Assets"],
+        )
+        graph.add("Net PP&E", self._net_ppe, columns=["Gross PP&E", "Accumulated Depreciation"])
+        graph.add("Goodwill", self._goodwill, columns=["Goodwill"])
+        graph.add("Other Assets", self._other_assets, assumptions=["Other Assets"])
+        graph.add(
+            "Total Assets",
+            self._total_assets,
+            ["Total Current Assets", "Net PP&E", "Goodwill", "Other Assets"],
+        )
+        graph.add(
+            "Accounts Payable",
+            self._accounts_payable,
+            assumptions=["Days Payable"],
+            columns=["Cost of Goods Sold (COGS)"],
+        )
+        graph.add(
+            "Accrued Liabilities",
+            self._accrued_liabilities,
+            assumptions=["Accrued Liabilities as % of COGS"],
+            columns=["Cost of Goods Sold (COGS)"],
+        )
+        graph.add(
+            "Other Current Liabilities",
+            self._other_current_liabilities,
+            assumptions=["Other Current Liabilities as % of COGS"],
+            columns=["Cost of Goods Sold (COGS)"],
+        )
+        graph.add(
+            "Total Current Liabilities",
+            self._sum,
+            ["Accounts Payable", "Accrued Liabilities", "Other Current Liabilities"],
+        )
+        graph.add(
+            "Total Liabilities",
+            self._total_liabilities,
+            ["Total Current Liabilities"],
+            assumptions=["Other Liabilities"],
+        )
+        graph.add("Common Stock", self._common_stock, assumptions=["Common Stock"])
+        graph.add(
+            "Total Shareholders Equity",
+            self._total_shareholders_equity,
+            ["Common Stock"],
+            columns=["Retained Earnings"],
+        )
+        graph.add(
+            "Total Liabilities and Equity",
+            self._sum,
+            ["Total Liabilities", "Total Shareholders Equity"],
+        )
+        return graph
+
+    def _historical(self, column):
+        # Historical values lined up with the projected periods
+        return by_year(self.historical_data[column], self.period_index)
+
+    def _repeat(self, value):
+        # Scalars repeat across the projected periods; arrays of shape (N, 1)
+        # broadcast to N x periods so a batch of assumption values can be evaluated
+        if np.ndim(value) == 0:
+            return [value] * self.periods
+        return np.broadcast_to(value, np.shape(value)[:-1] + (self.periods,))
+
+    @staticmethod
+    def _sum(*line_items):
+        return sum(line_items[1:], line_items[0])
+
+    # Line item nodes
+    def _inventory(self):
         # Calculate inventory based on the days inventory assumption
         days_inventory = self.assumptions["Days Inventory"]
-        projected_inventory = [
-            (self.historical_data["Cost of Goods Sold (COGS)"].iloc[i] / 365)
-            * days_inventory
-            for i in range(5)
-        ]
-
-        return pd.DataFrame(
-            {
-                "Year": self.historical_data["Year"].iloc[-1]
-                + [i for i in range(1, 6)],
-                "Inventory": projected_inventory,
-            }
-        )
-        
-    def calculate_accounts_receivable(self):
+        return (self._historical("Cost of Goods Sold (COGS)") / self.year_days) * days_inventory
+
+    def _accounts_receivable(self):
         days_accounts_receivable = self.assumptions["Days Accounts Receivable"]
-        projected_accounts_receivable = [
-            (self.historical_data["Revenue"].iloc[i] / 365) * days_accounts_receivable
-            for i in range(5)
-        ]
-
-        return pd.DataFrame(
-            {
-                "Year": self.historical_data["Year"].iloc[-1]
-                + [i for i in range(1, 6)],
-                "Accounts Receivable": projected_accounts_receivable,
-            }
+        return (self._historical("Revenue") / self.year_days) * days_accounts_receivable
+
+    def _other_current_assets(self):
+        # Use 0 as a default value when the key is not present
+        return self._repeat(self.assumptions.get("Other Current Assets", 0))
+
+    def _total_current_assets(self, inventory, accounts_receivable, other_current_assets):
+        return inventory + accounts_receivable + other_current_assets
+
+    def _net_ppe(self):
+        return self._historical("Gross PP&E") - self._historical("Accumulated Depreciation")
+
+    def _goodwill(self):
+        return np.full(self.periods, self.historical_data["Goodwill"].iloc[-1])
+
+    def _other_assets(self):
+        return self._repeat(self.assumptions["Other Assets"])
+
+    def _total_assets(self, total_current_assets, net_ppe, goodwill, other_assets):
+        return total_current_assets + net_ppe + goodwill + other_assets
+
+    def _accounts_payable(self):
+        days_payable = self.assumptions["Days Payable"]
+        return (self._historical("Cost of Goods Sold (COGS)") / self.year_days) * days_payable
+
+    def _accrued_liabilities(self):
+        return (
+            self._historical("Cost of Goods Sold (COGS)")
+            * self.assumptions["Accrued Liabilities as % of COGS"]
         )
-        
-    def calculate_other_current_assets(self):
-        # Provide a default value or handle the case when the key is not present
-        other_current_assets = self.assumptions.get("Other Current Assets", 0)  # Use 0 as a default value, you can change it as needed
-        return pd.DataFrame(
-            {
-                "Year": self.historical_data["Year"].iloc[-1] + [i for i in range(1, 6)],
-                "Other Current Assets": [other_current_assets] * 5,
-            }
+
+    def _other_current_liabilities(self):
+        return (
+            self._historical("Cost of Goods Sold (COGS)")
+            * self.assumptions["Other Current Liabilities as % of COGS"]
         )
 
+    def _total_liabilities(self, total_current_liabilities):
+        return total_current_liabilities + self.assumptions["Other Liabilities"]
 
+    def _common_stock(self):
+        return np.asarray(self._repeat(self.assumptions["Common Stock"]))
 
+    def _total_shareholders_equity(self, common_stock):
+        return common_stock + self._historical("Retained Earnings")
+
+    def update(self, assumptions=None, historical_data=None):
+        # Switch to new inputs, dropping only the nodes that read what changed;
+        # returns the invalidated nodes
+        assumptions = self.assumptions if assumptions is None else coerce_assumptions(assumptions)
+        historical_data = self.historical_data if historical_data is None else historical_data
+        keys, columns = changed_inputs(self.assumptions, assumptions, self.historical_data, historical_data)
+        self.assumptions = assumptions
+        self.historical_data = historical_data
+        self._projection = None
+        if "Year" in columns:
+            # A different history moves the projected periods themselves
+            self.period_index = ProjectionPeriods(historical_data["Year"].iloc[-1], self.periods, self.period_index.frequency)
+            self.projected_years = self.period_index.labels
+            self.graph.reset()
+            return list(self.graph.nodes)
+        return self.graph.inputs_changed(keys, columns)
+
+    # Public line item accessors
+    def line_item(self, name):
+        return pd.DataFrame({self.period_index.label: self.projected_years, name: self.graph.evaluate(name)})
+
+    def calculate_inventory(self):
+        return self.line_item("Inventory")
+
+    def calculate_accounts_receivable(self):
+        return self.line_item("Accounts Receivable")
+
+    def calculate_other_current_assets(self):
+        return self.line_item("Other Current Assets")
 
-        
     def calculate_total_current_assets(self):
-        inventory = self.calculate_inventory()["Inventory"]
-        accounts_receivable = self.calculate_accounts_receivable()["Accounts Receivable"]
-        
-        # Ensure that other_current_assets is a numeric value
-        other_current_assets = self.calculate_other_current_assets()["Other Current Assets"]
-        other_current_assets = pd.to_numeric(other_current_assets, errors='coerce').fillna(0)
-
-        total_current_assets = inventory + accounts_receivable + other_current_assets
-
-        return pd.DataFrame(
-            {
-                "Year": self.historical_data["Year"].iloc[-1] + [i for i in range(1, 6)],
-                "Total Current Assets": total_current_assets,
-            }
-        )
+        return self.line_item("Total Current Assets")
 
     def calculate_net_ppe(self):
-        gross_ppe = self.historical_data["Gross PP&E"]
-        accumulated_depreciation = self.historical_data["Accumulated Depreciation"]
-        net_ppe = gross_ppe - accumulated_depreciation
-
-        return pd.DataFrame(
-            {
-                "Year": self.historical_data["Year"].iloc[-1]
-                + [i for i in range(1, 6)],
-                "Net PP&E": net_ppe,
-            }
-        )
-        
+        return self.line_item("Net PP&E")
+
     def calculate_goodwill(self):
-        goodwill = self.historical_data["Goodwill"].iloc[-1]
-        projected_goodwill = [goodwill] * 5
-
-        return pd.DataFrame(
-            {
-                "Year": self.historical_data["Year"].iloc[-1]
-                + [i for i in range(1, 6)],
-                "Goodwill": projected_goodwill,
-            }
-        )
-        
+        return self.line_item("Goodwill")
+
     def calculate_other_assets(self):
-        other_assets = self.assumptions["Other Assets"]
-
-        return pd.DataFrame(
-            {
-                "Year": self.historical_data["Year"].iloc[-1]
-                + [i for i in range(1, 6)],
-                "Other Assets": [other_assets] * 5,
-            }
-        )
+        return self.line_item("Other Assets")
 
     def calculate_total_assets(self):
-        total_current_assets = self.calculate_total_current_assets()["Total Current Assets"]
-        
-        # Ensure that net_ppe, goodwill, and other_assets are numeric
-        net_ppe = pd.to_numeric(self.calculate_net_ppe()["Net PP&E"], errors='coerce').fillna(0)
-        goodwill = pd.to_numeric(self.calculate_goodwill()["Goodwill"], errors='coerce').fillna(0)
-        other_assets = pd.to_numeric(self.calculate_other_assets()["Other Assets"], errors='coerce').fillna(0)
-
-        total_assets = total_current_assets + net_ppe + goodwill + other_assets
-
-        return pd.DataFrame(
-            {
-                "Year": self.historical_data["Year"].iloc[-1] + [i for i in range(1, 6)],
-                "Total Assets": total_assets,
-            }
-        )
-
+        return self.line_item("Total Assets")
 
     def calculate_accounts_payable(self):
-        days_payable = self.assumptions["Days Payable"]
-        projected_accounts_payable = [
-            (self.historical_data["Cost of Goods Sold (COGS)"].iloc[i] / 365)
-            * days_payable
-            for i in range(5)
-        ]
-
-        return pd.DataFrame(
-            {
-                "Year": self.historical_data["Year"].iloc[-1]
-                + [i for i in range(1, 6)],
-                "Accounts Payable": projected_accounts_payable,
-            }
-        )
+        return self.line_item("Accounts Payable")
 
     def calculate_accrued_liabilities(self):
-        accrued_liabilities_as_percentage_of_cogs = self.assumptions[
-            "Accrued Liabilities as % of COGS"
-        ]
-        projected_accrued_liabilities = [
-            self.historical_data["Cost of Goods Sold (COGS)"].iloc[i]
-            * accrued_liabilities_as_percentage_of_cogs
-            for i in range(5)
-        ]
-
-        return pd.DataFrame(
-            {
-                "Year": self.historical_data["Year"].iloc[-1]
-                + [i for i in range(1, 6)],
-                "Accrued Liabilities": projected_accrued_liabilities,
-            }
-        )
+        return self.line_item("Accrued Liabilities")
 
     def calculate_other_current_liabilities(self):
-        other_current_liabilities_as_percentage_of_cogs = self.assumptions[
-            "Other Current Liabilities as % of COGS"
-        ]
-        projected_other_current_liabilities = [
-            self.historical_data["Cost of Goods Sold (COGS)"].iloc[i]
-            * other_current_liabilities_as_percentage_of_cogs
-            for i in range(5)
-        ]
-
-        return pd.DataFrame(
-            {
-                "Year": self.historical_data["Year"].iloc[-1]
-                + [i for i in range(1, 6)],
-                "Other Current Liabilities": projected_other_current_liabilities,
-            }
-        )
+        return self.line_item("Other Current Liabilities")
 
     def calculate_total_current_liabilities(self):
-        accounts_payable = self.calculate_accounts_payable()["Accounts Payable"]
-        accrued_liabilities = self.calculate_accrued_liabilities()[
-            "Accrued Liabilities"
-        ]
-        other_current_liabilities = self.calculate_other_current_liabilities()[
-            "Other Current Liabilities"
-        ]
-
-        total_current_liabilities = (
-            accounts_payable + accrued_liabilities + other_current_liabilities
-        )
-
-        return pd.DataFrame(
-            {
-                "Year": self.historical_data["Year"].iloc[-1]
-                + [i for i in range(1, 6)],
-                "Total Current Liabilities": total_current_liabilities,
-            }
-        )
+        return self.line_item("Total Current Liabilities")
 
     def calculate_total_liabilities(self):
-        total_current_liabilities = self.calculate_total_current_liabilities()[
-            "Total Current Liabilities"
-        ]
-        other_liabilities = self.assumptions["Other Liabilities"]
-
-        total_liabilities = total_current_liabilities + other_liabilities
-
-        return pd.DataFrame(
-            {
-                "Year": self.historical_data["Year"].iloc[-1]
-                + [i for i in range(1, 6)],
-                "Total Liabilities": total_liabilities,
-            }
-        )
+        return self.line_item("Total Liabilities")
 
     def calculate_common_stock(self):
-        common_stock = self.assumptions["Common Stock"]
-        projected_common_stock = [common_stock] * 5
-
-        return pd.DataFrame(
-            {
-                "Year": self.historical_data["Year"].iloc[-1]
-                + [i for i in range(1, 6)],
-                "Common Stock": projected_common_stock,
-            }
-        )
+        return self.line_item("Common Stock")
 
     def calculate_total_shareholders_equity(self):
-        common_stock = self.calculate_common_stock()["Common Stock"]
-        retained_earnings = self.historical_data["Retained Earnings"]
-        total_shareholders_equity = common_stock + retained_earnings
-
-        return pd.DataFrame(
-            {
-                "Year": self.historical_data["Year"].iloc[-1]
-                + [i for i in range(1, 6)],
-                "Total Shareholders Equity": total_shareholders_equity,
-            }
-        )
+        return self.line_item("Total Shareholders Equity")
 
     def calculate_total_liabilities_and_equity(self):
-        total_liabilities = self.calculate_total_liabilities()["Total Liabilities"]
-        total_shareholders_equity = self.calculate_total_shareholders_equity()[
-            "Total Shareholders Equity"
-        ]
-        total_liabilities_and_equity = total_liabilities + total_shareholders_equity
-
-        return pd.DataFrame(
-            {
-                "Year": self.historical_data["Year"].iloc[-1]
-                + [i for i in range(1, 6)],
-                "Total Liabilities and Equity": total_liabilities_and_equity,
-            }
-        )
+        return self.line_item("Total Liabilities and Equity")
 
-    def calculate_all_line_items(self):
-        projected_inventory = self.calculate_inventory()
-        projected_accounts_receivable = self.calculate_accounts_receivable()
-        projected_other_current_assets = self.calculate_other_current_assets()
-        projected_total_current_assets = self.calculate_total_current_assets()
-        projected_net_ppe = self.calculate_net_ppe()
-        projected_goodwill = self.calculate_goodwill()
-        projected_other_assets = self.calculate_other_assets()
-        projected_total_assets = self.calculate_total_assets()
-        projected_accounts_payable = self.calculate_accounts_payable()
-        projected_accrued_liabilities = self.calculate_accrued_liabilities()
-        projected_other_current_liabilities = self.calculate_other_current_liabilities()
-        projected_total_current_liabilities = self.calculate_total_current_liabilities()
-        projected_total_liabilities = self.calculate_total_liabilities()
-        projected_common_stock = self.calculate_common_stock()
-        projected_total_shareholders_equity = self.calculate_total_shareholders_equity()
-        projected_total_liabilities_and_equity = (
-            self.calculate_total_liabilities_and_equity()
-        )
+    def project(self):
+        # Every line as one periods x len(LINE_ITEMS) block
+        if self._projection is None:
+            values = self.graph.evaluate_all()
+            self._projection = np.empty((self.periods, len(LINE_ITEMS)))
+            for position, name in enumerate(LINE_ITEMS):
+                self._projection[:, position] = values[name]
+        return self._projection
 
-        return pd.DataFrame(
-            {
-                "Year": projected_inventory["Year"],
-                "Inventory": projected_inventory["Inventory"],
-                "Accounts Receivable": projected_accounts_receivable[
-                    "Accounts Receivable"
-                ],
-                "Other Current Assets": projected_other_current_assets[
-                    "Other Current Assets"
-                ],
-                "Total Current Assets": projected_total_current_assets[
-                    "Total Current Assets"
-                ],
-                "Net PP&E": projected_net_ppe["Net PP&E"],
-                "Goodwill": projected_goodwill["Goodwill"],
-                "Other Assets": projected_other_assets["Other Assets"],
-                "Total Assets": projected_total_assets["Total Assets"],
-                "Accounts Payable": projected_accounts_payable["Accounts Payable"],
-                "Accrued Liabilities": projected_accrued_liabilities[
-                    "Accrued Liabilities"
-                ],
-                "Other Current Liabilities": projected_other_current_liabilities[
-                    "Other Current Liabilities"
-                ],
-                "Total Current Liabilities": projected_total_current_liabilities[
-                    "Total Current Liabilities"
-                ],
-                "Total Liabilities": projected_total_liabilities["Total Liabilities"],
-                "Common Stock": projected_common_stock["Common Stock"],
-                "Total Shareholders Equity": projected_total_shareholders_equity[
-                    "Total Shareholders Equity"
-                ],
-                "Total Liabilities and Equity": projected_total_liabilities_and_equity[
-                    "Total Liabilities and Equity"
-                ],
-            }
-        )
+    def calculate_all_line_items(self):
+        # Every node is evaluated once; the totals reuse the cached children
+        projected_data = {self.period_index.label: self.projected_years}
+        projected_data.update(self.graph.evaluate_all())
+        return pd.DataFrame(projected_data)
 
-# Function to calculate and display the projected balance sheet
-def calculate_and_display_balance_sheets(assumptions, historical_data):
-    balance_sheets = BalanceSheetpro(assumptions, historical_data)
-    projected_balance_sheet = balance_sheets.calculate_all_line_items()
-    
-    st.subheader("Projected Balance Sheet:")
-    st.write("projected_balance_sheets")
-
-# Streamlit app
-# Streamlit app
-def main():
-    st.title("Projected Balance Sheet Calculator")
-
-    # Input assumptions
-    st.sidebar.header("Assumptions")
-    days_inventory = st.sidebar.slider("Days Inventory", min_value=1, max_value=365, value=30)
-    days_accounts_receivable = st.sidebar.slider("Days Accounts Receivable", min_value=1, max_value=365, value=30)
-    
-    # Use text input for assumptions that are strings
-    other_current_assets = st.sidebar.text_input("Other Current Assets", "Default Value")
-    other_assets = st.sidebar.text_input("Other Assets", "Default Value")
-    days_payable = st.sidebar.slider("Days Payable", min_value=1, max_value=365, value=30)
-    accrued_liabilities_percentage = st.sidebar.slider("Accrued Liabilities as % of COGS", min_value=0.0, max_value=100.0, value=5.0)
-    other_current_liabilities_percentage = st.sidebar.slider("Other Current Liabilities as % of COGS", min_value=0.0, max_value=100.0, value=5.0)
-    other_liabilities = st.sidebar.slider("Other Liabilities", min_value=0.0, max_value=100.0, value=5.0)
-    common_stock = st.sidebar.slider("Common Stock", min_value=0.0, max_value=100.0, value=5.0)
-
-
-
-    assumptions = {
-        "Days Inventory": days_inventory,
-        "Days Accounts Receivable": days_accounts_receivable,
-        "Other Current Assets": other_current_assets,
-        "Other Assets": other_assets,
-        "Days Payable": days_payable,
-        "Accrued Liabilities as % of COGS": accrued_liabilities_percentage, 
-        "Other Current Liabilities as % of COGS": other_current_liabilities_percentage,
-        "Other Liabilities": other_liabilities,
-        "Common Stock": common_stock
-        # Add other assumptions as needed...
-    }
-    
-    
-    #assumptions = {
-        #"Days Inventory": days_inventory,
-        #"Days Accounts Receivable": days_accounts_receivable,
-        #"Other Current Assets": default_value,  # Provide a default value here
-        # Add other assumptions as needed...
-    #}
-
-
-    # Upload historical data (assuming a CSV file for simplicity)
-    uploaded_file = st.file_uploader("Upload Historical Data (CSV)", type=["csv"])
-    if uploaded_file is not None:
-        historical_data = pd.read_csv(uploaded_file)
-        st.subheader("Historical Data:")
-        st.write(historical_data)
-
-        # Calculate and display the projected balance sheet
-        calculate_and_display_balance_sheets(assumptions, historical_data)
-
-if __name__ == "__main__":
-    main()
-
-
-   
\ No newline at end of file
+    def call_count_report(self):
+        return self.graph.call_count_report()
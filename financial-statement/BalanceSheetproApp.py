@@ -0,0 +1,71 @@
+import streamlit as st
+import pandas as pd
+from BalanceSheetpro import BalanceSheetpro
+
+
+# Function to calculate and display the projected balance sheet
+def calculate_and_display_balance_sheets(assumptions, historical_data):
+    balance_sheets = BalanceSheetpro(assumptions, historical_data)
+    projected_balance_sheet = balance_sheets.calculate_all_line_items()
+    
+    st.subheader("Projected Balance Sheet:")
+    st.write("projected_balance_sheets")
+
+# Streamlit app
+# Streamlit app
+def main():
+    st.title("Projected Balance Sheet Calculator")
+
+    # Input assumptions
+    st.sidebar.header("Assumptions")
+    days_inventory = st.sidebar.slider("Days Inventory", min_value=1, max_value=365, value=30)
+    days_accounts_receivable = st.sidebar.slider("Days Accounts Receivable", min_value=1, max_value=365, value=30)
+    
+    # Use text input for assumptions that are strings
+    other_current_assets = st.sidebar.text_input("Other Current Assets", "Default Value")
+    other_assets = st.sidebar.text_input("Other Assets", "Default Value")
+    days_payable = st.sidebar.slider("Days Payable", min_value=1, max_value=365, value=30)
+    accrued_liabilities_percentage = st.sidebar.slider("Accrued Liabilities as % of COGS", min_value=0.0, max_value=100.0, value=5.0)
+    other_current_liabilities_percentage = st.sidebar.slider("Other Current Liabilities as % of COGS", min_value=0.0, max_value=100.0, value=5.0)
+    other_liabilities = st.sidebar.slider("Other Liabilities", min_value=0.0, max_value=100.0, value=5.0)
+    common_stock = st.sidebar.slider("Common Stock", min_value=0.0, max_value=100.0, value=5.0)
+
+
+
+    assumptions = {
+        "Days Inventory": days_inventory,
+        "Days Accounts Receivable": days_accounts_receivable,
+        "Other Current Assets": other_current_assets,
+        "Other Assets": other_assets,
+        "Days Payable": days_payable,
+        "Accrued Liabilities as % of COGS": accrued_liabilities_percentage, 
+        "Other Current Liabilities as % of COGS": other_current_liabilities_percentage,
+        "Other Liabilities": other_liabilities,
+        "Common Stock": common_stock
+        # Add other assumptions as needed...
+    }
+    
+    
+    #assumptions = {
+        #"Days Inventory": days_inventory,
+        #"Days Accounts Receivable": days_accounts_receivable,
+        #"Other Current Assets": default_value,  # Provide a default value here
+        # Add other assumptions as needed...
+    #}
+
+
+    # Upload historical data (assuming a CSV file for simplicity)
+    uploaded_file = st.file_uploader("Upload Historical Data (CSV)", type=["csv"])
+    if uploaded_file is not None:
+        historical_data = pd.read_csv(uploaded_file)
+        st.subheader("Historical Data:")
+        st.write(historical_data)
+
+        # Calculate and display the projected balance sheet
+        calculate_and_display_balance_sheets(assumptions, historical_data)
+
+if __name__ == "__main__":
+    main()
+
+
+   
\ No newline at end of file
@@ -0,0 +1,342 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import numpy as np
+import pandas as pd
+from BalanceSheetpro import BalanceSheetpro
+from DriverEstimation import COLUMNS as ESTIMATION_COLUMNS
+from DriverEstimation import DEFAULT_WINDOW, driver_records, estimate_drivers
+from HistoricalLoader import HistoricalLoader
+from IncomeStatement import IncomeStatement
+from Periods import FREQUENCIES
+from Schema import PROJECTION_COLUMNS, validate
+from Storage import COLUMNAR, FORMATS, read_historical, source_format
+from ThreeStatementModel import DEFAULTS
+
+# Statements projected for every company, in output order
+STATEMENTS = ["Income Statement", "Balance Sheet"]
+
+# What estimated drivers fall back on when the history cannot support one
+# and no assumptions are given for it: the linked model's defaults plus the
+# balance sheet page's Other Liabilities
+FALLBACK_ASSUMPTIONS = {**DEFAULTS, "Other Liabilities": 5.0}
+
+
+def discover(directory):
+    # Every <company>.csv (or .parquet / .arrow) of historical data with its
+    # <company>.json of assumptions
+    companies = []
+    for name in sorted(os.listdir(directory)):
+        stem, extension = os.path.splitext(name)
+        if extension.lower() in FORMATS and not name.startswith("."):
+            companies.append(
+                {
+                    "company": stem,
+                    "historical": os.path.join(directory, name),
+                    "assumptions": os.path.join(directory, stem + ".json"),
+                }
+            )
+    return companies
+
+
+def read_manifest(path):
+    # CSV or JSON list of company / historical / assumptions entries; relative
+    # paths are resolved against the manifest's directory
+    if path.lower().endswith(".json"):
+        with open(path) as f:
+            entries = json.load(f)
+    else:
+        entries = pd.read_csv(path, dtype=str).to_dict("records")
+
+    base = os.path.dirname(os.path.abspath(path))
+    companies = []
+    for entry in entries:
+        missing = [key for key in ["company", "historical", "assumptions"] if key not in entry]
+        if missing:
+            raise KeyError(f"Manifest entry {entry} has no {', '.join(missing)}")
+        companies.append(
+            {
+                "company": entry["company"],
+                "historical": os.path.join(base, entry["historical"]),
+                "assumptions": os.path.join(base, entry["assumptions"]),
+            }
+        )
+    return companies
+
+
+def estimate_dataset(path, window=DEFAULT_WINDOW, chunksize=100_000):
+    # {company: drivers} estimated from the history of every company of one
+    # multi-entity file in a single vectorized pass, reading only the columns
+    # the estimates need
+    loader = HistoricalLoader(path, ESTIMATION_COLUMNS, chunksize=chunksize)
+    entity_column = loader.entity_column if loader.multi_entity else None
+    return driver_records(estimate_drivers(loader.table(), window, entity_column))
+
+
+def stream_dataset(path, assumptions_path=None, chunksize=100_000, estimate=False, window=DEFAULT_WINDOW):
+    # Companies of one multi-entity historical file, streamed lazily with only
+    # the projection columns. The assumptions JSON is either one set shared
+    # by every company or a mapping of company -> assumptions. With
+    # `estimate`, each company's drivers are first estimated from its own
+    # history: they replace the shared assumptions, which then only fill in
+    # what could not be estimated, while per-company assumptions still win.
+    # Drivers that could not be estimated (NaN) are left out of the
+    # estimates, and what neither source supplies comes from
+    # FALLBACK_ASSUMPTIONS.
+    assumptions = {}
+    if assumptions_path is not None:
+        with open(assumptions_path) as f:
+            assumptions = json.load(f)
+    per_company = bool(assumptions) and all(isinstance(value, dict) for value in assumptions.values())
+    estimates = estimate_dataset(path, window, chunksize) if estimate else {}
+    for entity, historical_data in HistoricalLoader(path, PROJECTION_COLUMNS, chunksize=chunksize):
+        estimated = {key: value for key, value in estimates.get(entity, {}).items() if np.isfinite(value)}
+        fallback = FALLBACK_ASSUMPTIONS if estimate else {}
+        if per_company:
+            company_assumptions = {**fallback, **estimated, **assumptions.get(str(entity), {})}
+        else:
+            company_assumptions = {**fallback, **assumptions, **estimated}
+        yield {
+            "company": entity,
+            "historical_data": historical_data,
+            "assumptions": company_assumptions,
+        }
+
+
+def project_company(task):
+    # Runs in a worker process. Any failure is reported in the returned
+    # record instead of raised, so one bad company does not stop the run.
+    company, periods, frequency = task
+    start = time.perf_counter()
+    record = {"company": company["company"]}
+    try:
+        historical_data = company.get("historical_data")
+        if historical_data is None:
+            historical_data = validate(read_historical(company["historical"]))
+        assumptions = company["assumptions"]
+        if not isinstance(assumptions, dict):
+            with open(assumptions) as f:
+                assumptions = json.load(f)
+        record["statements"] = {
+            "Income Statement": IncomeStatement(
+                assumptions, historical_data, periods, frequency
+            ).calculate_all_line_items(),
+            "Balance Sheet": BalanceSheetpro(
+                assumptions, historical_data, periods, frequency
+            ).calculate_all_line_items(),
+        }
+        record["status"] = "ok"
+    except Exception as e:
+        record["status"] = "error"
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["seconds"] = time.perf_counter() - start
+    return record
+
+
+class JsonLinesWriter:
+    # One JSON object per company, failures included
+    def __init__(self, f):
+        self.f = f
+
+    def write(self, record):
+        record = dict(record)
+        statements = record.pop("statements", {})
+        for name, frame in statements.items():
+            record[name] = frame.to_dict("records")
+        self.f.write(json.dumps(record, default=str) + "\n")
+
+    def close(self):
+        self.f.close()
+
+
+class CsvWriter:
+    # Long format, one row per company, statement, period and line item;
+    # failed companies only appear in the log and the summary
+    def __init__(self, f):
+        self.f = f
+        self.writer = csv.writer(f)
+        self.writer.writerow(["Company", "Statement", "Period", "Line Item", "Value"])
+
+    def write(self, record):
+        for statement in STATEMENTS:
+            frame = record.get("statements", {}).get(statement)
+            if frame is None:
+                continue
+            label = frame.columns[0]
+            for column in frame.columns[1:]:
+                for period, value in zip(frame[label], frame[column]):
+                    self.writer.writerow([record["company"], statement, period, column, value])
+
+    def close(self):
+        self.f.close()
+
+
+class ColumnarWriter:
+    # Same long format as CsvWriter in Parquet or Arrow IPC, one record batch
+    # per company; text placeholders are stored as missing values. pyarrow is
+    # only imported when a columnar output is asked for.
+    def __init__(self, f, storage):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.schema = pa.schema(
+            [
+                ("Company", pa.string()),
+                ("Statement", pa.string()),
+                ("Period", pa.string()),
+                ("Line Item", pa.string()),
+                ("Value", pa.float64()),
+            ]
+        )
+        self.f = f
+        if storage == "parquet":
+            self.writer = pq.ParquetWriter(f, self.schema)
+        else:
+            self.writer = pa.ipc.new_file(f, self.schema)
+
+    def write(self, record):
+        columns = {name: [] for name in self.schema.names}
+        for statement in STATEMENTS:
+            frame = record.get("statements", {}).get(statement)
+            if frame is None:
+                continue
+            label = frame.columns[0]
+            for column in frame.columns[1:]:
+                columns["Company"] += [str(record["company"])] * len(frame)
+                columns["Statement"] += [statement] * len(frame)
+                columns["Period"] += frame[label].astype(str).tolist()
+                columns["Line Item"] += [column] * len(frame)
+                columns["Value"] += pd.to_numeric(frame[column], errors="coerce").tolist()
+        if columns["Company"]:
+            self.writer.write_batch(self.pa.record_batch(columns, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+        self.f.close()
+
+
+def open_writer(output):
+    # Writer for the format of `output`; closing the writer closes the file
+    if output.lower().endswith((".jsonl", ".json")):
+        return JsonLinesWriter(open(output, "w"))
+    storage = source_format(output)
+    if storage in COLUMNAR:
+        return ColumnarWriter(open(output, "wb"), storage)
+    return CsvWriter(open(output, "w", newline=""))
+
+
+def summarize(durations, failures, wall_seconds):
+    durations = np.asarray(durations, dtype=float)
+    companies = len(durations)
+    return {
+        "Companies": companies,
+        "Succeeded": companies - failures,
+        "Failed": failures,
+        "Wall Seconds": wall_seconds,
+        "Companies / Second": companies / wall_seconds if wall_seconds > 0 else float("nan"),
+        "Mean Seconds": durations.mean() if companies else float("nan"),
+        "P50 Seconds": np.percentile(durations, 50) if companies else float("nan"),
+        "Max Seconds": durations.max() if companies else float("nan"),
+    }
+
+
+def run(companies, output, periods=5, frequency="annual", workers=None, chunksize=8, log=None):
+    # Project every company on a process pool and write each result to
+    # `output` as soon as it arrives. The pool reads `companies` lazily and at
+    # most a few chunks per worker are in flight, so neither the inputs nor
+    # the results are ever all in memory.
+    in_flight = threading.BoundedSemaphore(4 * (workers or os.cpu_count() or 1) * chunksize)
+
+    def tasks():
+        for company in companies:
+            in_flight.acquire()
+            yield company, periods, frequency
+
+    durations = []
+    failures = 0
+    start = time.perf_counter()
+    writer = open_writer(output)
+    try:
+        with multiprocessing.Pool(workers) as pool:
+            for record in pool.imap_unordered(project_company, tasks(), chunksize):
+                in_flight.release()
+                writer.write(record)
+                durations.append(record["seconds"])
+                if record["status"] != "ok":
+                    failures += 1
+                if log is not None:
+                    log.write(
+                        f"{record['company']}: {record['status']} in {record['seconds']:.3f}s"
+                        + (f" ({record['error']})" if record["status"] != "ok" else "")
+                        + "\n"
+                    )
+    finally:
+        writer.close()
+    return summarize(durations, failures, time.perf_counter() - start)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Project the income statement and balance sheet of many companies."
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        "--directory", help="directory of <company>.csv/.parquet/.arrow historical data and <company>.json assumptions"
+    )
+    source.add_argument("--manifest", help="CSV or JSON manifest with company, historical and assumptions columns")
+    source.add_argument(
+        "--dataset", help="multi-company historical CSV, Parquet or Arrow keyed by Company and Year, wide or long"
+    )
+    parser.add_argument("--assumptions", help="assumptions JSON for --dataset, shared or keyed by company")
+    parser.add_argument("--read-chunksize", type=int, default=100_000, help="rows read at a time from --dataset")
+    parser.add_argument(
+        "--estimate-drivers",
+        action="store_true",
+        help="estimate each --dataset company's drivers from its history; --assumptions (or the model defaults) "
+        "fills in the rest",
+    )
+    parser.add_argument(
+        "--estimation-window", type=int, default=DEFAULT_WINDOW, help="trailing years the drivers are estimated over"
+    )
+    parser.add_argument("--output", required=True, help="output file, .csv / .parquet / .arrow (long format) or .jsonl")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    parser.add_argument("--chunksize", type=int, default=8, help="companies handed to a worker at a time")
+    parser.add_argument("--periods", type=int, default=5, help="projection periods")
+    parser.add_argument("--frequency", choices=list(FREQUENCIES), default="annual")
+    parser.add_argument("--quiet", action="store_true", help="do not log every company")
+    args = parser.parse_args(argv)
+
+    if args.estimate_drivers and not args.dataset:
+        parser.error("--estimate-drivers needs --dataset")
+    if args.dataset:
+        if not args.assumptions and not args.estimate_drivers:
+            parser.error("--dataset needs --assumptions or --estimate-drivers")
+        companies = stream_dataset(
+            args.dataset, args.assumptions, args.read_chunksize, args.estimate_drivers, args.estimation_window
+        )
+    elif args.directory:
+        companies = discover(args.directory)
+    else:
+        companies = read_manifest(args.manifest)
+    summary = run(
+        companies,
+        args.output,
+        args.periods,
+        args.frequency,
+        args.workers,
+        args.chunksize,
+        log=None if args.quiet else sys.stderr,
+    )
+    for key, value in summary.items():
+        print(f"{key}: {value:.4g}" if isinstance(value, float) else f"{key}: {value}")
+    return 1 if summary["Failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,347 @@
+import argparse
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from functools import partial
+import numpy as np
+import pandas as pd
+import BatchRunner
+from BalanceSheet import BalanceSheet
+from BalanceSheetpro import BalanceSheetpro
+from DriverEstimation import estimate_drivers
+from Export import EXPORT_FORMATS, write_scenarios
+from IncomeStatement import LINE_ITEMS, IncomeStatement
+from ScenarioEngine import DRIVERS, ScenarioEngine
+from ScenarioWorkspace import ScenarioWorkspace
+from Schema import PROJECTION_COLUMNS, validate
+from ThreeStatementModel import ThreeStatementModel
+from Valuation import DCFValuation
+
+# Sizes every case is scaled over; --quick drops the largest of each
+HORIZONS = [5, 60, 600]
+SCENARIOS = [1, 100, 10_000, 100_000]
+ENTITIES = [10, 100, 1000]
+
+# Scenarios written by the export cases, once per export format
+EXPORT_SCENARIOS = 10_000
+
+# Saved scenarios compared by the workspace case
+WORKSPACE_SCENARIOS = 50
+
+# Portfolio sizes the drivers are estimated for in one vectorized pass
+PORTFOLIOS = [1000, 10_000, 100_000]
+
+# WACC x terminal growth grid of the valuation case, 1000 cells
+VALUATION_GRID = (np.linspace(0.06, 0.12, 40), np.linspace(0.0, 0.04, 25))
+
+# Assumptions shared by every case, covering the income statement and
+# balance sheet keys
+ASSUMPTIONS = {
+    "Revenue Growth Rate": 0.05,
+    "COGS as % of Revenue": 0.4,
+    "SG&A as % of Sales": 0.2,
+    "LIBOR": 0.01,
+    "Tax Rate": 0.4,
+    "Days Inventory": 30,
+    "Days Accounts Receivable": 30,
+    "Other Current Assets": 1,
+    "Other Assets": 2,
+    "Days Payable": 30,
+    "Accrued Liabilities as % of COGS": 0.05,
+    "Other Current Liabilities as % of COGS": 0.05,
+    "Other Liabilities": 5.0,
+    "Common Stock": 5.0,
+}
+
+# A regression is a case whose fastest time grew by more than this fraction
+DEFAULT_THRESHOLD = 0.10
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+
+def git_revision():
+    # Commit the benchmark ran on, marked "-dirty" with uncommitted changes
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=DIRECTORY, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=DIRECTORY, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return revision + ("-dirty" if dirty else "")
+
+
+def historical_data():
+    return validate(pd.read_csv(os.path.join(DIRECTORY, "historical_data.csv")))
+
+
+def entity_data(base, count, seed=0):
+    # `count` companies shaped like `base`, each scaled by a seeded random
+    # factor so runs are reproducible
+    factors = np.random.default_rng(seed).uniform(0.5, 2.0, count)
+    return [
+        {
+            "company": f"c{position:05d}",
+            "historical_data": base.assign(**{column: base[column] * factor for column in PROJECTION_COLUMNS}),
+            "assumptions": ASSUMPTIONS,
+        }
+        for position, factor in enumerate(factors)
+    ]
+
+
+def portfolio(base, count, seed=0):
+    # The companies of entity_data as one multi-company frame keyed by
+    # "Company", built in one step rather than one frame per company
+    factors = np.repeat(np.random.default_rng(seed).uniform(0.5, 2.0, count), len(base))
+    frame = pd.concat([base] * count, ignore_index=True)
+    frame[PROJECTION_COLUMNS] = frame[PROJECTION_COLUMNS].to_numpy() * factors[:, None]
+    frame.insert(0, "Company", np.repeat([f"c{position:05d}" for position in range(count)], len(base)))
+    return frame
+
+
+def scenario_table(count, seed=0):
+    # `count` scenarios drawn around the shared assumptions
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({driver: ASSUMPTIONS[driver] * rng.uniform(0.8, 1.2, count) for driver in DRIVERS})
+
+
+def income_statement(data, periods):
+    return lambda: IncomeStatement(ASSUMPTIONS, data, periods).calculate_all_line_items()
+
+
+def balance_sheetpro(data, periods):
+    return lambda: BalanceSheetpro(ASSUMPTIONS, data, periods).calculate_all_line_items()
+
+
+def balance_sheet(data):
+    last = data.iloc[-1]
+    return BalanceSheet(
+        {"Cash": last["Cash"], "Accounts Receivable": 13.0, "inventory": 8.5, "Other Current Assets": 1.0},
+        0.0,
+        {"Total Liabilities": last["Total Liabilities"]},
+        {"Retained Earnings": last["Retained Earnings"], "Common Stock": 10.0},
+        last["Gross PP&E"],
+        last["Accumulated Depreciation"],
+        last["Goodwill"],
+    ).calculate_total_assets
+
+
+def scenarios(data, count, periods):
+    engine, table = ScenarioEngine(data, periods), scenario_table(count)
+    return lambda: engine.run(table)
+
+
+def batch(data, count):
+    companies = entity_data(data, count)
+
+    def project():
+        # Projects every company on the process pool into a throwaway CSV
+        with tempfile.TemporaryDirectory() as directory:
+            summary = BatchRunner.run(companies, os.path.join(directory, "projections.csv"))
+        if summary["Failed"]:
+            raise RuntimeError(f"{summary['Failed']} companies failed in the batch benchmark")
+
+    return project
+
+
+def estimated_batch():
+    # The bundled historical data projected from estimated drivers alone, as
+    # `BatchRunner --dataset historical_data.csv --estimate-drivers` does
+    companies = list(BatchRunner.stream_dataset(os.path.join(DIRECTORY, "historical_data.csv"), estimate=True))
+
+    def project():
+        with tempfile.TemporaryDirectory() as directory:
+            summary = BatchRunner.run(companies, os.path.join(directory, "projections.csv"))
+        if summary["Failed"]:
+            raise RuntimeError(f"{summary['Failed']} companies failed in the estimated-drivers benchmark")
+
+    return project
+
+
+def export(data, count, export_format):
+    table = scenario_table(count)
+    return lambda: write_scenarios(table, data, io.BytesIO(), export_format)
+
+
+def drivers(data, count):
+    companies = portfolio(data, count)
+    return lambda: estimate_drivers(companies, entity_column="Company")
+
+
+def valuation(data, count):
+    # Gordon growth grid over `count` projected scenarios
+    dcf = DCFValuation.from_three_statement(ThreeStatementModel(data).run(scenario_table(count)))
+    return partial(dcf.gordon_growth, *VALUATION_GRID)
+
+
+def workspace(data, count, periods):
+    # `count` saved income statements compared against the first
+    saved = ScenarioWorkspace(LINE_ITEMS)
+    for name, row in scenario_table(count).iterrows():
+        assumptions = dict(ASSUMPTIONS, **row)
+        saved.save(f"s{name}", assumptions, IncomeStatement(assumptions, data, periods).calculate_all_line_items(), data)
+    return saved.compare
+
+
+def cases(quick=False):
+    # (name, parameters, setup) for every case. Calling setup builds the
+    # inputs and returns the function that is timed, so input construction
+    # is not measured. Scenario counts are scaled at the default horizon.
+    sizes = {"periods": HORIZONS, "scenarios": SCENARIOS, "entities": ENTITIES, "portfolios": PORTFOLIOS}
+    if quick:
+        sizes = {axis: values[:-1] for axis, values in sizes.items()}
+    data = historical_data()
+    for periods in sizes["periods"]:
+        yield "IncomeStatement.calculate_all_line_items", {"periods": periods}, partial(income_statement, data, periods)
+        yield "BalanceSheetpro.calculate_all_line_items", {"periods": periods}, partial(balance_sheetpro, data, periods)
+    yield "BalanceSheet.calculate_total_assets", {}, partial(balance_sheet, data)
+    for count in sizes["scenarios"]:
+        yield "ScenarioEngine.run", {"scenarios": count, "periods": 5}, partial(scenarios, data, count, 5)
+    for count in sizes["entities"]:
+        yield "BatchRunner.run", {"entities": count}, partial(batch, data, count)
+    for count in sizes["scenarios"][:-1]:
+        cells = VALUATION_GRID[0].size * VALUATION_GRID[1].size
+        yield "DCFValuation.gordon_growth", {"scenarios": count, "cells": cells}, partial(valuation, data, count)
+    yield "BatchRunner.run", {"entities": 1, "drivers": "estimated"}, estimated_batch
+    for count in sizes["portfolios"]:
+        yield "DriverEstimation.estimate_drivers", {"entities": count}, partial(drivers, data, count)
+    for periods in sizes["periods"]:
+        yield (
+            "ScenarioWorkspace.compare",
+            {"scenarios": WORKSPACE_SCENARIOS, "periods": periods},
+            partial(workspace, data, WORKSPACE_SCENARIOS, periods),
+        )
+    for export_format in EXPORT_FORMATS:
+        yield (
+            "Export.write_scenarios",
+            {"scenarios": EXPORT_SCENARIOS, "format": export_format},
+            partial(export, data, EXPORT_SCENARIOS, export_format),
+        )
+
+
+def case_key(name, parameters):
+    return name + "".join(f"[{key}={value}]" for key, value in parameters.items())
+
+
+def time_case(function, repeat, min_seconds=0.2):
+    # Calls per timing grow until one timing takes `min_seconds`, so fast
+    # cases are not dominated by timer resolution
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds or number >= 1_000_000:
+            break
+        number *= 10
+    timings = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        timings.append((time.perf_counter() - start) / number)
+    return {
+        "number": number,
+        "repeat": repeat,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+    }
+
+
+def run(repeat=5, quick=False, only=None, log=None):
+    results = []
+    for name, parameters, setup in cases(quick):
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        result = {"name": name, "parameters": parameters, "key": case_key(name, parameters)}
+        result.update(time_case(setup(), repeat))
+        results.append(result)
+        if log is not None:
+            log.write(f"{result['key']}: {result['min'] * 1e3:.3f} ms (x{result['number']})\n")
+    return {
+        "revision": git_revision(),
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    # One row per case in both runs, by fastest time; cases slower than the
+    # baseline by more than `threshold` are regressions
+    baseline_results = {result["key"]: result for result in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        before = baseline_results.get(result["key"])
+        if before is None:
+            continue
+        ratio = result["min"] / before["min"]
+        rows.append(
+            {
+                "Case": result["key"],
+                "Baseline Seconds": before["min"],
+                "Current Seconds": result["min"],
+                "Ratio": ratio,
+                "Status": "regression" if ratio > 1 + threshold else "improved" if ratio < 1 - threshold else "same",
+            }
+        )
+    return pd.DataFrame(rows, columns=["Case", "Baseline Seconds", "Current Seconds", "Ratio", "Status"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the projection engines and compare runs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="time every case and write the results as JSON")
+    run_parser.add_argument("--output", help="JSON file for the results (default: standard output)")
+    run_parser.add_argument("--repeat", type=int, default=5, help="timings per case; the fastest is compared")
+    run_parser.add_argument("--quick", action="store_true", help="skip the largest horizon, scenario and entity counts")
+    run_parser.add_argument("--only", nargs="*", help="only cases whose name starts with one of these")
+    compare_parser = commands.add_parser("compare", help="flag regressions of a run against a baseline run")
+    compare_parser.add_argument("baseline", help="JSON results of the baseline run")
+    compare_parser.add_argument("current", help="JSON results of the run to check")
+    compare_parser.add_argument(
+        "--threshold", type=float, default=DEFAULT_THRESHOLD, help="slowdown that counts as a regression, e.g. 0.1"
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        report = run(args.repeat, args.quick, args.only, log=sys.stderr)
+        text = json.dumps(report, indent=2)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(text + "\n")
+        else:
+            print(text)
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    table = compare(baseline, current, args.threshold)
+    print(f"Baseline {baseline['revision']}, current {current['revision']}")
+    print(table.to_string(index=False))
+    regressions = int((table["Status"] == "regression").sum())
+    if regressions:
+        print(f"{regressions} case(s) slower than the baseline by more than {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
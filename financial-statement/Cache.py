@@ -0,0 +1,386 @@
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+import Storage
+from Schema import validate
+
+_MISSING = object()
+
+# Directory and size cap of the disk cache shared by every process on the
+# machine; an empty directory turns it off
+DIRECTORY_VARIABLE = "FINANCIAL_STATEMENT_CACHE_DIR"
+MAX_BYTES_VARIABLE = "FINANCIAL_STATEMENT_CACHE_BYTES"
+DEFAULT_DIRECTORY = os.path.join(os.path.expanduser("~"), ".cache", "financial-statement")
+DEFAULT_MAX_BYTES = 256 << 20
+
+
+class LRUCache:
+    # Bounded mapping that evicts the least recently used entry once it holds
+    # `maxsize` entries. One instance is shared by every session the process
+    # serves, so all access goes through a lock; values are computed outside
+    # it and must be treated as read-only by callers.
+    def __init__(self, maxsize=128):
+        if maxsize < 1:
+            raise ValueError("The cache needs room for at least one entry.")
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def invalidate(self, predicate=None):
+        # Drop every entry, or only those whose key satisfies `predicate`;
+        # returns the number of entries dropped
+        with self._lock:
+            keys = [key for key in self.entries if predicate is None or predicate(key)]
+            for key in keys:
+                del self.entries[key]
+            return len(keys)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "Entries": len(self.entries),
+            "Max Entries": self.maxsize,
+            "Hits": self.hits,
+            "Misses": self.misses,
+            "Evictions": self.evictions,
+            "Hit Rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class InputCache:
+    # Parsed input files keyed on the SHA-256 of their content. A file whose
+    # mtime and size are unchanged since the last load is not read again; a
+    # touched file is re-hashed and only re-parsed if its content changed.
+    def __init__(self, maxsize=32):
+        self.files = {}
+        self.parsed = LRUCache(maxsize)
+        self._lock = threading.Lock()
+
+    def digest(self, path):
+        # SHA-256 of the file at the absolute `path`, and its content when it
+        # had to be read (None when the mtime and size are unchanged)
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            known = self.files.get(path)
+        if known is not None and known[0] == signature:
+            return known[1], None
+
+        with open(path, "rb") as f:
+            content = f.read()
+        digest = hashlib.sha256(content).hexdigest()
+        with self._lock:
+            self.files[path] = (signature, digest)
+        return digest, content
+
+    def load(self, path, parser):
+        path = os.path.abspath(path)
+        digest, content = self.digest(path)
+
+        def parse():
+            if content is not None:
+                return parser(content)
+            with open(path, "rb") as f:
+                return parser(f.read())
+
+        return self.parsed.get_or_compute((parser.__name__, digest), parse)
+
+    def load_path(self, path, loader):
+        # For loaders that read the file themselves, e.g. memory-mapped
+        # columnar reads; keyed on the content digest like load() rather than
+        # on the mtime and size alone
+        path = os.path.abspath(path)
+        digest, _ = self.digest(path)
+        return self.parsed.get_or_compute((loader.__name__, digest), lambda: loader(path))
+
+    def load_bytes(self, content, parser):
+        # Content that has no file behind it, e.g. an uploaded file
+        digest = hashlib.sha256(content).hexdigest()
+        return self.parsed.get_or_compute((parser.__name__, digest), lambda: parser(content))
+
+    def invalidate(self, path=None):
+        # Forget one file, or every file and parsed value
+        with self._lock:
+            if path is not None:
+                path = os.path.abspath(path)
+                known = self.files.pop(path, None)
+                return self.parsed.invalidate(lambda key: known is not None and key[1] == known[1])
+            self.files.clear()
+        return self.parsed.invalidate()
+
+    def stats(self):
+        return self.parsed.stats()
+
+
+class DiskCache:
+    # Projected frames on disk, one Arrow IPC file per result named after the
+    # SHA-256 of its key, so every process and restart reuses them. Files are
+    # written to a temporary name and renamed into place, and an entry that
+    # vanishes or is torn while being read counts as a miss, so worker
+    # processes can share the directory without locks. A hit touches the
+    # file's mtime; once the files take more than `max_bytes` the least
+    # recently used are deleted. Hits and misses are counted per process.
+    def __init__(self, directory=DEFAULT_DIRECTORY, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def path(self, key):
+        digest = hashlib.sha256(repr(key).encode()).hexdigest()
+        return os.path.join(self.directory, f"{digest}.arrow")
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, key, default=None):
+        if not self.directory:
+            return default
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+            frame = Storage.frame_from_bytes(content, "arrow")
+        except (OSError, ValueError):
+            # Missing, evicted meanwhile or torn (Arrow errors are ValueErrors):
+            # compute it again
+            self._count("misses")
+            return default
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._count("hits")
+        return frame
+
+    def put(self, key, frame):
+        if not self.directory:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(descriptor, "wb") as f:
+                f.write(Storage.frame_bytes(frame, "arrow"))
+            # Readable by workers running as another user, not just mkstemp's 0600
+            Storage.replace_file(temporary, self.path(key))
+        except OSError:
+            # Read-only or full disk, or a reader holding the file on Windows
+            return
+        self._count("writes")
+        self.evict()
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def _entries(self):
+        # (mtime, size, path) of every entry, oldest first
+        entries = []
+        try:
+            with os.scandir(self.directory) as scan:
+                for entry in scan:
+                    if entry.name.endswith(".arrow"):
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        except OSError:
+            pass
+        return sorted(entries)
+
+    def evict(self):
+        # Delete the least recently used entries until the cap is met; other
+        # processes may delete the same files, which is harmless
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                self._count("evictions")
+            except OSError:
+                pass
+            total -= size
+        self._remove_stale_temporaries()
+
+    def _remove_stale_temporaries(self, age=3600):
+        # Temporary files left by processes killed in the middle of a write
+        try:
+            with os.scandir(self.directory) as scan:
+                for entry in scan:
+                    if entry.name.endswith(".tmp") and entry.stat().st_mtime < time.time() - age:
+                        os.remove(entry.path)
+        except OSError:
+            pass
+
+    def invalidate(self):
+        # Delete every entry; returns the number deleted
+        removed = 0
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        return removed
+
+    def stats(self):
+        entries = self._entries() if self.directory else []
+        lookups = self.hits + self.misses
+        return {
+            "Entries": len(entries),
+            "Hits": self.hits,
+            "Misses": self.misses,
+            "Evictions": self.evictions,
+            "Hit Rate": self.hits / lookups if lookups else 0.0,
+            "Writes": self.writes,
+            "Bytes": sum(size for _, size, _ in entries),
+            "Max Bytes": self.max_bytes,
+        }
+
+
+def parse_csv(content):
+    return pd.read_csv(io.BytesIO(content))
+
+
+def parse_historical_csv(content):
+    return validate(parse_csv(content))
+
+
+def load_historical(path):
+    # CSV files are memory-mapped from an Arrow copy kept with the disk cache
+    return validate(Storage.read_historical(path, sidecar_directory=disk.directory))
+
+
+def parse_json(content):
+    return json.loads(content)
+
+
+def normalize(value):
+    # Hashable, order-independent form of assumptions and options. Numbers
+    # compare by value, so 5 and 5.0 or numpy scalars share a cache entry.
+    if isinstance(value, dict):
+        return tuple(sorted((str(key), normalize(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(normalize(item) for item in value)
+    if isinstance(value, np.ndarray):
+        return ("array", value.dtype.str, value.shape, value.tobytes())
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return float(value)
+    return str(value)
+
+
+def frame_digest(frame):
+    # Content hash of a DataFrame, so results follow the data they came from
+    digest = hashlib.sha256(repr(list(frame.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def result_key(kind, assumptions, historical_data, **options):
+    return (kind, normalize(assumptions), frame_digest(historical_data), normalize(options))
+
+
+# Process-wide caches shared by every session
+inputs = InputCache()
+results = LRUCache(128)
+exports = LRUCache(16)
+disk = DiskCache(
+    os.environ.get(DIRECTORY_VARIABLE, DEFAULT_DIRECTORY),
+    int(os.environ.get(MAX_BYTES_VARIABLE, DEFAULT_MAX_BYTES)),
+)
+
+
+def read_csv(path):
+    # Callers get their own copy; the cached frame stays untouched
+    return inputs.load(path, parse_csv).copy()
+
+
+def read_historical(path):
+    # CSV, Parquet or Arrow; CSV files are memory-mapped from their Arrow copy
+    # in the disk cache after the first read (see Storage.read_historical),
+    # which the cache evicts and clears like its own entries. The validated
+    # frame is read-only, so every caller shares the cached one.
+    return inputs.load_path(path, load_historical)
+
+
+def read_uploaded_csv(uploaded_file):
+    return inputs.load_bytes(uploaded_file.getvalue(), parse_historical_csv)
+
+
+def read_json(path):
+    return inputs.load(path, parse_json)
+
+
+def cached_result(kind, assumptions, historical_data, compute, **options):
+    return results.get_or_compute(result_key(kind, assumptions, historical_data, **options), compute)
+
+
+def persisted_result(kind, version, assumptions, historical_data, compute, **options):
+    # Projected frame kept in memory and on disk. `version` is the model's
+    # MODEL_VERSION, so results of an older projection are never reused.
+    # The frame is shared by every caller and must be treated as read-only.
+    key = (kind, version) + result_key(kind, assumptions, historical_data, **options)[1:]
+    return results.get_or_compute(key, lambda: disk.get_or_compute(key, compute))
+
+
+def cached_export(kind, export_format, frames, compute, **options):
+    # Encoded export keyed on the content of the frames it is made from
+    key = (kind, export_format, tuple(frame_digest(frame) for frame in frames), normalize(options))
+    return exports.get_or_compute(key, compute)
+
+
+def cache_stats():
+    return pd.DataFrame(
+        [inputs.stats(), results.stats(), exports.stats(), disk.stats()], index=["Inputs", "Results", "Exports", "Disk"]
+    )
+
+
+def clear_caches():
+    return inputs.invalidate() + results.invalidate() + exports.invalidate() + disk.invalidate()
@@ -0,0 +1,150 @@
+import numpy as np
+import pandas as pd
+
+# Cash flow lines, in the column order of calculate_all_line_items
+LINE_ITEMS = [
+    "Net Income",
+    "Depreciation and Amortization",
+    "Change in Working Capital",
+    "Change in Other Liabilities",
+    "Cash Flow from Operations",
+    "Capital Expenditures",
+    "Change in Other Assets",
+    "Cash Flow from Investing",
+    "Change in Debt",
+    "Change in Common Stock",
+    "Cash Flow from Financing",
+    "Net Cash Flow",
+    "Beginning Cash Position",
+    "Ending Cash Position",
+]
+
+DEBT = ["Revolving Credit Facility", "Term Loan", "Unsecured Debt"]
+
+# Historical columns the derived cash flow is checked against
+VALIDATED = [
+    "Cash Flow from Operations",
+    "Cash Flow from Investing",
+    "Cash Flow from Financing",
+    "Net Cash Flow",
+    "Ending Cash Position",
+]
+
+
+class CashFlowStatement:
+    # Indirect-method cash flow statement derived from projected income
+    # statement and balance sheet lines. Both statements may be DataFrames or
+    # mappings of line item -> array with periods on the last axis, so a batch
+    # of scenarios is handled the same way as a single projection. Lines a
+    # statement does not carry count as zero; the balance sheet the
+    # projection opens from supplies the first period's changes.
+    def __init__(self, income_statement, balance_sheet, opening_balance_sheet):
+        self.income_statement = income_statement
+        self.balance_sheet = balance_sheet
+        self.opening_balance_sheet = opening_balance_sheet
+        # Projected statements are keyed by "Year", or by "Period" below annual
+        self.label = next((label for label in ["Year", "Period"] if label in income_statement), None)
+        self.years = income_statement[self.label] if self.label is not None else None
+        self._projection = None
+
+    @staticmethod
+    def _line(statement, name):
+        if name not in statement:
+            return 0.0
+        values = np.asarray(statement[name])
+        if values.dtype.kind not in "biuf":
+            # Text placeholders count as zero, as in BalanceSheetpro's totals
+            values = pd.to_numeric(pd.Series(values.ravel()), errors="coerce").fillna(0).to_numpy().reshape(values.shape)
+        return values.astype(float)
+
+    def _opening(self, name):
+        value = self.opening_balance_sheet.get(name, 0.0)
+        return 0.0 if pd.isna(value) else float(value)
+
+    def _change(self, name):
+        # Period-over-period change of a balance, starting from the opening balance
+        levels = self._line(self.balance_sheet, name)
+        if np.ndim(levels) == 0:
+            return 0.0
+        return np.diff(levels, axis=-1, prepend=np.broadcast_to(self._opening(name), levels.shape[:-1] + (1,)))
+
+    def project(self):
+        if self._projection is not None:
+            return self._projection
+
+        income_statement, balance_sheet = self.income_statement, self.balance_sheet
+        net_income = self._line(income_statement, "Net Income")
+        depreciation = self._line(income_statement, "Depreciation")
+        depreciation_and_amortization = depreciation + self._line(income_statement, "Amortization")
+
+        # Working capital excludes cash, which is what this statement explains
+        current_assets = self._line(balance_sheet, "Total Current Assets") - self._line(balance_sheet, "Cash")
+        current_liabilities = self._line(balance_sheet, "Total Current Liabilities")
+        opening_working_capital = (
+            self._opening("Total Current Assets") - self._opening("Cash") - self._opening("Total Current Liabilities")
+        )
+        working_capital = np.asarray(current_assets - current_liabilities, dtype=float)
+        change_in_working_capital = -np.diff(
+            working_capital,
+            axis=-1,
+            prepend=np.broadcast_to(opening_working_capital, working_capital.shape[:-1] + (1,)),
+        )
+        change_in_other_liabilities = self._change("Other Liabilities")
+        cash_flow_from_operations = (
+            net_income + depreciation_and_amortization + change_in_working_capital + change_in_other_liabilities
+        )
+
+        # Capex is the growth in gross PP&E, or in net PP&E before depreciation
+        if "Gross PP&E" in balance_sheet:
+            capital_expenditures = -self._change("Gross PP&E")
+        else:
+            capital_expenditures = -(self._change("Net PP&E") + depreciation)
+        change_in_other_assets = -self._change("Other Assets")
+        cash_flow_from_investing = capital_expenditures + change_in_other_assets
+
+        change_in_debt = sum(self._change(name) for name in DEBT)
+        change_in_common_stock = self._change("Common Stock")
+        cash_flow_from_financing = change_in_debt + change_in_common_stock
+
+        net_cash_flow = cash_flow_from_operations + cash_flow_from_investing + cash_flow_from_financing
+        net_cash_flow = np.broadcast_to(net_cash_flow, np.shape(net_income))
+        ending_cash = self._opening("Cash") + np.cumsum(net_cash_flow, axis=-1)
+        beginning_cash = ending_cash - net_cash_flow
+
+        lines = {
+            "Net Income": net_income,
+            "Depreciation and Amortization": depreciation_and_amortization,
+            "Change in Working Capital": change_in_working_capital,
+            "Change in Other Liabilities": change_in_other_liabilities,
+            "Cash Flow from Operations": cash_flow_from_operations,
+            "Capital Expenditures": capital_expenditures,
+            "Change in Other Assets": change_in_other_assets,
+            "Cash Flow from Investing": cash_flow_from_investing,
+            "Change in Debt": change_in_debt,
+            "Change in Common Stock": change_in_common_stock,
+            "Cash Flow from Financing": cash_flow_from_financing,
+            "Net Cash Flow": net_cash_flow,
+            "Beginning Cash Position": beginning_cash,
+            "Ending Cash Position": ending_cash,
+        }
+        self._projection = {name: np.broadcast_to(lines[name], np.shape(net_income)) for name in LINE_ITEMS}
+        return self._projection
+
+    def calculate_all_line_items(self):
+        projected_data = pd.DataFrame(self.project())
+        if self.years is not None:
+            projected_data.insert(0, self.label, np.asarray(self.years))
+        return projected_data
+
+
+def validate_against_historical(historical_data):
+    # Derive the cash flow statement from the historical income statement and
+    # balance sheet and compare it with the cash flow columns of the file
+    history = historical_data.iloc[1:]
+    derived = CashFlowStatement(history, history, historical_data.iloc[0]).calculate_all_line_items()
+    comparison = pd.DataFrame({"Year": history["Year"].to_numpy()})
+    for name in VALIDATED:
+        comparison[f"{name} (Derived)"] = derived[name].to_numpy()
+        comparison[f"{name} (Reported)"] = history[name].to_numpy()
+        comparison[f"{name} (Difference)"] = derived[name].to_numpy() - history[name].to_numpy()
+    return comparison
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+from Periods import FREQUENCIES
+
+TRANCHES = ["Revolving Credit Facility", "Term Loan", "Unsecured Debt"]
+REVOLVER, TERM_LOAN, UNSECURED_DEBT = range(len(TRANCHES))
+
+FIELDS = ["Beginning Balance", "Scheduled Amortization", "(Paydown) / Drawdown", "Ending Balance", "Interest"]
+
+
+class DebtScheduleResult:
+    def __init__(self, block, cash, periods_per_year):
+        # block is fields x scenarios x periods x tranches
+        self.block = block
+        self.beginning, self.amortization, self.drawdown, self.ending, self.interest = block
+        self.cash = cash
+        self.periods_per_year = periods_per_year
+
+    def total_interest(self):
+        return self.interest.sum(axis=-1)
+
+    def total_debt(self):
+        return self.ending.sum(axis=-1)
+
+    def tranche_frame(self, tranche, scenario=0):
+        # Schedule of one tranche for one scenario
+        position = TRANCHES.index(tranche)
+        schedule = pd.DataFrame(
+            self.block[:, scenario, :, position].T,
+            columns=FIELDS,
+        )
+        schedule.insert(0, "Period", np.arange(1, schedule.shape[0] + 1))
+        return schedule
+
+
+class DebtSchedule:
+    # Debt schedule for the revolver, the term loan and the unsecured debt.
+    # Every run fills one preallocated fields x scenarios x periods x tranches
+    # block, at annual, quarterly or monthly granularity:
+    # - the term loan amortizes straight-line over "Term of Amortization" years
+    #   and pays LIBOR + "Term Loan" on its average balance,
+    # - the unsecured debt repays "Unsecured Debt Amortization" a year and pays
+    #   the "Unsecured Debt" rate,
+    # - the revolver pays LIBOR + "Revolver" and, when a cash flow before
+    #   revolver is given, is drawn or repaid so that cash never goes negative.
+    def __init__(self, opening_balances, periods, frequency="annual", opening_cash=0.0):
+        if frequency not in FREQUENCIES:
+            raise ValueError(f"Unknown frequency '{frequency}', expected one of {', '.join(FREQUENCIES)}")
+        if periods < 1:
+            raise ValueError("The schedule needs at least one period.")
+        self.opening_balances = np.array([float(opening_balances.get(tranche, 0.0)) for tranche in TRANCHES])
+        self.opening_cash = float(opening_cash)
+        self.periods = periods
+        self.periods_per_year = FREQUENCIES[frequency]
+
+    @classmethod
+    def from_historical(cls, historical_data, periods, frequency="annual"):
+        # Open from the closing balances of the last historical year
+        last_year = historical_data.iloc[-1].fillna(0)
+        return cls(
+            {tranche: last_year[tranche] for tranche in TRANCHES},
+            periods,
+            frequency,
+            opening_cash=last_year["Cash"],
+        )
+
+    def run(self, assumption_table, cash_flow_before_revolver=None):
+        assumption_table = pd.DataFrame(assumption_table)
+        drivers = {
+            key: assumption_table[key].to_numpy(dtype=float)[:, np.newaxis]
+            for key in [
+                "LIBOR",
+                "Revolver",
+                "Term Loan",
+                "Unsecured Debt",
+                "Term of Amortization",
+                "Unsecured Debt Amortization",
+            ]
+        }
+        return self.schedule(drivers, cash_flow_before_revolver)
+
+    def schedule(self, drivers, cash_flow_before_revolver=None):
+        # `drivers` maps assumption keys to arrays of shape (N, 1);
+        # `cash_flow_before_revolver` is an optional N x periods array of cash
+        # generated after scheduled debt service
+        count = len(drivers["LIBOR"])
+        periods_per_year = self.periods_per_year
+        period = np.arange(1, self.periods + 1)
+
+        block = np.empty((len(FIELDS), count, self.periods, len(TRANCHES)))
+        beginning, amortization, drawdown, ending, interest = block
+
+        # Scheduled tranches
+        term_periods = np.maximum(drivers["Term of Amortization"] * periods_per_year, 1)
+        payment = self.opening_balances[TERM_LOAN] / term_periods
+        np.maximum(self.opening_balances[TERM_LOAN] - payment * period, 0, out=ending[:, :, TERM_LOAN])
+        unsecured_payment = drivers["Unsecured Debt Amortization"] / periods_per_year
+        np.maximum(
+            self.opening_balances[UNSECURED_DEBT] - unsecured_payment * period, 0, out=ending[:, :, UNSECURED_DEBT]
+        )
+
+        # Revolver: cash net of the revolver moves by the cash flow before revolver
+        if cash_flow_before_revolver is None:
+            ending[:, :, REVOLVER] = self.opening_balances[REVOLVER]
+            cash = np.full((count, self.periods), self.opening_cash)
+        else:
+            net_cash = np.cumsum(cash_flow_before_revolver, axis=1)
+            net_cash += self.opening_cash - self.opening_balances[REVOLVER]
+            np.maximum(-net_cash, 0, out=ending[:, :, REVOLVER])
+            cash = np.maximum(net_cash, 0)
+
+        beginning[:, 0, :] = self.opening_balances
+        beginning[:, 1:, :] = ending[:, :-1, :]
+
+        amortization[:] = 0
+        drawdown[:] = 0
+        np.subtract(beginning[..., 1:], ending[..., 1:], out=amortization[..., 1:])
+        np.subtract(ending[..., REVOLVER], beginning[..., REVOLVER], out=drawdown[..., REVOLVER])
+
+        # Interest on average balances at the per-period rate
+        rates = np.concatenate(
+            [
+                drivers["LIBOR"] + drivers["Revolver"],
+                drivers["LIBOR"] + drivers["Term Loan"],
+                np.broadcast_to(drivers["Unsecured Debt"], (count, 1)),
+            ],
+            axis=1,
+        )
+        np.add(beginning, ending, out=interest)
+        interest *= (rates / (2 * periods_per_year))[:, np.newaxis, :]
+
+        return DebtScheduleResult(block, cash, periods_per_year)
@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+
+# Trailing years the ratios are averaged and revenue growth is compounded over
+DEFAULT_WINDOW = 3
+
+# Days-based working capital is expressed against a 365-day year, as in
+# BalanceSheetpro's default day count
+YEAR_DAYS = 365
+
+# Net debt the income statement charges interest on
+NET_DEBT = "Net Debt"
+
+# Drivers that are a ratio of two historical columns, as (numerator,
+# denominator, scale), averaged over the window. Capital expenditures are
+# recorded as outflows, hence the negative scale.
+RATIOS = {
+    "COGS as % of Revenue": ("Cost of Goods Sold (COGS)", "Revenue", 1),
+    "SG&A as % of Sales": ("SG&A Expenses", "Revenue", 1),
+    "LIBOR": ("Interest Expense", NET_DEBT, 1),
+    "Tax Rate": ("Taxes", "Pretax Income", 1),
+    "Depreciation as % of Gross PP&E": ("Depreciation", "Gross PP&E", 1),
+    "Capex as % of sales": ("Capital Expenditures", "Revenue", -1),
+    "Days Inventory": ("Inventory", "Cost of Goods Sold (COGS)", YEAR_DAYS),
+    "Days Accounts Receivable": ("Accounts Receivable", "Revenue", YEAR_DAYS),
+    "Days Payable": ("Accounts Payable", "Cost of Goods Sold (COGS)", YEAR_DAYS),
+    "Accrued Liabilities as % of COGS": ("Accrued Liabilities", "Cost of Goods Sold (COGS)", 1),
+    "Other Current Liabilities as % of COGS": ("Other Current Liabilities", "Cost of Goods Sold (COGS)", 1),
+}
+
+# Drivers that carry the last historical balance forward
+LEVELS = {
+    "Other Current Assets": "Other Current Assets",
+    "Other Assets": "Other Assets",
+    "Other Liabilities": "Other Liabilities",
+    "Common Stock": "Common Stock",
+}
+
+# Every estimated driver, in the column order of estimate_drivers
+DRIVERS = ["Revenue Growth Rate", *RATIOS, *LEVELS]
+
+# Historical columns the estimates read, e.g. to load only these from a
+# large portfolio file
+COLUMNS = sorted(
+    (
+        {"Revenue", "Cash", "Total Liabilities"}
+        | {column for numerator, denominator, _ in RATIOS.values() for column in (numerator, denominator)}
+        | set(LEVELS.values())
+    )
+    - {NET_DEBT}
+)
+
+
+def estimate_drivers(historical_data, window=DEFAULT_WINDOW, entity_column=None):
+    # Default drivers of every entity of `historical_data`, one row each,
+    # indexed by `entity_column` (a single unnamed row when it is None). All
+    # entities are estimated together with grouped, vectorized operations
+    # over their last `window` years:
+    # - Revenue Growth Rate is the revenue CAGR over the window.
+    # - Ratios are averaged over the years both of their columns are known.
+    #   Working capital becomes days of revenue or COGS.
+    # - Levels are the last known balance.
+    # Drivers the history cannot support are NaN so callers keep their own
+    # defaults: missing columns, non-positive denominators, and negative
+    # ratios such as days of a negative balance.
+    if entity_column is None:
+        historical_data = historical_data.assign(**{"Entity": None})
+        entity_column = "Entity"
+    frame = historical_data.sort_values([entity_column, "Year"], kind="stable")
+    frame = frame.groupby(entity_column, sort=False, dropna=False).tail(window)
+    keys = frame[entity_column].to_numpy()
+    groups = pd.Index(pd.unique(keys), name=None if entity_column == "Entity" else entity_column)
+    codes = groups.get_indexer(keys)
+
+    def column(name):
+        if name == NET_DEBT and "Total Liabilities" in frame and "Cash" in frame:
+            return frame["Total Liabilities"].to_numpy(dtype=float) - frame["Cash"].to_numpy(dtype=float)
+        if name not in frame:
+            return np.full(len(frame), np.nan)
+        return frame[name].to_numpy(dtype=float)
+
+    def group_mean(values):
+        known = ~np.isnan(values)
+        totals = np.bincount(codes[known], values[known], minlength=len(groups))
+        counts = np.bincount(codes[known], minlength=len(groups))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return totals / counts
+
+    def group_last(values):
+        # Last known value of every group; rows are in year order
+        last = np.full(len(groups), np.nan)
+        known = ~np.isnan(values)
+        last[codes[known]] = values[known]
+        return last
+
+    def group_first(values):
+        first = np.full(len(groups), np.nan)
+        known = ~np.isnan(values)
+        first[codes[known][::-1]] = values[known][::-1]
+        return first
+
+    estimates = {}
+    revenue = column("Revenue")
+    revenue = np.where(revenue > 0, revenue, np.nan)
+    years = np.where(np.isnan(revenue), np.nan, frame["Year"].to_numpy(dtype=float))
+    span = group_last(years) - group_first(years)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = (group_last(revenue) / group_first(revenue)) ** (1 / span) - 1
+    estimates["Revenue Growth Rate"] = np.where(span > 0, growth, np.nan)
+
+    for driver, (numerator, denominator, scale) in RATIOS.items():
+        bottom = column(denominator)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = np.where(bottom > 0, scale * column(numerator) / bottom, np.nan)
+        ratio = group_mean(ratio)
+        estimates[driver] = np.where(ratio >= 0, ratio, np.nan)
+
+    for driver, name in LEVELS.items():
+        estimates[driver] = group_last(column(name))
+
+    estimates = pd.DataFrame(estimates, index=groups, columns=DRIVERS)
+    return estimates.where(np.isfinite(estimates.to_numpy()))
+
+
+def driver_records(estimates):
+    # {entity: {driver: value}} with only the drivers that could be estimated,
+    # i.e. are not NaN
+    return {
+        entity: {driver: value for driver, value in zip(estimates.columns, row) if value == value}
+        for entity, row in zip(estimates.index, estimates.to_numpy().tolist())
+    }
+
+
+def company_drivers(historical_data, window=DEFAULT_WINDOW):
+    # Estimated drivers of a single company as {driver: value}
+    return next(iter(driver_records(estimate_drivers(historical_data, window)).values()))
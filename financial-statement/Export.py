@@ -0,0 +1,465 @@
+import argparse
+import io
+import json
+import os
+import sys
+import zipfile
+from functools import partial
+from xml.sax.saxutils import escape
+import numpy as np
+import pandas as pd
+import Cache
+from IncomeStatement import FORMULAS as INCOME_STATEMENT_FORMULAS
+from IncomeStatement import LINE_ITEMS
+from Periods import FREQUENCIES
+from ScenarioEngine import DRIVERS, ScenarioEngine
+from Schema import coerce_assumptions
+
+# MIME type of every export format, keyed by format and file extension
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "parquet": "application/vnd.apache.parquet",
+    "json": "application/json",
+}
+
+# Rows of a scenario export projected and written at a time; memory stays
+# bounded by one chunk however many scenarios are exported
+CHUNK_ROWS = 50_000
+
+# Rows of an Excel worksheet, header included
+XLSX_MAX_ROWS = 1_048_576
+
+
+def export_format(path):
+    extension = os.path.splitext(str(path))[1].lower().lstrip(".")
+    if extension not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{extension}', expected one of {', '.join(EXPORT_FORMATS)}")
+    return extension
+
+
+class _Text:
+    # Text layer over the binary file an export writes to; close() flushes
+    # it without closing the file
+    def __init__(self, f):
+        self.f = f
+        self.text = io.TextIOWrapper(f, encoding="utf-8", newline="")
+
+    def close(self):
+        self.text.flush()
+        self.text.detach()
+
+
+class CsvExport(_Text):
+    def __init__(self, f, columns):
+        super().__init__(f)
+        self.columns = columns
+        pd.DataFrame(columns=columns).to_csv(self.text, index=False)
+
+    def write(self, frame):
+        frame[self.columns].to_csv(self.text, header=False, index=False)
+
+
+class JsonExport(_Text):
+    # One JSON array of records; missing values are written as null
+    def __init__(self, f, columns):
+        super().__init__(f)
+        self.columns = columns
+        self.separator = "\n"
+        self.text.write("[")
+
+    def write(self, frame):
+        values = []
+        for column in self.columns:
+            series = frame[column]
+            if series.dtype.kind == "f" and series.hasnans:
+                series = series.astype(object).where(series.notna(), None)
+            values.append(series.tolist())
+        for row in zip(*values):
+            self.text.write(self.separator + json.dumps(dict(zip(self.columns, row))))
+            self.separator = ",\n"
+
+    def close(self):
+        self.text.write("\n]\n")
+        super().close()
+
+
+class ParquetExport:
+    # One row group per chunk. pyarrow is only imported when a Parquet export
+    # is asked for; the schema is taken from the first chunk.
+    def __init__(self, f, columns):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.pq = pq
+        self.f = f
+        self.columns = columns
+        self.writer = None
+
+    def write(self, frame):
+        table = self.pa.Table.from_pandas(frame[self.columns], preserve_index=False)
+        if self.writer is None:
+            self.writer = self.pq.ParquetWriter(self.f, table.schema)
+        self.writer.write_table(table.cast(self.writer.schema))
+
+    def close(self):
+        if self.writer is None:
+            self.write(pd.DataFrame(columns=self.columns))
+        self.writer.close()
+
+
+def column_letter(position):
+    # Spreadsheet column of a zero-based position: 0 is A, 26 is AA
+    letters = ""
+    position += 1
+    while position:
+        position, remainder = divmod(position - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _cell(reference, value, formula=None):
+    formula = f"<f>{escape(formula)}</f>" if formula else ""
+    if value is None or (isinstance(value, float) and not np.isfinite(value)):
+        return f'<c r="{reference}">{formula}</c>' if formula else ""
+    if isinstance(value, (bool, np.bool_)):
+        return f'<c r="{reference}" t="b">{formula}<v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return f'<c r="{reference}">{formula}<v>{value!r}</v></c>'
+    return f'<c r="{reference}" t="inlineStr"><is><t>{escape(str(value))}</t></is></c>'
+
+
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_END = "</sheetData></worksheet>"
+
+
+class XlsxExport:
+    # Write-only SpreadsheetML workbook, streamed row by row into the zip
+    # archive so no sheet is held in memory. Lines with an entry in
+    # `formulas`, as (formula, operands) pairs such as ("{0}-{1}", ["Revenue",
+    # "Cost of Goods Sold (COGS)"]), are written as live formulas with the
+    # projected value cached. Operands are columns of the same row, or keys of
+    # `assumptions`, which go on an "Assumptions" sheet written first; lines
+    # with any other operand keep their plain values. Excel recalculates the
+    # formulas on open.
+    def __init__(self, f, columns, formulas=None, assumptions=None, sheet="Statement"):
+        # The fastest deflate level: sheets of numbers compress well anyway
+        self.archive = zipfile.ZipFile(f, "w", zipfile.ZIP_DEFLATED, compresslevel=1)
+        self.columns = columns
+        self.letters = [column_letter(position) for position in range(len(columns))]
+        self.sheets = []
+
+        assumptions = {
+            key: value
+            for key, value in coerce_assumptions(assumptions or {}).items()
+            if np.ndim(value) == 0
+        }
+        references = {}
+        if assumptions:
+            self._open_sheet("Assumptions")
+            self._row(["Assumption", "Value"])
+            for key, value in assumptions.items():
+                references[key] = f"Assumptions!$B${self.row + 1}"
+                self._row([key, value])
+            self._close_sheet()
+
+        # Formulas as templates of the row number
+        self.formulas = []
+        for column in columns:
+            formula, operands = (formulas or {}).get(column, (None, []))
+            cells = []
+            for operand in operands:
+                if operand in columns and operand != column:
+                    cells.append(self.letters[columns.index(operand)] + "{row}")
+                elif operand in references:
+                    cells.append(references[operand])
+                else:
+                    formula = None
+                    break
+            self.formulas.append(formula.format(*cells) if formula else None)
+
+        self._open_sheet(sheet)
+        self._row(columns)
+
+    def _open_sheet(self, name):
+        # Sheet names are at most 31 characters without []:*?/\
+        name = "".join(" " if character in "[]:*?/\\" else character for character in name)[:31]
+        self.sheets.append(name)
+        self.stream = self.archive.open(f"xl/worksheets/sheet{len(self.sheets)}.xml", "w")
+        self.stream.write(_SHEET_START.encode())
+        self.row = 0
+
+    def _close_sheet(self):
+        self.stream.write(_SHEET_END.encode())
+        self.stream.close()
+
+    def _row(self, values, formulas=None):
+        self.row += 1
+        if self.row > XLSX_MAX_ROWS:
+            raise ValueError(f"An XLSX sheet holds at most {XLSX_MAX_ROWS:,} rows; export CSV or Parquet instead")
+        row = self.row
+        formulas = formulas or [None] * len(values)
+        cells = "".join(
+            _cell(f"{letter}{row}", value, formula and formula.format(row=row))
+            for letter, value, formula in zip(self.letters, values, formulas)
+        )
+        self.stream.write(f'<row r="{row}">{cells}</row>'.encode())
+
+    def _column(self, values, letter, formula, rows):
+        # Cells of one column; numbers without gaps take a single template
+        if values.dtype.kind in "iu" or (values.dtype.kind == "f" and not values.hasnans):
+            formula = f"<f>{escape(formula).replace('{row}', '{0}')}</f>" if formula else ""
+            template = f'<c r="{letter}{{0}}">{formula}<v>{{1!r}}</v></c>'
+            return [template.format(row, value) for row, value in zip(rows, values.tolist())]
+        return [
+            _cell(f"{letter}{row}", value, formula and formula.format(row=row))
+            for row, value in zip(rows, values.tolist())
+        ]
+
+    def write(self, frame, slice_rows=1000):
+        # Rows are rendered a column at a time and written in slices
+        if self.row + len(frame) > XLSX_MAX_ROWS:
+            raise ValueError(f"An XLSX sheet holds at most {XLSX_MAX_ROWS:,} rows; export CSV or Parquet instead")
+        for start in range(0, len(frame), slice_rows):
+            piece = frame.iloc[start : start + slice_rows]
+            rows = range(self.row + 1, self.row + len(piece) + 1)
+            self.row += len(piece)
+            columns = [
+                self._column(piece[column], letter, formula, rows)
+                for column, letter, formula in zip(self.columns, self.letters, self.formulas)
+            ]
+            self.stream.write(
+                "".join(f'<row r="{row}">{"".join(cells)}</row>' for row, *cells in zip(rows, *columns)).encode()
+            )
+
+    def close(self):
+        self._close_sheet()
+        sheets = range(1, len(self.sheets) + 1)
+        self.archive.writestr(
+            "[Content_Types].xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            + "".join(
+                f'<Override PartName="/xl/worksheets/sheet{number}.xml" '
+                'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                for number in sheets
+            )
+            + "</Types>",
+        )
+        self.archive.writestr(
+            "_rels/.rels",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="xl/workbook.xml"/></Relationships>',
+        )
+        self.archive.writestr(
+            "xl/workbook.xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+            + "".join(
+                f'<sheet name="{escape(name, {chr(34): "&quot;"})}" sheetId="{number}" r:id="rId{number}"/>'
+                for number, name in zip(sheets, self.sheets)
+            )
+            + '</sheets><calcPr fullCalcOnLoad="1"/></workbook>',
+        )
+        self.archive.writestr(
+            "xl/_rels/workbook.xml.rels",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + "".join(
+                f'<Relationship Id="rId{number}" '
+                'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+                f'Target="worksheets/sheet{number}.xml"/>'
+                for number in sheets
+            )
+            + f'<Relationship Id="rId{len(self.sheets) + 1}" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+            'Target="styles.xml"/></Relationships>',
+        )
+        self.archive.writestr(
+            "xl/styles.xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            '<fonts count="1"><font/></fonts><fills count="1"><fill/></fills>'
+            '<borders count="1"><border/></borders>'
+            '<cellStyleXfs count="1"><xf/></cellStyleXfs><cellXfs count="1"><xf/></cellXfs>'
+            "</styleSheet>",
+        )
+        self.archive.close()
+
+
+def open_export(f, export_format, columns, formulas=None, assumptions=None, sheet="Statement"):
+    # Streaming writer of `columns` into the binary file `f`. Frames passed to
+    # write() are appended; close() finishes the format but leaves `f` open.
+    # Only XLSX uses the formulas, assumptions and sheet name.
+    if export_format == "xlsx":
+        return XlsxExport(f, columns, formulas, assumptions, sheet)
+    if export_format == "parquet":
+        return ParquetExport(f, columns)
+    if export_format == "json":
+        return JsonExport(f, columns)
+    if export_format == "csv":
+        return CsvExport(f, columns)
+    raise ValueError(f"Unknown export format '{export_format}', expected one of {', '.join(EXPORT_FORMATS)}")
+
+
+def write_frames(frames, f, export_format, columns, **options):
+    # Streams an iterable of frames through one writer; returns the rows written
+    writer = open_export(f, export_format, columns, **options)
+    rows = 0
+    for frame in frames:
+        writer.write(frame)
+        rows += len(frame)
+    writer.close()
+    return rows
+
+
+def period_labels(labels):
+    # Quarterly and monthly periods as text, e.g. "2024Q1"; years stay numbers
+    labels = pd.Index(labels)
+    if isinstance(labels.dtype, pd.PeriodDtype):
+        labels = labels.astype(str)
+    return labels.to_numpy()
+
+
+def write_statement(frame, f, export_format, formulas=None, assumptions=None, sheet="Statement"):
+    # A projected statement as returned by calculate_all_line_items
+    label = frame.columns[0]
+    frame = frame.assign(**{label: period_labels(frame[label])})
+    columns = list(frame.columns)
+    return write_frames([frame], f, export_format, columns, formulas=formulas, assumptions=assumptions, sheet=sheet)
+
+
+def scenario_columns(label="Year"):
+    return ["Scenario", label, *DRIVERS, *LINE_ITEMS]
+
+
+def scenario_frames(engine, assumption_table, chunk_rows=CHUNK_ROWS):
+    # Projects the scenarios of `assumption_table` on the ScenarioEngine
+    # `engine` a chunk at a time, as frames with one row per scenario and
+    # period holding the scenario's drivers next to its income statement
+    periods = engine.periods
+    labels = period_labels(engine.years)
+    step = max(1, chunk_rows // periods)
+    for start in range(0, len(assumption_table), step):
+        chunk = assumption_table.iloc[start : start + step]
+        result = engine.run(chunk)
+        count = len(chunk)
+        values = result.values.reshape(count * periods, len(LINE_ITEMS))
+        frame = {"Scenario": np.repeat(chunk.index.to_numpy(), periods), result.label: np.tile(labels, count)}
+        for driver in DRIVERS:
+            frame[driver] = np.repeat(chunk[driver].to_numpy(dtype=float), periods)
+        for position, line_item in enumerate(LINE_ITEMS):
+            frame[line_item] = values[:, position]
+        yield pd.DataFrame(frame)
+
+
+def write_scenarios(
+    assumption_table, historical_data, f, export_format, periods=5, frequency="annual", chunk_rows=CHUNK_ROWS
+):
+    engine = ScenarioEngine(historical_data, periods, frequency)
+    assumption_table = pd.DataFrame(assumption_table)
+    missing = [driver for driver in DRIVERS if driver not in assumption_table.columns]
+    if missing:
+        raise KeyError(f"Assumption table is missing columns: {', '.join(missing)}")
+    return write_frames(
+        scenario_frames(engine, assumption_table, chunk_rows),
+        f,
+        export_format,
+        scenario_columns(engine.period_index.label),
+        formulas=INCOME_STATEMENT_FORMULAS,
+        sheet="Scenarios",
+    )
+
+
+def _encode(write, *args, **options):
+    buffer = io.BytesIO()
+    write(*args, buffer, **options)
+    return buffer.getvalue()
+
+
+def statement_bytes(frame, export_format, formulas=None, assumptions=None, sheet="Statement"):
+    # Encoded statement, e.g. for a download button. The bytes are cached on
+    # the statement's content, so repeated downloads are not encoded again.
+    return Cache.cached_export(
+        "statement",
+        export_format,
+        [frame],
+        partial(
+            _encode,
+            write_statement,
+            frame,
+            export_format=export_format,
+            formulas=formulas,
+            assumptions=assumptions,
+            sheet=sheet,
+        ),
+        formulas=formulas,
+        assumptions=assumptions,
+        sheet=sheet,
+    )
+
+
+def scenario_bytes(assumption_table, historical_data, export_format, periods=5, frequency="annual"):
+    # Encoded scenario export, cached on its inputs so a repeated download
+    # neither projects nor encodes the scenarios again
+    assumption_table = pd.DataFrame(assumption_table)
+    return Cache.cached_export(
+        "scenarios",
+        export_format,
+        [assumption_table, historical_data],
+        partial(
+            _encode,
+            write_scenarios,
+            assumption_table,
+            historical_data,
+            export_format=export_format,
+            periods=periods,
+            frequency=frequency,
+        ),
+        periods=periods,
+        frequency=frequency,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Project a table of scenarios and export the results.")
+    parser.add_argument("scenarios", help="CSV with one row per scenario and one column per driver")
+    parser.add_argument("output", help=f"output file: {', '.join('.' + name for name in EXPORT_FORMATS)}")
+    parser.add_argument("--historical", default="historical_data.csv", help="historical data of the company")
+    parser.add_argument("--periods", type=int, default=5)
+    parser.add_argument("--frequency", choices=list(FREQUENCIES), default="annual")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="rows projected and written at a time")
+    args = parser.parse_args(argv)
+
+    historical_data = Cache.read_historical(args.historical)
+    assumption_table = pd.read_csv(args.scenarios)
+    with open(args.output, "wb") as f:
+        rows = write_scenarios(
+            assumption_table,
+            historical_data,
+            f,
+            export_format(args.output),
+            args.periods,
+            args.frequency,
+            args.chunk_rows,
+        )
+    print(f"Wrote {rows:,} rows for {len(assumption_table):,} scenarios to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
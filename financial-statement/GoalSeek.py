@@ -0,0 +1,110 @@
+import numpy as np
+from BalanceSheetpro import BalanceSheetpro
+from IncomeStatement import LINE_ITEMS, IncomeStatement
+from ScenarioEngine import DRIVERS, ScenarioEngine
+
+
+class GoalSeekResult:
+    def __init__(self, solution, residual, converged, iterations):
+        self.solution = solution
+        self.residual = residual
+        self.converged = converged
+        self.iterations = iterations
+
+
+def seek(function, targets, low, high, tol=1e-9, max_iter=100):
+    # Vectorized safeguarded Newton solver. `function` maps an array of
+    # candidate values to an array of metric values of the same length, so
+    # every target (e.g. one per company) is solved in the same batch.
+    # Newton steps use a forward-difference slope and fall back to bisection
+    # whenever they leave the bracket [low, high]. Targets whose bracket does
+    # not contain a sign change are reported as not converged.
+    targets = np.asarray(targets, dtype=float)
+    low = np.broadcast_to(np.asarray(low, dtype=float), targets.shape).copy()
+    high = np.broadcast_to(np.asarray(high, dtype=float), targets.shape).copy()
+    count = len(targets)
+
+    bounds = function(np.concatenate([low, high])) - np.concatenate([targets, targets])
+    f_low, f_high = bounds[:count], bounds[count:]
+    bracketed = np.sign(f_low) * np.sign(f_high) <= 0
+    x = np.where(bracketed, (low + high) / 2, np.nan)
+
+    residual = np.full(count, np.nan)
+    converged = np.zeros(count, dtype=bool)
+    iterations = 0
+    while iterations < max_iter:
+        iterations += 1
+        # Value and slope for every candidate in a single evaluation
+        step = 1e-7 * np.maximum(1.0, np.abs(x))
+        values = function(np.concatenate([x, x + step]))
+        residual = values[:count] - targets
+        slope = (values[count:] - values[:count]) / step
+
+        converged = bracketed & (
+            (np.abs(residual) <= tol * np.maximum(1.0, np.abs(targets)))
+            | (np.abs(high - low) <= tol * np.maximum(1.0, np.abs(x)))
+        )
+        active = bracketed & ~converged
+        if not active.any():
+            break
+
+        # Keep the sign change inside the bracket
+        moves_low = np.sign(residual) == np.sign(f_low)
+        low = np.where(active & moves_low, x, low)
+        f_low = np.where(active & moves_low, residual, f_low)
+        high = np.where(active & ~moves_low, x, high)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            newton = x - residual / slope
+        inside = np.isfinite(newton) & (newton > np.minimum(low, high)) & (newton < np.maximum(low, high))
+        x = np.where(active, np.where(inside, newton, (low + high) / 2), x)
+
+    return GoalSeekResult(x, residual, converged, iterations)
+
+
+class GoalSeek:
+    # Finds the value of one assumption that makes a projected line item hit
+    # a target in a given year, for one or many targets at once
+    def __init__(self, assumptions, historical_data, periods=5, frequency="annual"):
+        self.assumptions = assumptions
+        self.historical_data = historical_data
+        self.frequency = frequency
+        self.engine = ScenarioEngine(historical_data, periods, frequency)
+
+    def assumptions_for(self, metric):
+        # Assumptions `metric` depends on, the only ones worth solving for;
+        # income statement lines are projected from the scenario drivers only
+        if metric in LINE_ITEMS:
+            graph = IncomeStatement(self.assumptions, self.historical_data, self.engine.periods, self.frequency).graph
+            return [key for key in graph.assumptions_of(metric) if key in DRIVERS]
+        graph = BalanceSheetpro(self.assumptions, self.historical_data, self.engine.periods, self.frequency).graph
+        return graph.assumptions_of(metric)
+
+    def evaluate(self, assumption, metric, year, values):
+        # Projected `metric` in `year` for every candidate value of `assumption`
+        period = list(self.engine.years).index(year)
+        if metric in LINE_ITEMS:
+            drivers = [
+                values if driver == assumption else np.full(len(values), self.assumptions[driver], dtype=float)
+                for driver in DRIVERS
+            ]
+            return self.engine.project(drivers)[:, period, LINE_ITEMS.index(metric)]
+
+        batch = dict(self.assumptions)
+        batch[assumption] = values[:, np.newaxis]
+        projection = BalanceSheetpro(batch, self.historical_data, self.engine.periods, self.frequency).graph.evaluate(metric)
+        return np.broadcast_to(projection, (len(values), np.shape(projection)[-1]))[:, period]
+
+    def solve(self, assumption, metric, year, targets, low, high, tol=1e-9, max_iter=100):
+        if assumption not in self.assumptions:
+            raise KeyError(f"Unknown assumption '{assumption}'")
+        if assumption not in self.assumptions_for(metric):
+            raise ValueError(f"'{metric}' does not depend on '{assumption}'")
+        return seek(
+            lambda values: self.evaluate(assumption, metric, year, values),
+            np.atleast_1d(targets),
+            low,
+            high,
+            tol,
+            max_iter,
+        )
@@ -0,0 +1,194 @@
+import numpy as np
+import pandas as pd
+from Schema import REQUIRED_COLUMNS, normalize_column, validate
+from Storage import COLUMNAR, iter_batches, read_columns, source_format
+
+# Columns of a long-layout file: one row per entity, year and line item
+LONG_COLUMNS = ["Line Item", "Value"]
+
+
+def read_header(source):
+    if source_format(source) in COLUMNAR:
+        header = read_columns(source)
+    else:
+        header = list(pd.read_csv(source, nrows=0).columns)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return header
+
+
+class HistoricalLoader:
+    # Streams historical data one entity at a time from CSV, Parquet or Arrow
+    # IPC. The file may hold one company in the wide layout of
+    # historical_data.csv, or many companies keyed by `entity_column` and
+    # `year_column`, either wide (one column per line item) or long
+    # ("Line Item" and "Value" columns). It is read in chunks of `chunksize`
+    # rows, keeping only `columns` (every column when None), so at most one
+    # chunk and one entity are held in memory. The rows of an entity must be
+    # contiguous, as in a file sorted by entity. Column names and line items
+    # are normalized and each chunk is typed once by Schema.validate; the
+    # `required` columns are checked for up front in wide files and per
+    # entity in long ones. Frames key their years by "Year" either way.
+    def __init__(
+        self,
+        source,
+        columns=None,
+        entity_column="Company",
+        year_column="Year",
+        chunksize=100_000,
+        required=REQUIRED_COLUMNS,
+    ):
+        self.source = source
+        self.format = source_format(source)
+        self.raw_columns = {normalize_column(column): column for column in read_header(source)}
+        self.header = list(self.raw_columns)
+        self.entity_column = entity_column
+        self.year_column = year_column
+        self.chunksize = chunksize
+        self.required = ["Year" if column == year_column else column for column in required]
+        self.layout = "long" if all(column in self.header for column in LONG_COLUMNS) else "wide"
+        self.multi_entity = entity_column in self.header
+        if year_column not in self.header:
+            raise KeyError(f"The historical data has no '{year_column}' column")
+        if self.layout == "wide":
+            missing = [column for column in self.required if column != "Year" and column not in self.header]
+            if missing:
+                raise KeyError(f"The historical data has no {', '.join(map(repr, missing))} column(s)")
+
+        keys = [entity_column] if self.multi_entity else []
+        keys.append(year_column)
+        if self.layout == "long":
+            self.columns = columns
+            self.usecols = keys + LONG_COLUMNS
+        else:
+            available = [column for column in self.header if column not in keys]
+            self.columns = available if columns is None else [column for column in columns if column in available]
+            self.usecols = keys + self.columns
+
+    def _chunks(self, usecols):
+        # Chunks with normalized column names, the year column as "Year"
+        if hasattr(self.source, "seek"):
+            self.source.seek(0)
+        raw = [self.raw_columns[column] for column in usecols]
+        if self.format in COLUMNAR:
+            chunks = iter_batches(self.source, raw, self.chunksize)
+        else:
+            chunks = pd.read_csv(self.source, usecols=raw, chunksize=self.chunksize)
+        for chunk in chunks:
+            columns = [normalize_column(column) for column in chunk.columns]
+            chunk.columns = ["Year" if column == self.year_column else column for column in columns]
+            yield chunk
+
+    def entities(self):
+        # Entity names in file order, reading only the entity column
+        if not self.multi_entity:
+            return [None]
+        names = {}
+        for chunk in self._chunks([self.entity_column]):
+            names.update(dict.fromkeys(chunk[self.entity_column].dropna()))
+        return list(names)
+
+    def _wide(self, chunk):
+        # A typed chunk in the wide layout, still keyed by entity and year
+        keys = [self.entity_column, "Year"] if self.multi_entity else ["Year"]
+        if self.multi_entity:
+            chunk = chunk[chunk[self.entity_column].notna()]
+        if self.layout == "wide":
+            return self._validate(chunk)
+        # Normalize each distinct line item once
+        codes, items = pd.factorize(chunk[LONG_COLUMNS[0]])
+        items = np.array([normalize_column(item) for item in items] + [None], dtype=object)
+        chunk = chunk.assign(**{LONG_COLUMNS[0]: items[codes]})
+        if self.columns is not None:
+            chunk = chunk[chunk[LONG_COLUMNS[0]].isin(self.columns)]
+        # Pivot the whole chunk at once; file order of the entities is kept
+        chunk = chunk.pivot(index=keys, columns=LONG_COLUMNS[0], values=LONG_COLUMNS[1])
+        chunk.columns.name = None
+        if self.columns is not None:
+            chunk = chunk.reindex(columns=[column for column in self.columns if column in chunk.columns])
+        chunk = chunk.reset_index()
+        if self.multi_entity:
+            order = pd.unique(chunk[self.entity_column])
+            chunk = chunk.iloc[np.argsort(pd.Index(order).get_indexer(chunk[self.entity_column]), kind="stable")]
+        return self._validate(chunk)
+
+    def _validate(self, chunk):
+        # A chunk of long data may lack some line items, so only the ones it
+        # has are required here; _finish checks the rest per entity
+        required = [column for column in self.required if column in chunk.columns]
+        if not self.multi_entity:
+            return validate(chunk, required)
+        typed = validate(chunk.drop(columns=self.entity_column), required)
+        typed.insert(0, self.entity_column, chunk[self.entity_column].to_numpy())
+        return typed
+
+    def _finish(self, pieces):
+        # One entity's rows as a frame in the wide single-company layout
+        frame = pieces[0] if len(pieces) == 1 else pd.concat(pieces)
+        if self.multi_entity:
+            frame = frame.drop(columns=self.entity_column)
+        if self.layout == "long":
+            if len(pieces) > 1:
+                # Line items of a year can be split across two chunks
+                frame = frame.groupby("Year", sort=False).first().reset_index()
+            missing = [column for column in self.required if column not in frame.columns]
+            if missing:
+                raise KeyError(f"The historical data has no {', '.join(map(repr, missing))} column(s)")
+        years = frame["Year"].to_numpy()
+        if len(years) > 1 and not (years[1:] > years[:-1]).all():
+            frame = frame.sort_values("Year", kind="stable")
+        return frame.reset_index(drop=True)
+
+    def __iter__(self):
+        # Lazily yields (entity, frame) pairs; single-company files yield one
+        # pair with entity None
+        if not self.multi_entity:
+            pieces = [self._wide(chunk) for chunk in self._chunks(self.usecols)]
+            if pieces:
+                yield None, self._finish(pieces)
+            return
+
+        current, pieces, finished = None, [], set()
+        for chunk in self._chunks(self.usecols):
+            chunk = self._wide(chunk)
+            keys = chunk[self.entity_column].to_numpy()
+            boundaries = np.flatnonzero(keys[1:] != keys[:-1]) + 1
+            for start, end in zip([0, *boundaries], [*boundaries, len(chunk)]):
+                if start == end:
+                    continue
+                entity = keys[start]
+                if entity != current:
+                    if pieces:
+                        yield current, self._finish(pieces)
+                        finished.add(current)
+                    if entity in finished:
+                        raise ValueError(
+                            f"The rows of '{entity}' are not contiguous; sort the file by {self.entity_column}"
+                        )
+                    current, pieces = entity, []
+                pieces.append(chunk.iloc[start:end])
+        if pieces:
+            yield current, self._finish(pieces)
+
+    def table(self):
+        # Every entity's rows at once as one wide frame keyed by entity and
+        # "Year", for vectorized work across a portfolio such as
+        # DriverEstimation. Unlike iteration it holds all of `columns` in
+        # memory, so load only the columns needed.
+        keys = [self.entity_column, "Year"] if self.multi_entity else ["Year"]
+        pieces = [self._wide(chunk) for chunk in self._chunks(self.usecols)]
+        if not pieces:
+            return pd.DataFrame(columns=keys)
+        frame = pd.concat(pieces, ignore_index=True)
+        if self.layout == "long" and len(pieces) > 1:
+            # Line items of a year can be split across two chunks
+            frame = frame.groupby(keys, sort=False).first().reset_index()
+        return frame
+
+    def load(self, entity=None):
+        # Frame of one entity (the only one of a single-company file),
+        # stopping at the end of its rows
+        for name, frame in self:
+            if not self.multi_entity or name == entity:
+                return frame
+        raise KeyError(f"No historical data for '{entity}'")
@@ -1,11 +1,43 @@
-import json
 import requests
+from functools import partial
 import streamlit as st
+import numpy as np
 import pandas as pd
+import altair as alt
 from streamlit_lottie import st_lottie
 from BalanceSheet import BalanceSheet
+from BalanceSheetApp import display_balance_sheet
 from BalanceSheetpro import BalanceSheetpro
-from IncomeStatement import IncomeStatement
+from BalanceSheetpro import FORMULAS as BALANCE_SHEET_FORMULAS
+from BalanceSheetpro import LINE_ITEMS as BALANCE_SHEET_LINE_ITEMS
+from BalanceSheetpro import MODEL_VERSION as BALANCE_SHEET_VERSION
+from Cache import (
+    cache_stats,
+    cached_result,
+    clear_caches,
+    frame_digest,
+    persisted_result,
+    read_historical,
+    read_json,
+    read_uploaded_csv,
+)
+from CashFlowStatement import CashFlowStatement, validate_against_historical
+from DebtSchedule import TRANCHES, DebtSchedule
+from DriverEstimation import company_drivers
+from Export import EXPORT_FORMATS, statement_bytes
+from GoalSeek import GoalSeek
+from HistoricalLoader import HistoricalLoader
+from IncomeStatement import FORMULAS, IncomeStatement, LINE_ITEMS
+from IncomeStatement import MODEL_VERSION as INCOME_STATEMENT_VERSION
+from Instrumentation import measure, profiler
+from MonteCarlo import MonteCarloSimulation
+from Periods import DAY_COUNTS, FREQUENCIES
+from ScenarioEngine import DRIVERS
+from ScenarioWorkspace import MEASURES, ScenarioWorkspace
+from Sensitivity import METRICS, SensitivityAnalysis
+from Storage import COLUMNAR
+from ThreeStatementModel import BALANCE_SHEET, CASH_FLOW, INCOME_STATEMENT, ThreeStatementModel
+from Valuation import DCFValuation, MEASURES as VALUATION_MEASURES, net_debt
 
 
 #logo
@@ -13,8 +45,8 @@ from IncomeStatement import IncomeStatement
 # Function to load Lottie file from file path
 def load_lottiefile(filepath: str):
     try:
-        with open(filepath, "r") as f:
-            return json.load(f)
+        # Parsed once per file content and shared by every session
+        return read_json(filepath)
     except Exception as e:
         st.error(f"Error loading Lottie file: {e}")
         return None
@@ -58,16 +90,125 @@ def main():
     page_options = ["Home", "BalanceSheet", "BalanceSheetpro", "IncomeStatement", "CashFlow"]
     choice = st.sidebar.selectbox("Select Page", page_options)
 
-    if choice == "IncomeStatement":
-        income_statement()
-    elif choice == "BalanceSheet":
-        balance_sheet()
-    elif choice == "BalanceSheetpro":
-        balance_sheets()   
-    elif choice == "CashFlow":
-        Cashflow()
+    with measure(f"Home.render {choice}"):
+        if choice == "IncomeStatement":
+            income_statement()
+        elif choice == "BalanceSheet":
+            balance_sheet()
+        elif choice == "BalanceSheetpro":
+            balance_sheets()   
+        elif choice == "CashFlow":
+            Cashflow()
+        else:
+            home()
+
+    display_cache_stats()
+    display_performance()
+
+def display_cache_stats():
+    # Inputs and results are cached for the whole process, across sessions;
+    # projected statements also on disk, across processes and restarts
+    with st.sidebar.expander("Cache"):
+        st.dataframe(cache_stats())
+        if st.button("Clear cache"):
+            st.write(f"Dropped {clear_caches()} cached entries.")
+
+def toggle_performance():
+    if st.session_state["performance_enabled"]:
+        profiler.enable()
     else:
-        home()
+        profiler.disable()
+
+def display_performance():
+    # Opt-in profile of the calculate_* methods, line items, data loading and
+    # page rendering; recorded for the whole process, across sessions
+    with st.sidebar.expander("Performance"):
+        st.checkbox(
+            "Record performance", value=profiler.enabled, key="performance_enabled", on_change=toggle_performance
+        )
+        st.dataframe(profiler.frame())
+        st.download_button("Download JSON", profiler.to_json(), file_name="performance.json")
+        st.download_button("Download OpenMetrics", profiler.to_openmetrics(), file_name="performance.txt")
+        if st.button("Reset performance"):
+            profiler.reset()
+
+def download_buttons(label, statement, formulas, assumptions, file_name, key):
+    # One button per export format. The bytes are encoded when a button is
+    # clicked and cached, so repeated downloads reuse them; the page does not
+    # rerun on a download.
+    for column, export_format in zip(st.columns(len(EXPORT_FORMATS)), EXPORT_FORMATS):
+        column.download_button(
+            label=f"{label} ({export_format.upper()})",
+            data=partial(statement_bytes, statement, export_format, formulas, assumptions, label),
+            file_name=f"{file_name}.{export_format}",
+            mime=EXPORT_FORMATS[export_format],
+            key=f"{key}_{export_format}",
+            on_click="ignore",
+        )
+
+def estimated_drivers(historical_data):
+    # Drivers estimated from the actuals to pre-fill the assumptions; empty
+    # without history or when pre-filling is turned off
+    if historical_data is None or not st.sidebar.checkbox("Estimate drivers from history", value=True):
+        return {}
+    return cached_result("drivers", {}, historical_data, partial(company_drivers, historical_data))
+
+def estimated(drivers, key, default, low=None, high=None):
+    # Widget default for `key`: its estimate when there is one, of the type of
+    # `default` and within the widget's bounds
+    if key not in drivers:
+        return default
+    value = round(drivers[key]) if isinstance(default, int) else drivers[key]
+    if low is not None:
+        value = max(low, value)
+    if high is not None:
+        value = min(high, value)
+    return type(default)(value)
+
+def scenario_workspace(key, line_items):
+    # Scenarios of one statement saved in this session
+    if key not in st.session_state:
+        st.session_state[key] = ScenarioWorkspace(line_items)
+    return st.session_state[key]
+
+def workspace_inputs(workspace):
+    # Returns the name to save the current assumptions under, if asked to
+    with st.expander("Scenario Workspace"):
+        name = st.text_input("Scenario name", value="Base")
+        save = st.button("Save scenario")
+        if workspace.names and st.button("Clear scenarios"):
+            workspace.clear()
+    return name.strip() if save and name.strip() else None
+
+def save_scenario(workspace, name, assumptions, projection, historical_data):
+    try:
+        workspace.save(name, assumptions, projection, historical_data)
+    except ValueError as e:
+        st.error(str(e))
+        return
+    st.success(f"Saved scenario '{name}'.")
+
+def display_workspace(workspace):
+    # Saved scenarios side by side, with deltas and % changes against a base
+    if len(workspace) < 2:
+        return
+    st.header("Scenario Comparison")
+    base = st.selectbox("Base scenario", workspace.names)
+    names = st.multiselect("Scenarios to compare", workspace.names, default=workspace.names)
+    comparison = workspace.compare(base, names)
+
+    labels = [str(label) for label in comparison.labels]
+    period = st.selectbox("Compare period", labels)
+    st.dataframe(comparison.period_frame(comparison.labels[labels.index(period)]))
+
+    line_item = st.selectbox("Line item over the horizon", workspace.line_items)
+    measure_name = st.radio("Measure", MEASURES, horizontal=True)
+    line = comparison.line_frame(line_item, measure_name)
+    line.index = labels
+    st.line_chart(line)
+
+    with st.expander("Scenario Assumptions"):
+        st.dataframe(workspace.assumption_frame())
 
 def balance_sheet():
             
@@ -114,8 +255,8 @@ def balance_sheet():
 
     # Add a button to trigger the calculation in the sidebar
     if st.sidebar.button("Calculate Balance Sheet"):
-        # Call the display_balance_sheet method
-        balance_sheet.display_balance_sheet()
+        # Display the balance sheet
+        display_balance_sheet(balance_sheet)
     else:
         st.header("Balance Sheet Calculating Section")
         st.divider()
@@ -152,31 +293,140 @@ def balance_sheet():
         
 
         
+def goal_seek_inputs(assumptions, historical_data, metrics, periods, frequency, default_target):
+    # Solve one assumption for a target value of a projected line item. Only
+    # the assumptions the line item depends on are offered, and the bounds
+    # default to 0 and three times the assumption's current value.
+    numeric_keys = [key for key, value in assumptions.items() if isinstance(value, (int, float))]
+    with st.expander("Goal Seek"):
+        enabled = st.checkbox("Run goal seek", key="goal_seek_enabled")
+        metric = st.selectbox("Target line item", metrics, index=len(metrics) - 1, key="goal_seek_metric")
+        if historical_data is not None:
+            dependent = GoalSeek(assumptions, historical_data, periods, frequency).assumptions_for(metric)
+            numeric_keys = [key for key in numeric_keys if key in dependent]
+        if not numeric_keys:
+            st.caption(f"{metric} does not depend on any numeric assumption.")
+            return None
+        assumption = st.selectbox("Solve for", numeric_keys, key="goal_seek_assumption")
+        period = st.number_input("Target projected period", min_value=1, max_value=periods, value=periods, key="goal_seek_period")
+        targets = st.text_input("Target value(s), comma separated", default_target, key="goal_seek_targets")
+        # Keyed by assumption so the defaults follow the selected assumption
+        current = 3.0 * float(assumptions[assumption]) or 1.0
+        low = st.number_input("Lower bound", value=min(0.0, current), key=f"goal_seek_low_{assumption}")
+        high = st.number_input("Upper bound", value=max(0.0, current), key=f"goal_seek_high_{assumption}")
+
+    if not enabled:
+        return None
+    return {
+        "assumption": assumption,
+        "metric": metric,
+        "period": period,
+        "targets": targets,
+        "low": low,
+        "high": high,
+    }
+
+def display_goal_seek(assumptions, historical_data, periods, goal_seek, frequency="annual"):
+    try:
+        targets = [float(value) for value in goal_seek["targets"].split(",") if value.strip()]
+    except ValueError:
+        st.error("Goal seek targets must be numbers separated by commas.")
+        return
+
+    solver = GoalSeek(assumptions, historical_data, periods, frequency)
+    year = solver.engine.years[goal_seek["period"] - 1]
+    result = solver.solve(
+        goal_seek["assumption"],
+        goal_seek["metric"],
+        year,
+        targets,
+        goal_seek["low"],
+        goal_seek["high"],
+    )
+
+    st.subheader(f"Goal Seek - {goal_seek['metric']} {year}")
+    st.dataframe(
+        pd.DataFrame(
+            {
+                "Target": targets,
+                goal_seek["assumption"]: result.solution,
+                "Residual": result.residual,
+                "Converged": result.converged,
+            }
+        )
+    )
+    if not result.converged.all():
+        st.warning("Some targets cannot be reached with the assumption inside the given bounds.")
+
 # Function to calculate and display the projected balance sheet
-def calculate_and_display_balance_sheets(assumptions, historical_data):
-    balance_sheets = BalanceSheetpro(assumptions, historical_data)
-    projected_balance_sheets = balance_sheets.calculate_all_line_items()
+def calculate_and_display_balance_sheets(assumptions, historical_data, periods=5, frequency="annual", day_count="actual/365"):
+    # The projection is persisted, so the model only runs on a cache miss
+    computed = {}
+
+    def project_balance_sheets():
+        computed["model"] = BalanceSheetpro(assumptions, historical_data, periods, frequency, day_count)
+        return computed["model"].calculate_all_line_items()
+
+    projected_balance_sheets = persisted_result(
+        "balance_sheet",
+        BALANCE_SHEET_VERSION,
+        assumptions,
+        historical_data,
+        project_balance_sheets,
+        periods=periods,
+        frequency=frequency,
+        day_count=day_count,
+    )
     
     st.subheader("Projected Balance Sheet:")
     st.write(projected_balance_sheets)
-    
+
+    # Show how many times each line item was computed in this run
+    with st.expander("Line Item Call Counts"):
+        if "model" in computed:
+            st.dataframe(computed["model"].call_count_report())
+        else:
+            st.write("Loaded from the result cache.")
+
     # Return the projected balance sheet
     return projected_balance_sheets
         
 def balance_sheets():
+    # Upload historical data (assuming a CSV file for simplicity) first, so
+    # the assumptions can default to drivers estimated from it
+    uploaded_file = st.file_uploader("Upload Historical Data (CSV, Parquet or Arrow)", type=["csv", "parquet", "arrow"])
+    historical_data = None
+    if uploaded_file is not None:
+        try:
+            loader = HistoricalLoader(uploaded_file)
+            if loader.multi_entity or loader.layout == "long" or loader.format in COLUMNAR:
+                # Multi-company, long-layout and columnar files are streamed in
+                # chunks and only the selected company is kept
+                entity = st.selectbox("Company", loader.entities()) if loader.multi_entity else None
+                with measure("Home.load_historical_data"):
+                    historical_data = loader.load(entity)
+            else:
+                with measure("Home.load_historical_data"):
+                    historical_data = read_uploaded_csv(uploaded_file)
+        except (KeyError, ValueError) as e:
+            # Missing columns or values that are not numbers
+            st.error(f"Invalid historical data: {e}")
+            return
+
     # Input assumptions
     st.sidebar.header("Assumptions", divider='rainbow')
-    days_inventory = st.sidebar.slider("Days Inventory", min_value=1, max_value=365, value=30)
-    days_accounts_receivable = st.sidebar.slider("Days Accounts Receivable", min_value=1, max_value=365, value=30)
+    drivers = estimated_drivers(historical_data)
+    days_inventory = st.sidebar.slider("Days Inventory", min_value=1, max_value=365, value=estimated(drivers, "Days Inventory", 30, 1, 365))
+    days_accounts_receivable = st.sidebar.slider("Days Accounts Receivable", min_value=1, max_value=365, value=estimated(drivers, "Days Accounts Receivable", 30, 1, 365))
     
     # Use text input for assumptions that are strings
-    other_current_assets = st.sidebar.text_input("Other Current Assets", "Default Value")
-    other_assets = st.sidebar.text_input("Other Assets", "Default Value")
-    days_payable = st.sidebar.slider("Days Payable", min_value=1, max_value=365, value=30)
-    accrued_liabilities_percentage = st.sidebar.slider("Accrued Liabilities as % of COGS", min_value=0.0, max_value=100.0, value=5.0)
-    other_current_liabilities_percentage = st.sidebar.slider("Other Current Liabilities as % of COGS", min_value=0.0, max_value=100.0, value=5.0)
-    other_liabilities = st.sidebar.slider("Other Liabilities", min_value=0.0, max_value=100.0, value=5.0)
-    common_stock = st.sidebar.slider("Common Stock", min_value=0.0, max_value=100.0, value=5.0)
+    other_current_assets = st.sidebar.text_input("Other Current Assets", estimated(drivers, "Other Current Assets", "Default Value"))
+    other_assets = st.sidebar.text_input("Other Assets", estimated(drivers, "Other Assets", "Default Value"))
+    days_payable = st.sidebar.slider("Days Payable", min_value=1, max_value=365, value=estimated(drivers, "Days Payable", 30, 1, 365))
+    accrued_liabilities_percentage = st.sidebar.slider("Accrued Liabilities as % of COGS", min_value=0.0, max_value=100.0, value=estimated(drivers, "Accrued Liabilities as % of COGS", 5.0, 0.0, 100.0))
+    other_current_liabilities_percentage = st.sidebar.slider("Other Current Liabilities as % of COGS", min_value=0.0, max_value=100.0, value=estimated(drivers, "Other Current Liabilities as % of COGS", 5.0, 0.0, 100.0))
+    other_liabilities = st.sidebar.slider("Other Liabilities", min_value=0.0, max_value=100.0, value=estimated(drivers, "Other Liabilities", 5.0, 0.0, 100.0))
+    common_stock = st.sidebar.slider("Common Stock", min_value=0.0, max_value=100.0, value=estimated(drivers, "Common Stock", 5.0, 0.0, 100.0))
 
 
 
@@ -193,33 +443,96 @@ def balance_sheets():
         # Add other assumptions as needed...
     }
     
-    
-    
+    # Projection horizon and granularity
+    periods = st.sidebar.number_input("Projection Periods", min_value=1, max_value=600, value=BalanceSheetpro.projection_years)
+    frequency = st.sidebar.selectbox("Period Granularity", list(FREQUENCIES))
+    day_count = st.sidebar.selectbox("Day Count", DAY_COUNTS)
 
+    with st.sidebar:
+        goal_seek = goal_seek_inputs(assumptions, historical_data, BALANCE_SHEET_LINE_ITEMS, periods, frequency, "800")
+        workspace = scenario_workspace("balance_sheet_workspace", BALANCE_SHEET_LINE_ITEMS)
+        scenario_name = workspace_inputs(workspace)
 
-    # Upload historical data (assuming a CSV file for simplicity)
-    uploaded_file = st.file_uploader("Upload Historical Data (CSV)", type=["csv"])
-    if uploaded_file is not None:
-        historical_data = pd.read_csv(uploaded_file)
+
+    if historical_data is not None:
         st.subheader("Historical Data:")
         st.write(historical_data)
 
         # Calculate and display the projected balance sheet
-        calculate_and_display_balance_sheets(assumptions, historical_data)
-        # Calculate and display the projected balance sheet
-        projected_balance_sheet = calculate_and_display_balance_sheets(assumptions, historical_data)
+        projected_balance_sheet = calculate_and_display_balance_sheets(assumptions, historical_data, periods, frequency, day_count)
+
+        # Keep the projection for the CashFlow page
+        st.session_state["projected_balance_sheet"] = projected_balance_sheet
+        st.session_state["balance_sheet_historical_data"] = historical_data
+        st.session_state["balance_sheet_data_digest"] = frame_digest(historical_data)
         
-        # Add download button
-        st.download_button(
-            label="Download Projected Balance Sheet",
-            data=projected_balance_sheet.to_csv(index=False).encode(),
-            file_name='projected_balance_sheets.csv',
-            key='download_projected_balance_sheet'
+        # Add download buttons
+        download_buttons(
+            "Projected Balance Sheet",
+            projected_balance_sheet,
+            BALANCE_SHEET_FORMULAS,
+            assumptions,
+            "projected_balance_sheets",
+            "download_projected_balance_sheet",
         )
 
+        if scenario_name:
+            save_scenario(workspace, scenario_name, assumptions, projected_balance_sheet, historical_data)
+        display_workspace(workspace)
+
+        if goal_seek:
+            display_goal_seek(assumptions, historical_data, periods, goal_seek, frequency)
+
         
 
         
+def Cashflow():
+    st.header("Projected Cash Flow Statement")
+    st.divider()
+
+    # The cash flow statement is derived from the projections the other pages
+    # already computed, which are kept in the session instead of recomputed
+    if (
+        "projected_income_statement" not in st.session_state
+        or "projected_balance_sheet" not in st.session_state
+    ):
+        st.info(
+            "Calculate the IncomeStatement and BalanceSheetpro pages first; "
+            "the cash flow statement is derived from their projections."
+        )
+        return
+
+    projected_income_statement = st.session_state["projected_income_statement"]
+    projected_balance_sheet = st.session_state["projected_balance_sheet"]
+    historical_data = st.session_state["balance_sheet_historical_data"]
+
+    # Both projections must come from the same history and cover the same
+    # periods, or the cash flow would mix one company's income with another's
+    # balance sheet
+    if st.session_state.get("income_statement_data_digest") != st.session_state.get("balance_sheet_data_digest"):
+        st.info(
+            "The income statement and the balance sheet were projected from different historical data; "
+            "upload the data the IncomeStatement page uses (historical_data.csv) on the BalanceSheetpro page."
+        )
+        return
+    label = projected_income_statement.columns[0]
+    if label != projected_balance_sheet.columns[0] or list(projected_income_statement[label]) != list(
+        projected_balance_sheet[label]
+    ):
+        st.info("Project the income statement and the balance sheet over the same periods and granularity.")
+        return
+
+    cash_flow = CashFlowStatement(
+        projected_income_statement, projected_balance_sheet, historical_data.iloc[-1]
+    ).calculate_all_line_items()
+    st.dataframe(cash_flow.set_index(label).T)
+
+    with st.expander("Validation Against Historical Cash Flows"):
+        try:
+            st.dataframe(validate_against_historical(historical_data))
+        except KeyError as e:
+            st.warning(f"The historical data has no cash flow column {e}.")
+
 def home():
     
     st.sidebar.header("Home Section", divider='rainbow')
@@ -283,8 +596,247 @@ def home():
     st.write("This is the Home Page.")
     # Add specific content related to the Home Page here
 
+def monte_carlo_inputs():
+    # Standard deviations of the sampled drivers; the point assumptions are the means
+    with st.expander("Monte Carlo Simulation"):
+        enabled = st.checkbox("Run simulation")
+        paths = st.number_input("Paths", min_value=1000, max_value=1000000, value=100000, step=1000)
+        seed = st.number_input("Seed", min_value=0, value=0)
+        line_item = st.selectbox("Fan chart line item", LINE_ITEMS, index=len(LINE_ITEMS) - 1)
+        std_devs = {
+            driver: st.number_input(f"{driver} std dev", min_value=0.0, value=0.01, format="%.4f")
+            for driver in DRIVERS
+        }
+
+    if not enabled:
+        return None
+    return {"paths": paths, "seed": seed, "line_item": line_item, "std_devs": std_devs}
+
+def display_monte_carlo(assumptions, historical_data, periods, simulation):
+    distributions = {
+        driver: ("normal", assumptions[driver], std_dev)
+        for driver, std_dev in simulation["std_devs"].items()
+        if std_dev > 0
+    }
+    result = cached_result(
+        "monte_carlo",
+        assumptions,
+        historical_data,
+        lambda: MonteCarloSimulation(
+            assumptions, distributions, historical_data, periods, seed=simulation["seed"]
+        ).run(simulation["paths"]),
+        periods=periods,
+        distributions=distributions,
+        seed=simulation["seed"],
+        paths=simulation["paths"],
+    )
+
+    st.subheader(f"Monte Carlo Simulation - {result.paths:,} paths")
+    band = result.band_frame(simulation["line_item"])
+
+    # Fan chart: P5-P95 band around the median
+    base = alt.Chart(band).encode(x=alt.X("Year:O"))
+    fan = base.mark_area(opacity=0.3).encode(
+        y=alt.Y("P5:Q", title=simulation["line_item"]), y2="P95:Q"
+    )
+    median = base.mark_line().encode(y="P50:Q")
+    st.altair_chart(fan + median, width="stretch")
+
+    with st.expander("Percentile Bands"):
+        st.dataframe(result.to_frame())
+
+def sensitivity_inputs(periods):
+    with st.expander("Sensitivity Analysis"):
+        enabled = st.checkbox("Run sensitivity analysis")
+        step = st.number_input("Perturbation (+/- %)", min_value=0.1, max_value=100.0, value=10.0)
+        zero_step = st.number_input(
+            "Perturbation of zero-valued assumptions (+/-)", min_value=0.0, value=0.01, format="%.4f"
+        )
+        metric = st.selectbox("Tornado line item", METRICS)
+        period = st.number_input("Tornado projected year", min_value=1, max_value=periods, value=1)
+
+    if not enabled:
+        return None
+    return {"step": step / 100, "zero_step": zero_step, "metric": metric, "period": period}
+
+def display_sensitivity(assumptions, historical_data, periods, sensitivity):
+    result = cached_result(
+        "sensitivity",
+        assumptions,
+        historical_data,
+        lambda: SensitivityAnalysis(
+            assumptions, historical_data, periods, step=sensitivity["step"], zero_step=sensitivity["zero_step"]
+        ).run(),
+        periods=periods,
+        step=sensitivity["step"],
+        zero_step=sensitivity["zero_step"],
+    )
+    year = result.years[sensitivity["period"] - 1]
+    tornado = result.tornado_frame(sensitivity["metric"], year)
+    # Assumptions the projection does not read move nothing; list them
+    # instead of charting empty bars
+    unmoved = tornado["Swing"] == 0
+    unmoved_assumptions = list(tornado.loc[unmoved, "Assumption"])
+    tornado = tornado[~unmoved]
+
+    st.subheader(f"Sensitivity Analysis - {sensitivity['metric']} {year}")
+    bars = tornado.melt(
+        id_vars=["Assumption", "Swing"],
+        value_vars=["Low Impact", "High Impact"],
+        var_name="Case",
+        value_name="Impact",
+    )
+    chart = alt.Chart(bars).mark_bar().encode(
+        x=alt.X("Impact:Q"),
+        y=alt.Y("Assumption:N", sort=list(tornado["Assumption"])),
+        color="Case:N",
+    )
+    st.altair_chart(chart, width="stretch")
+    if unmoved_assumptions:
+        st.caption(f"No impact on {sensitivity['metric']} (not charted): {', '.join(unmoved_assumptions)}")
+
+    with st.expander("Sensitivity Table"):
+        st.dataframe(result.to_frame())
+
+def three_statement_inputs():
+    with st.expander("Three-Statement Model"):
+        enabled = st.checkbox("Run linked three-statement model")
+        tol = st.number_input("Interest convergence tolerance", min_value=1e-12, value=1e-8, format="%.1e")
+        max_iter = st.number_input("Maximum iterations", min_value=1, max_value=500, value=50)
+
+    if not enabled:
+        return None
+    return {"tol": tol, "max_iter": max_iter}
+
+def display_three_statement_model(assumptions, historical_data, periods, three_statement):
+    model = ThreeStatementModel(
+        historical_data, periods, tol=three_statement["tol"], max_iter=three_statement["max_iter"]
+    )
+    result = cached_result(
+        "three_statement",
+        assumptions,
+        historical_data,
+        lambda: model.run(pd.DataFrame([assumptions])),
+        periods=periods,
+        tol=three_statement["tol"],
+        max_iter=three_statement["max_iter"],
+    )
+
+    st.header("Linked Three-Statement Model")
+    for title, line_items in [
+        ("Income Statement", INCOME_STATEMENT),
+        ("Balance Sheet", BALANCE_SHEET),
+        ("Cash Flow Statement", CASH_FLOW),
+    ]:
+        st.subheader(title)
+        st.dataframe(result.scenario_frame(0, line_items).set_index("Year").T)
+
+    # Debt schedule behind the linked model
+    debt = DebtSchedule.from_historical(historical_data, periods).run(
+        pd.DataFrame([assumptions]), result.line("Cash Flow Before Revolver")
+    )
+    with st.expander("Debt Schedule"):
+        for tranche in TRANCHES:
+            st.text(tranche)
+            st.dataframe(debt.tranche_frame(tranche).set_index("Period"))
+
+    report = result.convergence_report()
+    st.caption(
+        f"Interest circularity: {report['Iterations'].iloc[0]} iterations, "
+        f"residual {report['Residual'].iloc[0]:.2e}"
+    )
+    if not report["Converged"].iloc[0]:
+        st.warning("The interest calculation did not converge within the iteration cap.")
+
+def valuation_inputs():
+    # WACC, terminal growth and exit multiple ranges of the sensitivity grid
+    with st.expander("DCF Valuation"):
+        enabled = st.checkbox("Run DCF valuation")
+        wacc = st.slider("WACC range", min_value=0.0, max_value=0.3, value=(0.06, 0.12), step=0.005)
+        growth = st.slider("Terminal growth range", min_value=-0.05, max_value=0.1, value=(0.0, 0.04), step=0.0025)
+        multiple = st.slider("Exit multiple range", min_value=0.0, max_value=30.0, value=(6.0, 12.0), step=0.5)
+        steps = st.number_input("Grid steps per input", min_value=2, max_value=100, value=7)
+        measure_name = st.selectbox("Table measure", VALUATION_MEASURES, index=len(VALUATION_MEASURES) - 1)
+        mid_period = st.checkbox("Mid-period discounting")
+
+    if not enabled:
+        return None
+    return {
+        "wacc": np.linspace(*wacc, steps),
+        "growth": np.linspace(*growth, steps),
+        "multiple": np.linspace(*multiple, steps),
+        "measure": measure_name,
+        "mid_period": mid_period,
+    }
+
+def display_valuation(assumptions, historical_data, periods, valuation):
+    # Free cash flow from the linked three-statement model; both sensitivity
+    # grids are valued in one broadcast each
+    result = cached_result(
+        "three_statement",
+        assumptions,
+        historical_data,
+        lambda: ThreeStatementModel(historical_data, periods).run(pd.DataFrame([assumptions])),
+        periods=periods,
+        tol=1e-8,
+        max_iter=50,
+    )
+    dcf = DCFValuation.from_three_statement(result, net_debt(historical_data), valuation["mid_period"])
+
+    st.header("DCF Valuation")
+    free_cash_flow = pd.DataFrame(
+        dcf.free_cash_flow, index=["Unlevered Free Cash Flow"], columns=result.years
+    )
+    st.dataframe(free_cash_flow)
+    st.caption(f"Net debt bridging enterprise to equity value: {dcf.net_debt[0]:,.2f}")
+
+    measure_name = valuation["measure"]
+    st.subheader(f"{measure_name} - WACC x Terminal Growth")
+    st.dataframe(dcf.sensitivity_table(valuation["wacc"], valuation["growth"], measure_name))
+    st.subheader(f"{measure_name} - WACC x Exit Multiple")
+    st.dataframe(
+        dcf.sensitivity_table(valuation["wacc"], valuation["multiple"], measure_name, method="Exit Multiple")
+    )
+
+def project_income_statement(assumptions, historical_data, periods, frequency):
+    # The projection is persisted across sessions and restarts; on a miss the
+    # model kept for the session only recomputes the lines reading a changed
+    # input. Returns the projection and the model, None when it was cached.
+    computed = {}
+
+    def project():
+        income_statement_obj = st.session_state.get("income_statement_model")
+        if (
+            income_statement_obj is None
+            or income_statement_obj.periods != periods
+            or income_statement_obj.frequency != frequency
+        ):
+            income_statement_obj = IncomeStatement(assumptions, historical_data, periods, frequency)
+            st.session_state["income_statement_model"] = income_statement_obj
+        else:
+            income_statement_obj.update(dict(assumptions), historical_data)
+        computed["model"] = income_statement_obj
+        return income_statement_obj.calculate_all_line_items()
+
+    projection = persisted_result(
+        "income_statement",
+        INCOME_STATEMENT_VERSION,
+        assumptions,
+        historical_data,
+        project,
+        periods=periods,
+        frequency=frequency,
+    )
+    return projection, computed.get("model")
+
 def income_statement():
     st.sidebar.header("Assumptions", divider='rainbow')
+    try:
+        with measure("Home.load_historical_data"):
+            historical_data = read_historical("historical_data.csv")
+    except FileNotFoundError:
+        historical_data = None
+    drivers = estimated_drivers(historical_data)
     # Assumptions inputs
     assumptions = {}  # Initialize the assumptions dictionary
     
@@ -295,34 +847,34 @@ def income_statement():
         # ... (complete the assumption inputs)
         # Column 1
         col1.text("Revenue Growth Rate")
-        assumptions["Revenue Growth Rate"] = col1.number_input("rev_growth", min_value=0.0, value=0.05)
+        assumptions["Revenue Growth Rate"] = col1.number_input("rev_growth", min_value=0.0, value=estimated(drivers, "Revenue Growth Rate", 0.05, 0.0))
 
         col1.text("Depreciation as % of Gross PP&E")
-        assumptions["Depreciation as % of Gross PP&E"] = col1.number_input("depreciation", min_value=0.0, value=0.02)
+        assumptions["Depreciation as % of Gross PP&E"] = col1.number_input("depreciation", min_value=0.0, value=estimated(drivers, "Depreciation as % of Gross PP&E", 0.02, 0.0))
 
         col1.text("SG&A as % of Sales")
-        assumptions["SG&A as % of Sales"] = col1.number_input("sga_sales", min_value=0.0, value=0.2)
+        assumptions["SG&A as % of Sales"] = col1.number_input("sga_sales", min_value=0.0, value=estimated(drivers, "SG&A as % of Sales", 0.2, 0.0))
 
         col1.text("Other Income / (Expense)")
         assumptions["Other Income / (Expense)"] = col1.number_input("other_income", min_value=0.0, value=0.0)
 
         col1.text("Days Accounts Receivable")
-        assumptions["Days Accounts Receivable"] = col1.number_input("days_ar", min_value=0, value=30)
+        assumptions["Days Accounts Receivable"] = col1.number_input("days_ar", min_value=0, value=estimated(drivers, "Days Accounts Receivable", 30, 0))
 
         col1.text("Other Current Assets")
-        assumptions["Other Current Assets"] = col1.number_input("other_current_assets", min_value=0, value=1)
+        assumptions["Other Current Assets"] = col1.number_input("other_current_assets", min_value=0, value=estimated(drivers, "Other Current Assets", 1, 0))
 
         col1.text("Capex as % of sales")
-        assumptions["Capex as % of sales"] = col1.number_input("capex_percent", min_value=0.0, value=0.05)
+        assumptions["Capex as % of sales"] = col1.number_input("capex_percent", min_value=0.0, value=estimated(drivers, "Capex as % of sales", 0.05, 0.0))
 
         col1.text("Days Payable")
-        assumptions["Days Payable"] = col1.number_input("days_payable", min_value=0, value=50)
+        assumptions["Days Payable"] = col1.number_input("days_payable", min_value=0, value=estimated(drivers, "Days Payable", 50, 0))
 
         col1.text("Other Current Liabilities as % of COGS")
-        assumptions["Other Current Liabilities as % of COGS"] = col1.number_input("other_liabilities_cogs", min_value=0.0, value=0.02)
+        assumptions["Other Current Liabilities as % of COGS"] = col1.number_input("other_liabilities_cogs", min_value=0.0, value=estimated(drivers, "Other Current Liabilities as % of COGS", 0.02, 0.0))
 
         col1.text("Common Stock")
-        assumptions["Common Stock"] = col1.number_input("common_stock", min_value=0, value=10)
+        assumptions["Common Stock"] = col1.number_input("common_stock", min_value=0, value=estimated(drivers, "Common Stock", 10, 0))
 
         col1.text("Revolver")
         assumptions["Revolver"] = col1.number_input("revolver", min_value=0.0, value=0.03)
@@ -335,22 +887,22 @@ def income_statement():
 
         # Column 2
         col2.text("COGS as % of Revenue")
-        assumptions["COGS as % of Revenue"] = col2.number_input("cogs_percent", min_value=0.0, value=0.4)
+        assumptions["COGS as % of Revenue"] = col2.number_input("cogs_percent", min_value=0.0, value=estimated(drivers, "COGS as % of Revenue", 0.4, 0.0))
 
         col2.text("Amortization")
         assumptions["Amortization"] = col2.number_input("amortization", min_value=0.0, value=0.0)
 
         col2.text("LIBOR")
-        assumptions["LIBOR"] = col2.number_input("libor", min_value=0.0, max_value=1.0, value=0.01)
+        assumptions["LIBOR"] = col2.number_input("libor", min_value=0.0, max_value=1.0, value=estimated(drivers, "LIBOR", 0.01, 0.0, 1.0))
 
         col2.text("Tax Rate")
-        assumptions["Tax Rate"] = col2.number_input("tax_rate", min_value=0.0, max_value=1.0, value=0.4)
+        assumptions["Tax Rate"] = col2.number_input("tax_rate", min_value=0.0, max_value=1.0, value=estimated(drivers, "Tax Rate", 0.4, 0.0, 1.0))
 
         col2.text("Days Inventory")
-        assumptions["Days Inventory"] = col2.number_input("days_inventory", min_value=0, value=45)
+        assumptions["Days Inventory"] = col2.number_input("days_inventory", min_value=0, value=estimated(drivers, "Days Inventory", 45, 0))
 
         col2.text("Other Assets")
-        assumptions["Other Assets"] = col2.number_input("other_assets", min_value=0, value=0)
+        assumptions["Other Assets"] = col2.number_input("other_assets", min_value=0, value=estimated(drivers, "Other Assets", 0, 0))
 
         col2.text("Asset Disposition")
         assumptions["Asset Disposition"] = col2.number_input("asset_disposition", min_value=0, value=0)
@@ -367,31 +919,95 @@ def income_statement():
         col2.text("Empty Field (Ignore)")
         assumptions["Empty Field (Ignore)"] = col2.number_input("empty_field_ignore", min_value=0, max_value=1, value=0)
 
-
+        # Projection horizon
+        periods = st.number_input("Projection Periods", min_value=5, max_value=600, value=5)
+        frequency = st.selectbox("Period Granularity", list(FREQUENCIES))
+        # The simulation, sensitivity, three-statement and valuation panels
+        # are annual-only, so they project the whole years of the horizon
+        years = max(1, periods // FREQUENCIES[frequency])
+
+        simulation = monte_carlo_inputs()
+        sensitivity = sensitivity_inputs(years)
+        goal_seek = goal_seek_inputs(assumptions, historical_data, LINE_ITEMS, periods, frequency, "60")
+        three_statement = three_statement_inputs()
+        valuation = valuation_inputs()
+        workspace = scenario_workspace("income_statement_workspace", LINE_ITEMS)
+        scenario_name = workspace_inputs(workspace)
 
         calculate_button = st.button("Calculate")
+
+    if scenario_name:
+        try:
+            with measure("Home.load_historical_data"):
+                historical_data = read_historical("historical_data.csv")
+            projection, _ = project_income_statement(assumptions, historical_data, periods, frequency)
+            save_scenario(workspace, scenario_name, assumptions, projection, historical_data)
+        except FileNotFoundError:
+            st.error("Historical data file not found. Please make sure the file exists.")
         
     if calculate_button:
         try:
             # Read historical data from CSV file
-            historical_data = pd.read_csv("historical_data.csv")
+            with measure("Home.load_historical_data"):
+                historical_data = read_historical("historical_data.csv")
 
             # Calculate Financial Statement
-            income_statement_obj = IncomeStatement(assumptions, historical_data)
-            projected_income_statement = income_statement_obj.calculate_all_line_items()
+            projected_income_statement, model = project_income_statement(
+                assumptions, historical_data, periods, frequency
+            )
 
             # Display Results
             st.subheader("Projected Financial Statement - Income Statement")
-            st.dataframe(projected_income_statement.set_index("Year"))
+            st.dataframe(projected_income_statement.set_index(projected_income_statement.columns[0]))
+            download_buttons(
+                "Projected Income Statement",
+                projected_income_statement,
+                FORMULAS,
+                assumptions,
+                "projected_income_statement",
+                "download_projected_income_statement",
+            )
+
+            with st.expander("Recomputed Line Items"):
+                if model is not None:
+                    st.write(", ".join(model.graph.recomputed) or "Nothing changed since the last run.")
+                    st.dataframe(model.call_count_report())
+                else:
+                    st.write("Loaded from the result cache.")
+
+            # Keep the projection for the CashFlow page
+            st.session_state["projected_income_statement"] = projected_income_statement
+            st.session_state["income_statement_data_digest"] = frame_digest(historical_data)
 
             # Transpose and display historical data
             st.subheader("Historical Data - Transposed")
             st.dataframe(historical_data.T)
 
+            if frequency != "annual" and (simulation or sensitivity or three_statement or valuation):
+                st.info(
+                    f"The Monte Carlo, sensitivity, three-statement and DCF panels are annual; "
+                    f"they project the {years} whole year(s) of the {periods} {frequency} periods."
+                )
+
+            if simulation:
+                display_monte_carlo(assumptions, historical_data, years, simulation)
+
+            if sensitivity:
+                display_sensitivity(assumptions, historical_data, years, sensitivity)
+
+            if goal_seek:
+                display_goal_seek(assumptions, historical_data, periods, goal_seek, frequency)
+
+            if three_statement:
+                display_three_statement_model(assumptions, historical_data, years, three_statement)
+
+            if valuation:
+                display_valuation(assumptions, historical_data, years, valuation)
+
         except FileNotFoundError:
             st.error("Historical data file not found. Please make sure the file exists.")
 
-
+    display_workspace(workspace)
         
 
 if __name__ == "__main__":
@@ -0,0 +1,108 @@
+import argparse
+import os
+import subprocess
+import sys
+
+# Computation modules that batch workers and services import. None of them
+# may pull in the UI stack, and each must import within the budget.
+CORE_MODULES = [
+    "Periods",
+    "Schema",
+    "Instrumentation",
+    "LineItemGraph",
+    "Storage",
+    "HistoricalLoader",
+    "Cache",
+    "IncomeStatement",
+    "BalanceSheet",
+    "BalanceSheetpro",
+    "CashFlowStatement",
+    "DebtSchedule",
+    "ThreeStatementModel",
+    "ScenarioEngine",
+    "ScenarioWorkspace",
+    "DriverEstimation",
+    "MonteCarlo",
+    "Sensitivity",
+    "GoalSeek",
+    "Valuation",
+    "BatchRunner",
+    "Export",
+    "Service",
+]
+
+# Modules only the Streamlit pages (Home.py and the *App.py files) may import
+UI_MODULES = ["streamlit", "streamlit_lottie", "altair", "requests"]
+
+DEFAULT_BUDGET = 1.0
+
+
+def measure(module, directory=None):
+    # Cumulative import time of `module` in seconds, from `python -X importtime`
+    # in a fresh interpreter, and the UI modules that import loaded
+    directory = directory or os.path.dirname(os.path.abspath(__file__))
+    code = f"import sys, {module}; print(','.join(name for name in {UI_MODULES!r} if name in sys.modules))"
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=directory,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    microseconds = None
+    for line in completed.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == module:
+            microseconds = int(fields[1])
+    if microseconds is None:
+        raise RuntimeError(f"python -X importtime did not report '{module}'")
+    ui_modules = [name for name in completed.stdout.strip().split(",") if name]
+    return microseconds / 1e6, ui_modules
+
+
+def check(modules=CORE_MODULES, budget=DEFAULT_BUDGET, runs=3, directory=None):
+    # One row per module; the fastest of `runs` imports is compared with the
+    # budget, so a cold disk cache on the first run does not count
+    rows = []
+    for module in modules:
+        timings = []
+        for _ in range(runs):
+            seconds, ui_modules = measure(module, directory)
+            timings.append(seconds)
+        seconds = min(timings)
+        rows.append(
+            {
+                "Module": module,
+                "Seconds": seconds,
+                "UI Modules": ui_modules,
+                "OK": seconds <= budget and not ui_modules,
+            }
+        )
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Check that the computation modules import without the UI stack and within a time budget."
+    )
+    parser.add_argument("modules", nargs="*", default=CORE_MODULES, help="modules to check (default: every core module)")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="seconds allowed per module import")
+    parser.add_argument("--runs", type=int, default=3, help="imports per module; the fastest one counts")
+    args = parser.parse_args(argv)
+
+    rows = check(args.modules, args.budget, args.runs)
+    for row in rows:
+        status = "ok" if row["OK"] else "FAIL"
+        ui_modules = f" imports {', '.join(row['UI Modules'])}" if row["UI Modules"] else ""
+        print(f"{row['Module']:<20} {row['Seconds']:.3f}s {status}{ui_modules}")
+    failed = [row["Module"] for row in rows if not row["OK"]]
+    if failed:
+        print(f"{len(failed)} module(s) over the {args.budget:.2f}s budget or importing the UI: {', '.join(failed)}")
+        return 1
+    print(f"All {len(rows)} modules import within {args.budget:.2f}s without the UI.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,287 +1,248 @@
-
-import streamlit as st
+import numpy as np
 import pandas as pd
-
+from Instrumentation import instrument_methods
+from LineItemGraph import LineItemGraph, changed_inputs
+from Periods import ProjectionPeriods, by_year
+
+# Bump whenever the projection changes, so results persisted by
+# Cache.persisted_result under an older version are not reused
+MODEL_VERSION = 1
+
+# Projected income statement lines, in the column order of calculate_all_line_items
+LINE_ITEMS = [
+    "Revenue",
+    "Cost of Goods Sold (COGS)",
+    "Gross Profit",
+    "SG&A Expenses",
+    "Operating Income",
+    "Interest Expense",
+    "Net Income",
+]
+
+# Lines that are plain arithmetic of other lines and assumptions, as
+# (formula, operands); Export writes them as live spreadsheet formulas
+FORMULAS = {
+    "Cost of Goods Sold (COGS)": ("{0}*{1}", ["Revenue", "COGS as % of Revenue"]),
+    "Gross Profit": ("{0}-{1}", ["Revenue", "Cost of Goods Sold (COGS)"]),
+    "SG&A Expenses": ("{0}*{1}", ["Revenue", "SG&A as % of Sales"]),
+    "Operating Income": ("{0}-{1}", ["Gross Profit", "SG&A Expenses"]),
+}
+
+
+def last_per_period(historical_data, column, periods):
+    # Last historical value of a flow, scaled to one period of the
+    # ProjectionPeriods `periods`
+    return historical_data[column].iloc[-1] / periods.periods_per_year
+
+
+def net_debt_per_period(historical_data, periods):
+    # Hold the last historical net debt flat past the end of the history
+    return by_year(historical_data["Total Liabilities"] - historical_data["Cash"], periods) / periods.periods_per_year
+
+
+def historical_base(historical_data, periods):
+    # Historical inputs the projection starts from
+    return (
+        last_per_period(historical_data, "Revenue", periods),
+        net_debt_per_period(historical_data, periods),
+        last_per_period(historical_data, "Other Income / (Expense)", periods),
+    )
+
+
+def revenue_path(revenue_growth, last_revenue, periods, periods_per_year=1):
+    # Revenue Growth Rate is annual and compounds per period; `revenue_growth`
+    # carries a trailing axis the periods broadcast along
+    growth = np.broadcast_to((1 + revenue_growth) ** (1 / periods_per_year), revenue_growth.shape[:-1] + (periods,))
+    revenue = last_revenue * np.cumprod(growth, axis=-1)
+    if periods_per_year > 1:
+        # Scale the per-period path so each year's periods add up to the
+        # annual projection
+        powers = growth[..., np.newaxis] ** np.arange(1, periods_per_year + 1)
+        revenue = revenue * periods_per_year * powers[..., -1] / powers.sum(axis=-1)
+    return revenue
+
+
+def project_line_items(
+    revenue_growth,
+    cogs_percent,
+    sga_percent,
+    libor,
+    tax_rate,
+    last_revenue,
+    net_debt,
+    other_income_expense,
+    periods,
+    periods_per_year=1,
+):
+    # Build every projected line in one vectorized pass. The drivers may be
+    # scalars or arrays of shape (N,), in which case N cases are projected at
+    # once. Returns an array of shape (..., periods, len(LINE_ITEMS)).
+    revenue_growth, cogs_percent, sga_percent, libor, tax_rate = (
+        np.asarray(driver, dtype=float)[..., np.newaxis]
+        for driver in (revenue_growth, cogs_percent, sga_percent, libor, tax_rate)
+    )
+
+    # Growth compounds as a cumulative product over the horizon
+    revenue = revenue_path(revenue_growth, last_revenue, periods, periods_per_year)
+    cogs = revenue * cogs_percent
+    gross_profit = revenue - cogs
+    sga_expenses = revenue * sga_percent
+    operating_income = gross_profit - sga_expenses
+    interest_expense = net_debt * libor
+    pretax_income = operating_income - interest_expense + other_income_expense
+    taxes = pretax_income * tax_rate
+    net_income = pretax_income - taxes
+
+    return np.stack(
+        np.broadcast_arrays(
+            revenue,
+            cogs,
+            gross_profit,
+            sga_expenses,
+            operating_income,
+            interest_expense,
+            net_income,
+        ),
+        axis=-1,
+    )
+
+
+@instrument_methods("calculate_")
 class IncomeStatement:
-    
-    def __init__(self, assumptions, historical_data):
+    # Single projection expressed as a LineItemGraph, so update() only
+    # recomputes the lines reading a changed assumption or historical column.
+    # Batches of scenarios go through project_line_items instead.
+
+    def __init__(self, assumptions, historical_data, periods=5, frequency="annual"):
         self.assumptions = assumptions
         self.historical_data = historical_data
-        
-    def calculate_revenue(self):
-        # Calculate revenue based on the revenue growth rate
-        revenue_growth = self.assumptions["Revenue Growth Rate"]
-        last_year_revenue = self.historical_data["Revenue"].iloc[-1]
-        projected_years = [
-            self.historical_data["Year"].iloc[-1] + i for i in range(1, 6)
-        ]
-        projected_revenue = [
-            last_year_revenue * (1 + revenue_growth) ** i for i in range(1, 6)
-        ]
-
-        return pd.DataFrame({"Year": projected_years, "Revenue": projected_revenue})
-    
-    def calculate_cogs(self):
-        # Calculate COGS based on revenue and COGS as % of Revenue
-        revenue_df = self.calculate_revenue()
-        projected_cogs = [
-            revenue_df["Revenue"].iloc[i] * self.assumptions["COGS as % of Revenue"]
-            for i in range(5)
-        ]
-        return pd.DataFrame(
-            {
-                "Year": revenue_df["Year"],
-                "Cost of Goods Sold (COGS)": projected_cogs,
-            }
-        )
-        
-    def calculate_gross_profit(self):
-        revenue = self.calculate_revenue()["Revenue"]
-        cogs = self.calculate_cogs()["Cost of Goods Sold (COGS)"]
-        gross_profit = revenue.subtract(cogs)
-
-        return pd.DataFrame(
-            {"Year": self.calculate_revenue()["Year"], "Gross Profit": gross_profit}
-        )
-        
-    def calculate_sga_expenses(self):
-        revenue = self.calculate_revenue()["Revenue"]
-        sga_expenses = revenue * self.assumptions["SG&A as % of Sales"]
-
-        return pd.DataFrame(
-            {"Year": self.calculate_revenue()["Year"], "SG&A Expenses": sga_expenses}
-        )
-        
-    def calculate_operating_income(self):
-        gross_profit = self.calculate_gross_profit()["Gross Profit"]
-        sga_expenses = self.calculate_sga_expenses()["SG&A Expenses"]
-        operating_income = gross_profit - sga_expenses
-
-        return pd.DataFrame(
-            {
-                "Year": self.calculate_revenue()["Year"],
-                "Operating Income": operating_income,
-            }
+        self.periods = periods
+        self.frequency = frequency
+        self.period_index = ProjectionPeriods(self.historical_data["Year"].iloc[-1], periods, frequency)
+        self.projected_years = self.period_index.labels
+        self.graph = self.build_graph()
+        self._projection = None
+
+    def build_graph(self):
+        graph = LineItemGraph("IncomeStatement")
+        graph.add("Revenue", self._revenue, assumptions=["Revenue Growth Rate"], columns=["Revenue"])
+        graph.add(
+            "Cost of Goods Sold (COGS)",
+            self._cogs,
+            ["Revenue"],
+            assumptions=["COGS as % of Revenue"],
         )
-        
-    def calculate_interest_expense(self):
-        net_debt = (
-            self.historical_data["Total Liabilities"] - self.historical_data["Cash"]
+        graph.add("Gross Profit", np.subtract, ["Revenue", "Cost of Goods Sold (COGS)"])
+        graph.add("SG&A Expenses", self._sga_expenses, ["Revenue"], assumptions=["SG&A as % of Sales"])
+        graph.add("Operating Income", np.subtract, ["Gross Profit", "SG&A Expenses"])
+        graph.add(
+            "Interest Expense",
+            self._interest_expense,
+            assumptions=["LIBOR"],
+            columns=["Total Liabilities", "Cash"],
         )
-        interest_expense = net_debt * self.assumptions["LIBOR"]
-
-        return pd.DataFrame(
-            {
-                "Year": self.calculate_revenue()["Year"],
-                "Interest Expense": interest_expense,
-            }
+        graph.add(
+            "Pretax Income",
+            self._pretax_income,
+            ["Operating Income", "Interest Expense"],
+            columns=["Other Income / (Expense)"],
         )
-        
-    def calculate_net_income(self):
-        operating_income = self.calculate_operating_income()["Operating Income"]
-        interest_expense = self.calculate_interest_expense()["Interest Expense"]
-        other_income_expense = self.historical_data["Other Income / (Expense)"].iloc[-1]
-        taxes = (
-            operating_income - interest_expense + other_income_expense
-        ) * self.assumptions["Tax Rate"]
-        net_income = operating_income - interest_expense + other_income_expense - taxes
-
-        return pd.DataFrame(
-            {"Year": self.calculate_revenue()["Year"], "Net Income": net_income}
+        graph.add("Taxes", self._taxes, ["Pretax Income"], assumptions=["Tax Rate"])
+        graph.add("Net Income", np.subtract, ["Pretax Income", "Taxes"])
+        return graph
+
+    def _driver(self, key):
+        # Scalar or (N,) assumption with a trailing axis for the periods
+        return np.asarray(self.assumptions[key], dtype=float)[..., np.newaxis]
+
+    # Line item nodes
+    def _revenue(self):
+        return revenue_path(
+            self._driver("Revenue Growth Rate"),
+            last_per_period(self.historical_data, "Revenue", self.period_index),
+            self.periods,
+            self.period_index.periods_per_year,
         )
-    # ... (rest of the code)
 
-    def calculate_all_line_items(self):
-        # Calculate all line items in a single DataFrame
-        projected_data = self.calculate_revenue()
+    def _cogs(self, revenue):
+        return revenue * self._driver("COGS as % of Revenue")
 
-        # Calculate COGS
-        projected_data["Cost of Goods Sold (COGS)"] = (
-            projected_data["Revenue"] * self.assumptions["COGS as % of Revenue"]
-        )
+    def _sga_expenses(self, revenue):
+        return revenue * self._driver("SG&A as % of Sales")
 
-        # Calculate Gross Profit
-        projected_data["Gross Profit"] = (
-            projected_data["Revenue"] - projected_data["Cost of Goods Sold (COGS)"]
-        )
+    def _interest_expense(self):
+        return net_debt_per_period(self.historical_data, self.period_index) * self._driver("LIBOR")
 
-        # Calculate SG&A Expenses
-        projected_data["SG&A Expenses"] = (
-            projected_data["Revenue"] * self.assumptions["SG&A as % of Sales"]
+    def _pretax_income(self, operating_income, interest_expense):
+        return (
+            operating_income
+            - interest_expense
+            + last_per_period(self.historical_data, "Other Income / (Expense)", self.period_index)
         )
 
-        # Calculate Operating Income
-        projected_data["Operating Income"] = (
-            projected_data["Gross Profit"] - projected_data["SG&A Expenses"]
-        )
+    def _taxes(self, pretax_income):
+        return pretax_income * self._driver("Tax Rate")
 
-        # Calculate Interest Expense
-        net_debt = (
-            self.historical_data["Total Liabilities"] - self.historical_data["Cash"]
-        )
-        projected_data["Interest Expense"] = net_debt * self.assumptions["LIBOR"]
-
-        # Calculate Net Income
-        other_income_expense = self.historical_data["Other Income / (Expense)"].iloc[-1]
-        taxes = (
-            projected_data["Operating Income"]
-            - projected_data["Interest Expense"]
-            + other_income_expense
-        ) * self.assumptions["Tax Rate"]
-        projected_data["Net Income"] = (
-            projected_data["Operating Income"]
-            - projected_data["Interest Expense"]
-            + other_income_expense
-            - taxes
+    def update(self, assumptions=None, historical_data=None):
+        # Switch to new inputs, dropping only the nodes that read what changed;
+        # returns the invalidated nodes
+        assumptions = self.assumptions if assumptions is None else assumptions
+        historical_data = self.historical_data if historical_data is None else historical_data
+        keys, columns = changed_inputs(self.assumptions, assumptions, self.historical_data, historical_data)
+        self.assumptions = assumptions
+        self.historical_data = historical_data
+        self._projection = None
+        if "Year" in columns:
+            # A different history moves the projected periods themselves
+            self.period_index = ProjectionPeriods(historical_data["Year"].iloc[-1], self.periods, self.frequency)
+            self.projected_years = self.period_index.labels
+            self.graph.reset()
+            return list(self.graph.nodes)
+        return self.graph.inputs_changed(keys, columns)
+
+    def project(self):
+        # Compute all line items once; the per-line methods are views over this block
+        if self._projection is None:
+            self._projection = np.stack(
+                np.broadcast_arrays(*[self.graph.evaluate(name) for name in LINE_ITEMS]),
+                axis=-1,
+            )
+        return self._projection
+
+    def call_count_report(self):
+        return self.graph.call_count_report()
+
+    def line_item(self, name):
+        return pd.DataFrame(
+            {
+                self.period_index.label: self.projected_years,
+                name: self.project()[:, LINE_ITEMS.index(name)],
+            }
         )
 
-        return projected_data
-
-
-        # ... (unchanged)
-
-def get_assumptions():
-    
-    assumptions = {}  # Initialize the assumptions dictionary
-    with st.sidebar:
-        st.subheader("Assumptions")
-        col1, col2 = st.columns(2)
-        
-        
-
-        # Column 1
-        col1.text("Revenue Growth Rate")
-        assumptions["Revenue Growth Rate"] = col1.number_input("##rev_growth", min_value=0.0, value=0.05)
-
-        col1.text("Depreciation as % of Gross PP&E")
-        assumptions["Depreciation as % of Gross PP&E"] = col1.number_input("##depreciation", min_value=0.0, value=0.02)
-
-        col1.text("SG&A as % of Sales")
-        assumptions["SG&A as % of Sales"] = col1.number_input("##sga_sales", min_value=0.0, value=0.2)
-
-        col1.text("Other Income / (Expense)")
-        assumptions["Other Income / (Expense)"] = col1.number_input("##other_income", min_value=0.0, value=0.0)
-
-        col1.text("Days Accounts Receivable")
-        assumptions["Days Accounts Receivable"] = col1.number_input("##days_ar", min_value=0, value=30)
-
-        col1.text("Other Current Assets")
-        assumptions["Other Current Assets"] = col1.number_input("##other_current_assets", min_value=0, value=1)
-
-        col1.text("Capex as % of sales")
-        assumptions["Capex as % of sales"] = col1.number_input("##capex_percent", min_value=0.0, value=0.05)
-
-        col1.text("Days Payable")
-        assumptions["Days Payable"] = col1.number_input("##days_payable", min_value=0, value=50)
-
-        col1.text("Other Current Liabilities as % of COGS")
-        assumptions["Other Current Liabilities as % of COGS"] = col1.number_input("##other_liabilities_cogs", min_value=0.0, value=0.02)
-
-        col1.text("Common Stock")
-        assumptions["Common Stock"] = col1.number_input("##common_stock", min_value=0, value=10)
-
-        col1.text("Revolver")
-        assumptions["Revolver"] = col1.number_input("##revolver", min_value=0.0, value=0.03)
-
-        col1.text("Unsecured Debt")
-        assumptions["Unsecured Debt"] = col1.number_input("##unsecured_debt", min_value=0.0, value=0.12)
-
-        col1.text("Unsecured Debt Amortization")
-        assumptions["Unsecured Debt Amortization"] = col1.number_input("##unsecured_debt_amortization", min_value=0, value=0)
-
-        # Column 2
-        col2.text("COGS as % of Revenue")
-        assumptions["COGS as % of Revenue"] = col2.number_input("##cogs_percent", min_value=0.0, value=0.4)
-
-        col2.text("Amortization")
-        assumptions["Amortization"] = col2.number_input("##amortization", min_value=0.0, value=0.0)
-
-        col2.text("LIBOR")
-        assumptions["LIBOR"] = col2.number_input("##libor", min_value=0.0, max_value=1.0, value=0.01)
-
-        col2.text("Tax Rate")
-        assumptions["Tax Rate"] = col2.number_input("##tax_rate", min_value=0.0, max_value=1.0, value=0.4)
-
-        col2.text("Days Inventory")
-        assumptions["Days Inventory"] = col2.number_input("##days_inventory", min_value=0, value=45)
-
-        col2.text("Other Assets")
-        assumptions["Other Assets"] = col2.number_input("##other_assets", min_value=0, value=0)
-
-        col2.text("Asset Disposition")
-        assumptions["Asset Disposition"] = col2.number_input("##asset_disposition", min_value=0, value=0)
-
-        col2.text("Term Loan")
-        assumptions["Term Loan"] = col2.number_input("##term_loan", min_value=0.0, value=0.035)
-
-        col2.text("Term of Amortization")
-        assumptions["Term of Amortization"] = col2.number_input("##term_amortization", min_value=0, value=20)
-
-        col2.text("Interest Earned On Cash")
-        assumptions["Interest Earned On Cash"] = col2.number_input("##interest_earned_on_cash", min_value=0.0, value=0.0063)
-
-        col2.text("Empty Field (Ignore)")
-        assumptions["Empty Field (Ignore)"] = col2.number_input("##empty_field_ignore", min_value=0, max_value=1, value=0)
-
-    
-        
-        
-
-    # ... (unchanged)
-
-    return assumptions
-
-def get_historical_data():
-    st.sidebar.subheader("Upload Historical Data")
-    uploaded_file = st.sidebar.file_uploader("Upload Historical Data (CSV)", type=["csv"])
-
-    if uploaded_file is not None:
-        try:
-            historical_data = pd.read_csv(uploaded_file)
-        except pd.errors.EmptyDataError:
-            st.error("The uploaded CSV file is empty.")
-            return pd.DataFrame()  # Return an empty DataFrame in case of an error
-    else:
-        # Use a configurable default file path or allow users to specify their default file
-        st.warning("No historical data file uploaded. Using default file.")
-        historical_data = pd.read_csv("default_historical_data.csv")
-
-    return historical_data
-
-def display_projected_income_statement(income_statement, historical_data):
-    # Display the projected data
-    projected_income_statement = income_statement.calculate_all_line_items()
-    st.header("Projected Income Statement:")
-    st.dataframe(projected_income_statement)
-
-    # Display historical data
-    transposed_data = historical_data.T
-    st.subheader("Transposed Historical Data")
-    st.dataframe(transposed_data)
-
-def main():
-    st.title("Financial Projection App")
+    def calculate_revenue(self):
+        return self.line_item("Revenue")
 
-    # Get user inputs for assumptions and historical data
-    assumptions = get_assumptions()
-    historical_data = get_historical_data()
+    def calculate_cogs(self):
+        return self.line_item("Cost of Goods Sold (COGS)")
 
-    # Check if historical_data is not empty before proceeding
-    if historical_data.empty:
-        st.warning("No historical data available or the file structure is incorrect.")
-        st.text("Please make sure the uploaded CSV file has the correct structure.")
-    else:
-        # Apply the input data
-        income_statement = IncomeStatement(assumptions, historical_data)
+    def calculate_gross_profit(self):
+        return self.line_item("Gross Profit")
 
-        # Calculate Financial Statement
-        income_statement.calculate_cogs()  # Ensure COGS is calculated first
-        income_df = income_statement.calculate_net_income()
+    def calculate_sga_expenses(self):
+        return self.line_item("SG&A Expenses")
 
-        # Display Results
-        display_projected_income_statement(income_statement, historical_data)
+    def calculate_operating_income(self):
+        return self.line_item("Operating Income")
 
+    def calculate_interest_expense(self):
+        return self.line_item("Interest Expense")
 
+    def calculate_net_income(self):
+        return self.line_item("Net Income")
 
-if __name__ == "__main__":
-    main()
+    def calculate_all_line_items(self):
+        # Calculate all line items in a single DataFrame
+        projected_data = pd.DataFrame(self.project(), columns=LINE_ITEMS)
+        projected_data.insert(0, self.period_index.label, self.projected_years)
+        return projected_data
@@ -0,0 +1,195 @@
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+import pandas as pd
+
+# Setting this environment variable to 1 turns profiling on at import, e.g.
+# for batch workers; the Streamlit sidebar can also turn it on and off
+ENVIRONMENT_VARIABLE = "FINANCIAL_STATEMENT_PROFILE"
+
+# Prefix of the OpenMetrics metric families
+METRIC_PREFIX = "financial_statement"
+
+_DISABLED = contextlib.nullcontext()
+
+
+class _Measurement:
+    # One timed call. Allocations are the peak traced memory above the level
+    # at entry; nested measurements hand their peak up to the enclosing one,
+    # since each of them resets tracemalloc's peak.
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.stack = self.profiler._stack()
+        self.tracing = tracemalloc.is_tracing()
+        if self.tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            if self.stack:
+                self.stack[-1].peak = max(self.stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+            self.start_memory = self.peak = current
+        self.stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        seconds = time.perf_counter() - self.start
+        self.stack.pop()
+        allocated = 0
+        if self.tracing and tracemalloc.is_tracing():
+            self.peak = max(self.peak, tracemalloc.get_traced_memory()[1])
+            allocated = self.peak - self.start_memory
+            if self.stack:
+                self.stack[-1].peak = max(self.stack[-1].peak, self.peak)
+        self.profiler.record(self.name, seconds, allocated)
+        return False
+
+
+class Profiler:
+    # Wall time, call count and allocated bytes per instrumented name. Off by
+    # default: a disabled profiler hands out a no-op context, so instrumented
+    # code pays one attribute check per call. Allocations are traced with
+    # tracemalloc, which slows Python allocations down while profiling is on.
+    # One instance is shared by every session the process serves.
+    def __init__(self, enabled=False):
+        self.records = {}
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._started_tracing = False
+        if enabled:
+            self.enable()
+
+    def enable(self, memory=True):
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def reset(self):
+        with self._lock:
+            self.records.clear()
+
+    def _stack(self):
+        # Open measurements of the current thread, innermost last
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def measure(self, name):
+        # Context manager timing the enclosed block under `name`
+        if not self.enabled:
+            return _DISABLED
+        return _Measurement(self, name)
+
+    def record(self, name, seconds, allocated=0):
+        with self._lock:
+            record = self.records.setdefault(
+                name, {"Calls": 0, "Seconds": 0.0, "Max Seconds": 0.0, "Allocated Bytes": 0}
+            )
+            record["Calls"] += 1
+            record["Seconds"] += seconds
+            record["Max Seconds"] = max(record["Max Seconds"], seconds)
+            record["Allocated Bytes"] += allocated
+
+    def snapshot(self):
+        # Copy of the records, slowest total first
+        with self._lock:
+            records = {name: dict(record) for name, record in self.records.items()}
+        return dict(sorted(records.items(), key=lambda item: item[1]["Seconds"], reverse=True))
+
+    def frame(self):
+        records = self.snapshot()
+        frame = pd.DataFrame.from_dict(
+            records, orient="index", columns=["Calls", "Seconds", "Max Seconds", "Allocated Bytes"]
+        )
+        frame.index.name = "Name"
+        frame.insert(2, "Mean Seconds", frame["Seconds"] / frame["Calls"])
+        return frame.reset_index()
+
+    def to_json(self):
+        return json.dumps({"enabled": self.enabled, "records": self.snapshot()}, indent=2)
+
+    def openmetrics_lines(self):
+        # One counter family per measure, with the instrumented name as the
+        # "name" label
+        records = self.snapshot()
+        families = [
+            ("calls", "Calls of an instrumented function or block.", None, "Calls"),
+            ("seconds", "Wall time spent in an instrumented function or block.", "seconds", "Seconds"),
+            ("allocated_bytes", "Peak bytes allocated by an instrumented function or block.", "bytes", "Allocated Bytes"),
+        ]
+        lines = []
+        for suffix, help_text, unit, key in families:
+            lines += metric_family(
+                f"{METRIC_PREFIX}_{suffix}",
+                "counter",
+                help_text,
+                [(f'_total{{name="{escape_label(name)}"}}', record[key]) for name, record in records.items()],
+                unit,
+            )
+        return lines
+
+    def to_openmetrics(self):
+        # OpenMetrics text exposition of every record
+        return "\n".join(self.openmetrics_lines() + ["# EOF"]) + "\n"
+
+
+def metric_family(family, kind, help_text, samples, unit=None):
+    # Lines of one OpenMetrics metric family; `samples` are (suffix and
+    # labels, value) pairs, e.g. ('_total{name="x"}', 3)
+    lines = [f"# TYPE {family} {kind}"]
+    if unit:
+        lines.append(f"# UNIT {family} {unit}")
+    lines.append(f"# HELP {family} {help_text}")
+    lines += [f"{family}{sample} {value}" for sample, value in samples]
+    return lines
+
+
+def escape_label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Process-wide profiler
+profiler = Profiler(os.environ.get(ENVIRONMENT_VARIABLE) == "1")
+
+
+def measure(name):
+    return profiler.measure(name)
+
+
+def instrumented(name):
+    # Decorator recording every call of a function under `name`
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with profiler.measure(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def instrument_methods(prefix="calculate_"):
+    # Class decorator instrumenting every method whose name starts with
+    # `prefix`, recorded as "<Class>.<method>"
+    def decorate(cls):
+        for attribute, value in list(vars(cls).items()):
+            if attribute.startswith(prefix) and callable(value):
+                setattr(cls, attribute, instrumented(f"{cls.__name__}.{attribute}")(value))
+        return cls
+
+    return decorate
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+from Instrumentation import measure
+
+
+class LineItemGraph:
+    # Explicit dependency graph of projected line items. Every node is computed
+    # at most once per graph instance and its value is shared by every total
+    # that depends on it. Nodes also record the assumption keys and historical
+    # columns they read, so a change to one input only recomputes the nodes
+    # that read it and the totals built on them. With profiling on, each
+    # node's own computation is recorded as "<name> / <line item>".
+    def __init__(self, name="LineItemGraph"):
+        self.name = name
+        self.nodes = {}
+        self.inputs = {}
+        self.dependents = {}
+        self.cache = {}
+        self.call_counts = {}
+        # Nodes computed since the last change of inputs
+        self.recomputed = []
+
+    def add(self, name, func, depends_on=(), assumptions=(), columns=()):
+        # Register a line item; `func` receives the values of `depends_on`
+        # in the same order
+        for dependency in depends_on:
+            if dependency not in self.nodes:
+                raise KeyError(f"Line item '{name}' depends on unknown line item '{dependency}'")
+        self.nodes[name] = (func, tuple(depends_on))
+        self.inputs[name] = (tuple(assumptions), tuple(columns))
+        self.dependents[name] = []
+        for dependency in depends_on:
+            self.dependents[dependency].append(name)
+        self.call_counts[name] = 0
+        return self
+
+    def evaluate(self, name):
+        if name in self.cache:
+            return self.cache[name]
+
+        func, depends_on = self.nodes[name]
+        values = [self.evaluate(dependency) for dependency in depends_on]
+        self.call_counts[name] += 1
+        self.recomputed.append(name)
+        with measure(f"{self.name} / {name}"):
+            self.cache[name] = func(*values)
+        return self.cache[name]
+
+    def evaluate_all(self):
+        return {name: self.evaluate(name) for name in self.nodes}
+
+    def assumptions_of(self, name):
+        # Assumption keys read by `name` or by any line item it is built
+        # from, in the order the line items were added
+        reached = set()
+        pending = [name]
+        while pending:
+            node = pending.pop()
+            if node not in reached:
+                reached.add(node)
+                pending.extend(self.nodes[node][1])
+        keys = []
+        for node in self.nodes:
+            if node in reached:
+                keys.extend(key for key in self.inputs[node][0] if key not in keys)
+        return keys
+
+    def invalidate(self, names):
+        # Drop the cached values of `names` and of every node built on them;
+        # returns the dropped nodes
+        stale = []
+        pending = list(names)
+        while pending:
+            name = pending.pop()
+            if name in stale:
+                continue
+            stale.append(name)
+            self.cache.pop(name, None)
+            pending.extend(self.dependents[name])
+        return stale
+
+    def inputs_changed(self, assumptions=(), columns=()):
+        # Invalidate the nodes reading any of the changed assumption keys or
+        # historical columns and start a new recomputation record
+        assumptions, columns = set(assumptions), set(columns)
+        self.recomputed = []
+        return self.invalidate(
+            [
+                name
+                for name, (node_assumptions, node_columns) in self.inputs.items()
+                if assumptions.intersection(node_assumptions) or columns.intersection(node_columns)
+            ]
+        )
+
+    def reset(self):
+        # Drop cached values and counters, e.g. before a new run
+        self.cache.clear()
+        self.call_counts = dict.fromkeys(self.nodes, 0)
+        self.recomputed = []
+
+    def call_count_report(self):
+        # Per-run report of how many times each line item was computed, what
+        # it reads and whether the last change of inputs recomputed it
+        return pd.DataFrame(
+            {
+                "Line Item": list(self.call_counts),
+                "Calls": list(self.call_counts.values()),
+                "Recomputed": [name in self.recomputed for name in self.call_counts],
+                "Depends On": [", ".join(self.nodes[name][1]) for name in self.call_counts],
+                "Assumptions": [", ".join(self.inputs[name][0]) for name in self.call_counts],
+                "Historical Columns": [", ".join(self.inputs[name][1]) for name in self.call_counts],
+            }
+        )
+
+
+def changed_inputs(old_assumptions, new_assumptions, old_data, new_data):
+    # Assumption keys and historical columns that differ between two runs
+    keys = [
+        key
+        for key in set(old_assumptions) | set(new_assumptions)
+        if key not in old_assumptions
+        or key not in new_assumptions
+        or not np.array_equal(np.asarray(old_assumptions[key]), np.asarray(new_assumptions[key]))
+    ]
+    columns = [
+        column
+        for column in set(old_data.columns) | set(new_data.columns)
+        if column not in old_data
+        or column not in new_data
+        or not old_data[column].equals(new_data[column])
+    ]
+    return keys, columns
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+from IncomeStatement import LINE_ITEMS
+from ScenarioEngine import DRIVERS, ScenarioEngine
+
+# numpy Generator methods a driver can be sampled from, e.g.
+# {"Revenue Growth Rate": ("normal", 0.05, 0.02)}
+DISTRIBUTIONS = ["normal", "uniform", "triangular", "lognormal", "beta"]
+
+
+class MonteCarloResult:
+    # Percentile bands of every projected line over all simulated paths
+    def __init__(self, bands, percentiles, years, paths):
+        self.bands = bands  # percentiles x periods x line items
+        self.percentiles = percentiles
+        self.years = years
+        self.paths = paths
+        self.line_items = LINE_ITEMS
+
+    def band_frame(self, line_item):
+        # Year plus one column per percentile, e.g. P5 / P50 / P95
+        band = pd.DataFrame({"Year": self.years})
+        for position, percentile in enumerate(self.percentiles):
+            band[f"P{percentile:g}"] = self.bands[position, :, self.line_items.index(line_item)]
+        return band
+
+    def to_frame(self):
+        return pd.concat(
+            [self.band_frame(line_item).assign(**{"Line Item": line_item}) for line_item in self.line_items],
+            ignore_index=True,
+        )
+
+
+class MonteCarloSimulation:
+    # Samples the income statement drivers instead of using point values.
+    # Paths are evaluated in seeded chunks so memory stays bounded by
+    # `max_chunk_values` however many paths are requested, and the
+    # percentiles are read from per-cell histograms accumulated over the chunks.
+    def __init__(
+        self,
+        assumptions,
+        distributions,
+        historical_data,
+        periods=5,
+        seed=0,
+        max_chunk_values=4_000_000,
+        bins=1024,
+    ):
+        for driver, (distribution, *_params) in distributions.items():
+            if driver not in DRIVERS:
+                raise KeyError(f"'{driver}' is not a simulated driver")
+            if distribution not in DISTRIBUTIONS:
+                raise ValueError(f"Unsupported distribution '{distribution}' for '{driver}'")
+
+        self.assumptions = assumptions
+        self.distributions = distributions
+        self.engine = ScenarioEngine(historical_data, periods)
+        self.seed = seed
+        self.bins = bins
+        self.chunk_paths = max(1, max_chunk_values // (periods * len(LINE_ITEMS)))
+
+    def _sample(self, rng, paths):
+        drivers = []
+        for driver in DRIVERS:
+            if driver in self.distributions:
+                distribution, *params = self.distributions[driver]
+                drivers.append(getattr(rng, distribution)(*params, size=paths))
+            else:
+                drivers.append(np.full(paths, self.assumptions[driver], dtype=float))
+        return drivers
+
+    def _chunks(self, paths):
+        # Every chunk has its own seed, so a second pass regenerates identical paths
+        for index, start in enumerate(range(0, paths, self.chunk_paths)):
+            rng = np.random.default_rng([self.seed, index])
+            yield self.engine.project(self._sample(rng, min(self.chunk_paths, paths - start)))
+
+    def run(self, paths=100_000, percentiles=(5, 50, 95)):
+        if paths < 1:
+            raise ValueError("At least one path is required.")
+        cell_shape = (self.engine.periods, len(LINE_ITEMS))
+
+        # First pass: range of every cell
+        low = np.full(cell_shape, np.inf)
+        high = np.full(cell_shape, -np.inf)
+        for values in self._chunks(paths):
+            low = np.minimum(low, values.min(axis=0))
+            high = np.maximum(high, values.max(axis=0))
+        width = np.maximum(high - low, np.finfo(float).tiny) / self.bins
+
+        # Second pass: histogram of every cell
+        offsets = np.arange(low.size).reshape(cell_shape) * self.bins
+        counts = np.zeros(low.size * self.bins, dtype=np.int64)
+        for values in self._chunks(paths):
+            bin_index = np.clip(((values - low) / width).astype(np.int64), 0, self.bins - 1)
+            counts += np.bincount((bin_index + offsets).ravel(), minlength=counts.size)
+        counts = counts.reshape(low.size, self.bins)
+
+        bands = np.stack(
+            [self._percentile(counts, low.ravel(), width.ravel(), paths, q).reshape(cell_shape) for q in percentiles]
+        )
+        return MonteCarloResult(bands, list(percentiles), self.engine.years, paths)
+
+    @staticmethod
+    def _percentile(counts, low, width, paths, percentile):
+        # Linear interpolation inside the bin holding the requested rank
+        rank = percentile / 100 * (paths - 1)
+        cumulative = np.cumsum(counts, axis=1)
+        bin_index = np.argmax(cumulative > rank, axis=1)
+        cells = np.arange(len(counts))
+        in_bin = counts[cells, bin_index]
+        before = cumulative[cells, bin_index] - in_bin
+        fraction = (rank - before + 0.5) / in_bin
+        return low + width * (bin_index + np.clip(fraction, 0, 1))
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+# Periods per year and pandas period frequency of each supported granularity
+FREQUENCIES = {"annual": 1, "quarterly": 4, "monthly": 12}
+PANDAS_FREQUENCIES = {"annual": "Y-DEC", "quarterly": "Q-DEC", "monthly": "M"}
+
+# Day-count conventions for days-based working capital: "actual/365" uses a
+# 365-day year (the historical behaviour), "actual/actual" the actual length
+# of the calendar year each period falls in
+DAY_COUNTS = ["actual/365", "actual/actual"]
+
+
+class ProjectionPeriods:
+    # Index of the projected periods following the last historical year
+    def __init__(self, last_historical_year, periods, frequency="annual"):
+        if frequency not in FREQUENCIES:
+            raise ValueError(f"Unknown frequency '{frequency}', expected one of {', '.join(FREQUENCIES)}")
+        if periods < 1:
+            raise ValueError("The projection horizon must be at least one period.")
+        self.last_historical_year = last_historical_year
+        self.periods = periods
+        self.frequency = frequency
+        self.periods_per_year = FREQUENCIES[frequency]
+        self.index = pd.period_range(
+            start=pd.Period(year=int(last_historical_year) + 1, month=1, day=1, freq=PANDAS_FREQUENCIES[frequency]),
+            periods=periods,
+        )
+
+    @property
+    def label(self):
+        # Column the periods are keyed by in projected statements
+        return "Year" if self.frequency == "annual" else "Period"
+
+    @property
+    def labels(self):
+        if self.frequency == "annual":
+            return last_year_plus(self.last_historical_year, self.periods)
+        return self.index
+
+    @property
+    def year_offset(self):
+        # 0 for periods in the first projected year, 1 for the second, ...
+        return np.arange(self.periods) // self.periods_per_year
+
+    def year_days(self, day_count="actual/365"):
+        # Length of the year the days-based ratios are expressed against
+        if day_count not in DAY_COUNTS:
+            raise ValueError(f"Unknown day count '{day_count}', expected one of {', '.join(DAY_COUNTS)}")
+        if day_count == "actual/365":
+            return np.full(self.periods, 365)
+        years = self.index.year.to_numpy()
+        return np.where((years % 4 == 0) & ((years % 100 != 0) | (years % 400 == 0)), 366, 365)
+
+
+def last_year_plus(last_year, periods):
+    return last_year + np.arange(1, periods + 1)
+
+
+def by_year(values, periods):
+    # Positional annual values spread over the periods of each projected year,
+    # holding the last value flat past the end of `values`
+    values = np.asarray(values, dtype=float)
+    years = periods.year_offset[-1] + 1
+    values = np.pad(values[:years], (0, max(0, years - len(values))), mode="edge")
+    return values[periods.year_offset]
@@ -0,0 +1,64 @@
+import pandas as pd
+from IncomeStatement import LINE_ITEMS, historical_base, project_line_items
+from Periods import ProjectionPeriods
+
+# Assumption keys the income statement projection is driven by
+DRIVERS = [
+    "Revenue Growth Rate",
+    "COGS as % of Revenue",
+    "SG&A as % of Sales",
+    "LIBOR",
+    "Tax Rate",
+]
+
+
+class ScenarioResult:
+    # Projection of N scenarios held as one N x periods x line items array
+    def __init__(self, values, scenarios, years, label="Year"):
+        self.values = values
+        self.scenarios = scenarios
+        self.years = years
+        self.label = label
+        self.line_items = LINE_ITEMS
+
+    def line(self, name):
+        # N x periods view of a single line item
+        return self.values[:, :, self.line_items.index(name)]
+
+    def scenario_frame(self, scenario):
+        # Income statement of one scenario in the IncomeStatement layout
+        position = self.scenarios.get_loc(scenario)
+        projected_data = pd.DataFrame(self.values[position], columns=self.line_items)
+        projected_data.insert(0, self.label, self.years)
+        return projected_data
+
+
+class ScenarioEngine:
+    # Evaluates many assumption sets against the same historical data with
+    # broadcasting instead of one IncomeStatement per scenario
+    def __init__(self, historical_data, periods=5, frequency="annual"):
+        self.periods = periods
+        self.period_index = ProjectionPeriods(historical_data["Year"].iloc[-1], periods, frequency)
+        self.base = historical_base(historical_data, self.period_index)
+        self.years = self.period_index.labels
+
+    def run(self, assumption_table):
+        # `assumption_table` has one row per scenario and one column per
+        # assumption key; extra columns are ignored
+        assumption_table = pd.DataFrame(assumption_table)
+        missing = [driver for driver in DRIVERS if driver not in assumption_table.columns]
+        if missing:
+            raise KeyError(f"Assumption table is missing columns: {', '.join(missing)}")
+
+        drivers = [assumption_table[driver].to_numpy(dtype=float) for driver in DRIVERS]
+        return ScenarioResult(
+            self.project(drivers), assumption_table.index, self.years, self.period_index.label
+        )
+
+    def project(self, drivers):
+        # Raw N x periods x line items projection of driver arrays given in DRIVERS order
+        return project_line_items(*drivers, *self.base, self.periods, self.period_index.periods_per_year)
+
+
+def project_scenarios(assumption_table, historical_data, periods=5, frequency="annual"):
+    return ScenarioEngine(historical_data, periods, frequency).run(assumption_table)
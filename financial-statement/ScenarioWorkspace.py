@@ -0,0 +1,143 @@
+import numpy as np
+import pandas as pd
+from Cache import frame_digest
+
+# Measures of a comparison, in the column order of its frames
+MEASURES = ["Value", "Delta", "% Change"]
+
+
+class ScenarioComparison:
+    # Saved scenarios against a base scenario. Each measure is one scenarios x
+    # periods x line items array computed by a single broadcast over the
+    # stacked projections; % Change is the delta over the absolute base value
+    # and missing where the base is zero.
+    def __init__(self, names, labels, line_items, values, base):
+        if base not in names:
+            raise KeyError(f"No saved scenario '{base}'")
+        self.names = names
+        self.labels = labels
+        self.line_items = line_items
+        self.base = base
+        self.values = values
+        base_values = values[names.index(base)]
+        self.deltas = values - base_values
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self.percent_changes = np.where(base_values != 0, self.deltas / np.abs(base_values) * 100, np.nan)
+
+    def measure(self, name):
+        return {"Value": self.values, "Delta": self.deltas, "% Change": self.percent_changes}[name]
+
+    def period_frame(self, period):
+        # Side by side for one period: line items down, measure and scenario across
+        position = list(self.labels).index(period)
+        block = np.concatenate([self.measure(name)[:, position, :].T for name in MEASURES], axis=1)
+        return pd.DataFrame(
+            block,
+            index=pd.Index(self.line_items, name="Line Item"),
+            columns=pd.MultiIndex.from_product([MEASURES, self.names], names=["Measure", "Scenario"]),
+        )
+
+    def line_frame(self, line_item, measure="Value"):
+        # One line item over the horizon: periods down, scenarios across
+        values = self.measure(measure)[:, :, self.line_items.index(line_item)]
+        return pd.DataFrame(values.T, index=pd.Index(self.labels, name="Period"), columns=self.names)
+
+    def to_frame(self):
+        # One row per scenario, period and line item
+        scenario, period, line_item = np.meshgrid(
+            np.arange(len(self.names)), np.arange(len(self.labels)), np.arange(len(self.line_items)), indexing="ij"
+        )
+        frame = {
+            "Scenario": np.array(self.names, dtype=object)[scenario.ravel()],
+            "Period": np.asarray(self.labels)[period.ravel()],
+            "Line Item": np.array(self.line_items, dtype=object)[line_item.ravel()],
+        }
+        frame.update({name: self.measure(name).ravel() for name in MEASURES})
+        return pd.DataFrame(frame)
+
+
+class ScenarioWorkspace:
+    # Named projections of one statement, e.g. base / upside / downside, saved
+    # during a session. The scenarios share one historical baseline and
+    # horizon, so each is kept as its assumptions plus one periods x line
+    # items slice of a stacked float array, which grows by doubling, instead
+    # of as a DataFrame copy.
+    def __init__(self, line_items):
+        self.line_items = list(line_items)
+        self.names = []
+        self.assumptions = []
+        self.label = None
+        self.labels = None
+        self.baseline = None
+        self._block = None
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def values(self):
+        # Saved projections as one scenarios x periods x line items view
+        if self._block is None:
+            return np.empty((0, 0, len(self.line_items)))
+        return self._block[: len(self.names)]
+
+    def save(self, name, assumptions, projection, historical_data):
+        # Save or replace the scenario `name`. `projection` is a projected
+        # statement as returned by calculate_all_line_items.
+        label = projection.columns[0]
+        labels = projection[label].to_numpy()
+        baseline = frame_digest(historical_data)
+        if self.names and (
+            baseline != self.baseline or label != self.label or not np.array_equal(labels, self.labels)
+        ):
+            raise ValueError(
+                "Saved scenarios share one historical baseline and projection horizon; "
+                "clear the workspace to save scenarios of other data or periods."
+            )
+        values = projection[self.line_items].to_numpy(dtype=float)
+        if not self.names:
+            self.label, self.labels, self.baseline = label, labels, baseline
+            self._block = np.empty((4,) + values.shape)
+
+        if name in self.names:
+            position = self.names.index(name)
+            self.assumptions[position] = dict(assumptions)
+        else:
+            position = len(self.names)
+            if position == len(self._block):
+                grown = np.empty((2 * len(self._block),) + values.shape)
+                grown[:position] = self._block
+                self._block = grown
+            self.names.append(name)
+            self.assumptions.append(dict(assumptions))
+        self._block[position] = values
+
+    def remove(self, name):
+        position = self.names.index(name)
+        self._block[position:-1] = self._block[position + 1 :].copy()
+        del self.names[position]
+        del self.assumptions[position]
+        if not self.names:
+            self.clear()
+
+    def clear(self):
+        self.__init__(self.line_items)
+
+    def assumption_frame(self):
+        # Assumptions of every scenario, one row each
+        return pd.DataFrame(self.assumptions, index=pd.Index(self.names, name="Scenario"))
+
+    def compare(self, base=None, names=None):
+        # Compare `names` (every scenario by default) with `base` (the first
+        # saved one by default) in one vectorized pass
+        if not self.names:
+            raise ValueError("No scenarios saved yet.")
+        base = self.names[0] if base is None else base
+        names = list(self.names) if names is None else list(names)
+        if base not in names:
+            names.insert(0, base)
+        missing = [name for name in names if name not in self.names]
+        if missing:
+            raise KeyError(f"No saved scenario {', '.join(map(repr, missing))}")
+        positions = [self.names.index(name) for name in names]
+        return ScenarioComparison(names, self.labels, self.line_items, self.values[positions], base)
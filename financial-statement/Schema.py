@@ -0,0 +1,100 @@
+from collections import Counter
+import numpy as np
+import pandas as pd
+
+# Historical columns the income statement and balance sheet projections read
+PROJECTION_COLUMNS = [
+    "Revenue",
+    "Cost of Goods Sold (COGS)",
+    "Other Income / (Expense)",
+    "Cash",
+    "Gross PP&E",
+    "Accumulated Depreciation",
+    "Goodwill",
+    "Total Liabilities",
+    "Retained Earnings",
+]
+REQUIRED_COLUMNS = ["Year", *PROJECTION_COLUMNS]
+
+
+def normalize_column(name):
+    # Column names compare without a byte order mark, surrounding blanks or
+    # repeated inner blanks, so "   Year" and "Year" are the same column
+    return " ".join(str(name).replace("\ufeff", "").split())
+
+
+def _parse(values):
+    # Numeric parse of a text column; the second value flags cells that hold
+    # something other than a number or a blank
+    text = values.astype("string").str.strip()
+    parsed = pd.to_numeric(text, errors="coerce")
+    invalid = parsed.isna() & text.notna() & (text != "")
+    return parsed.to_numpy(dtype=float, na_value=np.nan), invalid.to_numpy(dtype=bool)
+
+
+def validate(frame, required=REQUIRED_COLUMNS):
+    # Typed copy of raw historical data: normalized column names, "Year" as
+    # int64 and every numeric column as float64, blanks as NaN. Required
+    # columns must exist and hold only numbers or blanks; other text columns
+    # are kept as they are. The returned frame is backed by read-only arrays,
+    # so it can be shared (e.g. cached) without defensive copies.
+    columns = [normalize_column(column) for column in frame.columns]
+    duplicated = [column for column, count in Counter(columns).items() if count > 1]
+    if duplicated:
+        raise ValueError(f"The historical data repeats the column(s) {', '.join(map(repr, duplicated))}")
+    missing = [column for column in required if column not in columns]
+    if missing:
+        raise KeyError(f"The historical data has no {', '.join(map(repr, missing))} column(s)")
+
+    # Numeric columns are converted as one block; only text columns are
+    # parsed one by one
+    numeric = [position for position, dtype in enumerate(frame.dtypes) if dtype.kind in "biuf"]
+    block = np.empty((len(frame), len(columns)))
+    block[:, numeric] = frame.iloc[:, numeric].to_numpy(dtype=float)
+    text = {}
+    for position in sorted(set(range(len(columns))) - set(numeric)):
+        name, values = columns[position], frame.iloc[:, position]
+        block[:, position], invalid = _parse(values)
+        if invalid.any():
+            if name in required:
+                row = int(np.argmax(invalid))
+                raise ValueError(f"Column '{name}' has the non-numeric value {values.iloc[row]!r} in row {row + 1}")
+            text[position] = values.to_numpy(copy=True)
+
+    # "Year" and the text columns are inserted back at their positions
+    special = dict(text)
+    if "Year" in columns:
+        position = columns.index("Year")
+        years = block[:, position]
+        if position not in text:
+            if np.isnan(years).any() or (years != np.round(years)).any():
+                raise ValueError("Column 'Year' must hold a whole year in every row")
+            special[position] = years.astype(np.int64)
+    floats = [position for position in range(len(columns)) if position not in special]
+    block = np.ascontiguousarray(block[:, floats].T).T
+    block.flags.writeable = False
+    typed = pd.DataFrame(block, columns=[columns[position] for position in floats], copy=False)
+    for position in sorted(special):
+        special[position].flags.writeable = False
+        typed.insert(position, columns[position], special[position])
+    return typed
+
+
+def coerce_assumptions(assumptions):
+    # Assumptions as floats or float arrays, once per model. Text that is not
+    # a number (e.g. a "Default Value" placeholder) counts as zero, as the
+    # balance sheet totals always treated it.
+    coerced = {}
+    for key, value in assumptions.items():
+        if isinstance(value, str):
+            try:
+                value = float(value)
+            except ValueError:
+                value = 0.0
+        elif value is None:
+            value = 0.0
+        else:
+            value = np.asarray(value, dtype=float)
+            value = float(value) if value.ndim == 0 else value
+        coerced[key] = 0.0 if isinstance(value, float) and np.isnan(value) else value
+    return coerced
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+from IncomeStatement import LINE_ITEMS
+from ScenarioEngine import ScenarioEngine
+
+# Line items reported by the sensitivity analysis
+METRICS = ["Net Income", "Operating Income"]
+
+
+class SensitivityResult:
+    # Impact on each metric of moving one assumption down (Low) or up (High)
+    def __init__(self, assumptions, low_values, high_values, low_impact, high_impact, years):
+        self.assumptions = assumptions
+        self.low_values = low_values
+        self.high_values = high_values
+        self.low_impact = low_impact  # assumptions x periods x metrics
+        self.high_impact = high_impact
+        self.years = years
+
+    def to_frame(self):
+        # One row per assumption, year and metric
+        assumption, year, metric = np.meshgrid(
+            np.arange(len(self.assumptions)), np.arange(len(self.years)), np.arange(len(METRICS)), indexing="ij"
+        )
+        return pd.DataFrame(
+            {
+                "Assumption": np.array(self.assumptions, dtype=object)[assumption.ravel()],
+                "Year": self.years[year.ravel()],
+                "Line Item": np.array(METRICS, dtype=object)[metric.ravel()],
+                "Low Value": self.low_values[assumption.ravel()],
+                "High Value": self.high_values[assumption.ravel()],
+                "Low Impact": self.low_impact.ravel(),
+                "High Impact": self.high_impact.ravel(),
+            }
+        )
+
+    def tornado_frame(self, metric, year):
+        # Assumptions ordered by the size of their swing, largest first
+        period = list(self.years).index(year)
+        low = self.low_impact[:, period, METRICS.index(metric)]
+        high = self.high_impact[:, period, METRICS.index(metric)]
+        tornado = pd.DataFrame(
+            {
+                "Assumption": self.assumptions,
+                "Low Impact": low,
+                "High Impact": high,
+                "Swing": np.abs(high - low),
+            }
+        )
+        return tornado.sort_values("Swing", ascending=False, ignore_index=True)
+
+
+class SensitivityAnalysis:
+    # Perturbs every numeric assumption down and up by `step` (relative to its
+    # value) and evaluates the base case plus all 2 x N perturbed cases in one
+    # batched projection. An assumption whose value is zero has no relative
+    # step, so it moves by the absolute `zero_step` instead.
+    def __init__(self, assumptions, historical_data, periods=5, step=0.1, zero_step=0.01):
+        self.assumptions = assumptions
+        self.engine = ScenarioEngine(historical_data, periods)
+        self.step = step
+        self.zero_step = zero_step
+
+    def run(self):
+        keys = [
+            key
+            for key, value in self.assumptions.items()
+            if isinstance(value, (int, float, np.number)) and not isinstance(value, bool)
+        ]
+        base_values = np.array([self.assumptions[key] for key in keys], dtype=float)
+        zero = base_values == 0
+        low_values = np.where(zero, -self.zero_step, base_values * (1 - self.step))
+        high_values = np.where(zero, self.zero_step, base_values * (1 + self.step))
+
+        # Row 0 is the base case, rows 1..N move one assumption down and rows
+        # N+1..2N move it up
+        table = np.tile(base_values, (2 * len(keys) + 1, 1))
+        rows = np.arange(len(keys))
+        table[rows + 1, rows] = low_values
+        table[rows + 1 + len(keys), rows] = high_values
+
+        values = self.engine.run(pd.DataFrame(table, columns=keys)).values
+        metrics = values[..., [LINE_ITEMS.index(metric) for metric in METRICS]]
+        base = metrics[0]
+        return SensitivityResult(
+            keys,
+            low_values,
+            high_values,
+            metrics[1 : len(keys) + 1] - base,
+            metrics[len(keys) + 1 :] - base,
+            self.engine.years,
+        )
@@ -0,0 +1,418 @@
+import argparse
+import collections
+import hashlib
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+import pandas as pd
+from BalanceSheetpro import ASSUMPTIONS as BALANCE_SHEET_ASSUMPTIONS
+from BalanceSheetpro import BalanceSheetpro
+from Cache import LRUCache, frame_digest, read_historical
+from Instrumentation import METRIC_PREFIX, measure, metric_family, profiler
+from Periods import DAY_COUNTS, FREQUENCIES
+from ScenarioEngine import DRIVERS, ScenarioEngine
+from Schema import coerce_assumptions, validate
+
+# Statements a request can ask for, in response order
+STATEMENTS = ["Income Statement", "Balance Sheet"]
+
+# Response formats by name; Arrow responses are one IPC stream in the long
+# format of BatchRunner's columnar output
+CONTENT_TYPES = {"json": "application/json", "arrow": "application/vnd.apache.arrow.stream"}
+
+# Assumption keys each statement needs
+REQUIRED_ASSUMPTIONS = {"Income Statement": DRIVERS, "Balance Sheet": BALANCE_SHEET_ASSUMPTIONS}
+
+# Requests larger than this are refused
+MAX_BODY_BYTES = 32 << 20
+
+# Latencies kept for the percentiles
+LATENCY_WINDOW = 10_000
+
+
+class RequestError(ValueError):
+    # A request the service cannot answer, reported as HTTP 400
+    pass
+
+
+class ProjectionRequest:
+    # One parsed request. Requests with the same `group` (historical data,
+    # horizon and assumption keys) can be evaluated as one batch.
+    def __init__(self, body, data_directory):
+        if not isinstance(body, dict):
+            raise RequestError("The request body must be a JSON object")
+        self.assumptions = body.get("assumptions")
+        if not isinstance(self.assumptions, dict) or not self.assumptions:
+            raise RequestError("'assumptions' must be a non-empty object of assumption values")
+        self.periods = body.get("periods", 5)
+        if type(self.periods) is not int or not 1 <= self.periods <= 600:
+            raise RequestError("'periods' must be a whole number from 1 to 600")
+        self.frequency = body.get("frequency", "annual")
+        if self.frequency not in FREQUENCIES:
+            raise RequestError(f"'frequency' must be one of {', '.join(FREQUENCIES)}")
+        self.day_count = body.get("day_count", DAY_COUNTS[0])
+        if self.day_count not in DAY_COUNTS:
+            raise RequestError(f"'day_count' must be one of {', '.join(DAY_COUNTS)}")
+        self.statements = body.get("statements", STATEMENTS)
+        if not self.statements or any(statement not in STATEMENTS for statement in self.statements):
+            raise RequestError(f"'statements' must list some of {', '.join(STATEMENTS)}")
+        missing = [
+            key
+            for statement in STATEMENTS
+            if statement in self.statements
+            for key in REQUIRED_ASSUMPTIONS[statement]
+            if key not in self.assumptions
+        ]
+        if missing:
+            raise RequestError(f"'assumptions' is missing {', '.join(missing)}")
+        self.format = body.get("format", "json")
+        if self.format not in CONTENT_TYPES:
+            raise RequestError(f"'format' must be one of {', '.join(CONTENT_TYPES)}")
+
+        if "historical" in body:
+            # Stored historical data, by path inside the data directory
+            path = os.path.realpath(os.path.join(data_directory, str(body["historical"])))
+            if os.path.commonpath([path, os.path.realpath(data_directory)]) != os.path.realpath(data_directory):
+                raise RequestError("'historical' must name a file inside the data directory")
+            if not os.path.isfile(path):
+                raise RequestError(f"No stored historical data '{body['historical']}'")
+            stat = os.stat(path)
+            self.historical_data = read_historical(path)
+            self.data_key = ("stored", path, stat.st_mtime_ns, stat.st_size)
+        elif "historical_data" in body:
+            # Inline rows, as a list of records or a mapping of columns
+            try:
+                self.historical_data = validate(pd.DataFrame(body["historical_data"]))
+            except (KeyError, ValueError, TypeError) as e:
+                raise RequestError(f"Invalid historical data: {e}") from e
+            self.data_key = ("inline", frame_digest(self.historical_data))
+        else:
+            raise RequestError("The request needs 'historical' (a stored file) or 'historical_data' (rows)")
+        if self.historical_data.empty:
+            raise RequestError("The historical data has no rows")
+
+        self.group = (self.data_key, self.periods, self.frequency, self.day_count, tuple(sorted(self.assumptions)))
+
+
+def response_key(body, data_directory):
+    # SHA-256 of the canonical request; stored historical data adds the
+    # file's mtime and size, so an edited file is not answered from the cache
+    digest = hashlib.sha256(json.dumps(body, sort_keys=True, separators=(",", ":")).encode())
+    if isinstance(body, dict) and "historical" in body:
+        try:
+            stat = os.stat(os.path.join(data_directory, str(body["historical"])))
+            digest.update(f"{stat.st_mtime_ns}:{stat.st_size}".encode())
+        except OSError:
+            pass
+    return digest.hexdigest()
+
+
+class Statement:
+    # One projected statement of one request: a periods x line items block
+    # with its period labels. Kept as arrays rather than a DataFrame, since
+    # building a frame per request would cost more than the projection.
+    def __init__(self, label, periods, line_items, values):
+        self.label = label
+        self.periods = np.asarray(periods).tolist()
+        self.line_items = list(line_items)
+        self.values = values
+
+    def frame(self):
+        # Same layout as calculate_all_line_items
+        projected_data = pd.DataFrame(self.values, columns=self.line_items)
+        projected_data.insert(0, self.label, self.periods)
+        return projected_data
+
+    def records(self):
+        # Rows as in BatchRunner's JSON lines, missing values as None
+        values = self.values.astype(object)
+        values[np.isnan(self.values)] = None
+        columns = [self.label, *self.line_items]
+        return [dict(zip(columns, (period, *row))) for period, row in zip(self.periods, values.tolist())]
+
+
+def project_batch(requests):
+    # Statements of requests sharing one group, evaluated together: the
+    # income statement through ScenarioEngine, the balance sheet with every
+    # assumption stacked into an (N, 1) array
+    first = requests[0]
+    results = [{} for _ in requests]
+    if any("Income Statement" in request.statements for request in requests):
+        scenarios = ScenarioEngine(first.historical_data, first.periods, first.frequency).run(
+            pd.DataFrame([request.assumptions for request in requests])
+        )
+        for position, result in enumerate(results):
+            result["Income Statement"] = Statement(
+                scenarios.label, scenarios.years, scenarios.line_items, scenarios.values[position]
+            )
+    if any("Balance Sheet" in request.statements for request in requests):
+        coerced = [coerce_assumptions(request.assumptions) for request in requests]
+        stacked = {key: np.array([assumptions[key] for assumptions in coerced], dtype=float)[:, None] for key in coerced[0]}
+        balance_sheet = BalanceSheetpro(stacked, first.historical_data, first.periods, first.frequency, first.day_count)
+        values = balance_sheet.graph.evaluate_all()
+        block = np.stack(
+            [np.broadcast_to(np.asarray(value, dtype=float), (len(requests), first.periods)) for value in values.values()],
+            axis=-1,
+        )
+        for position, result in enumerate(results):
+            result["Balance Sheet"] = Statement(
+                balance_sheet.period_index.label, balance_sheet.projected_years, values, block[position]
+            )
+    return [
+        {statement: result[statement] for statement in request.statements}
+        for request, result in zip(requests, results)
+    ]
+
+
+def encode(statements, response_format):
+    # Response body for the Statements of one request
+    if response_format == "json":
+        return json.dumps({name: statement.records() for name, statement in statements.items()}, allow_nan=False).encode()
+
+    import pyarrow as pa
+
+    columns = {"Statement": [], "Period": [], "Line Item": [], "Value": []}
+    for name, statement in statements.items():
+        periods, line_items = len(statement.periods), len(statement.line_items)
+        columns["Statement"] += [name] * (periods * line_items)
+        columns["Period"] += [str(period) for period in statement.periods] * line_items
+        columns["Line Item"] += [line_item for line_item in statement.line_items for _ in range(periods)]
+        columns["Value"] += statement.values.T.ravel().tolist()
+    table = pa.table(columns)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+class Batcher:
+    # Coalesces concurrent requests: the first request of a batch waits up to
+    # `max_wait` seconds for others, then every group of the batch is
+    # evaluated at once. A failed batch is retried request by request so each
+    # error reaches the request that caused it.
+    def __init__(self, max_batch=256, max_wait=0.002):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.pending = queue.Queue()
+        self.batches = 0
+        self.batched_requests = 0
+        self._thread = threading.Thread(target=self._run, name="projection-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, request):
+        future = Future()
+        self.pending.put((request, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self.pending.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.pending.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            groups = collections.defaultdict(list)
+            for request, future in batch:
+                groups[request.group].append((request, future))
+            for group in groups.values():
+                self._evaluate(group)
+
+    def _evaluate(self, group):
+        self.batches += 1
+        self.batched_requests += len(group)
+        try:
+            with measure("Service.project_batch"):
+                results = project_batch([request for request, _ in group])
+        except Exception:
+            if len(group) > 1:
+                for item in group:
+                    self._evaluate([item])
+                return
+            group[0][1].set_exception(RequestError(f"Projection failed: {sys.exc_info()[1]!r}"))
+            return
+        for (_, future), result in zip(group, results):
+            future.set_result(result)
+
+
+class ProjectionService:
+    # Request handling shared by every connection: response cache, batcher
+    # and latency statistics
+    def __init__(self, data_directory, cache_size=1024, max_batch=256, max_wait=0.002):
+        self.data_directory = data_directory
+        self.responses = LRUCache(cache_size)
+        self.batcher = Batcher(max_batch, max_wait)
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def project(self, body):
+        # (content type, body bytes) of a projection request
+        key = response_key(body, self.data_directory)
+        cached = self.responses.get(key)
+        if cached is not None:
+            return cached
+        request = ProjectionRequest(body, self.data_directory)
+        statements = self.batcher.submit(request).result()
+        response = (CONTENT_TYPES[request.format], encode(statements, request.format))
+        self.responses.put(key, response)
+        return response
+
+    def record(self, seconds, failed=False):
+        with self._lock:
+            self.requests += 1
+            self.errors += failed
+            self.latencies.append(seconds)
+
+    def stats(self):
+        with self._lock:
+            latencies = np.array(self.latencies)
+            requests, errors = self.requests, self.errors
+        percentiles = np.percentile(latencies, [50, 90, 99]) * 1e3 if len(latencies) else [float("nan")] * 3
+        batches = self.batcher.batches
+        return {
+            "Requests": requests,
+            "Errors": errors,
+            "P50 ms": float(percentiles[0]),
+            "P90 ms": float(percentiles[1]),
+            "P99 ms": float(percentiles[2]),
+            "Max ms": float(latencies.max() * 1e3) if len(latencies) else float("nan"),
+            "Batches": batches,
+            "Mean Batch Size": self.batcher.batched_requests / batches if batches else 0.0,
+            "Cache": self.responses.stats(),
+        }
+
+    def openmetrics(self):
+        stats = self.stats()
+        lines = metric_family(f"{METRIC_PREFIX}_requests", "counter", "Projection requests served.", [("_total", stats["Requests"])])
+        lines += metric_family(f"{METRIC_PREFIX}_request_errors", "counter", "Projection requests refused or failed.", [("_total", stats["Errors"])])
+        lines += metric_family(
+            f"{METRIC_PREFIX}_request_latency_seconds",
+            "summary",
+            f"Latency of the last {LATENCY_WINDOW} projection requests.",
+            [(f'{{quantile="{quantile}"}}', stats[f"P{percentile} ms"] / 1e3) for quantile, percentile in [("0.5", 50), ("0.9", 90), ("0.99", 99)]],
+            "seconds",
+        )
+        lines += metric_family(f"{METRIC_PREFIX}_batches", "counter", "Batched evaluations run.", [("_total", stats["Batches"])])
+        lines += metric_family(
+            f"{METRIC_PREFIX}_response_cache_hits", "counter", "Requests answered from the response cache.", [("_total", stats["Cache"]["Hits"])]
+        )
+        return "\n".join(lines + profiler.openmetrics_lines() + ["# EOF"]) + "\n"
+
+
+class ProjectionHandler(BaseHTTPRequestHandler):
+    # POST /project with a JSON request; GET /stats (JSON), /metrics
+    # (OpenMetrics) and /health
+    service = None
+    quiet = True
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, "application/json", b'{"status":"ok"}')
+        elif self.path == "/stats":
+            self._send(200, "application/json", json.dumps(self.service.stats()).encode())
+        elif self.path == "/metrics":
+            self._send(200, "application/openmetrics-text; version=1.0.0; charset=utf-8", self.service.openmetrics().encode())
+        else:
+            self._error(404, f"No route {self.path}")
+
+    def do_POST(self):
+        if self.path != "/project":
+            self._error(404, f"No route {self.path}")
+            return
+        start = time.perf_counter()
+        failed = True
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            if length > MAX_BODY_BYTES:
+                self._error(413, f"The request body is larger than {MAX_BODY_BYTES} bytes")
+                return
+            try:
+                body = json.loads(self.rfile.read(length))
+            except ValueError as e:
+                raise RequestError(f"The request body is not JSON: {e}") from e
+            content_type, response = self.service.project(body)
+            self._send(200, content_type, response)
+            failed = False
+        except RequestError as e:
+            self._error(400, str(e))
+        except Exception as e:
+            self._error(500, f"{type(e).__name__}: {e}")
+        finally:
+            self.service.record(time.perf_counter() - start, failed)
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, message):
+        self._send(status, "application/json", json.dumps({"error": message}).encode())
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+
+class ProjectionServer(ThreadingHTTPServer):
+    # One thread per connection; the listen backlog is raised from the
+    # default of 5 so bursts of clients are queued instead of reset
+    daemon_threads = True
+    request_queue_size = 256
+
+
+def make_server(host="127.0.0.1", port=8000, data_directory=".", cache_size=1024, max_batch=256, max_wait=0.002, quiet=True):
+    service = ProjectionService(data_directory, cache_size, max_batch, max_wait)
+    handler = type("Handler", (ProjectionHandler,), {"service": service, "quiet": quiet})
+    return ProjectionServer((host, port), handler)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve income statement and balance sheet projections over HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--data-directory",
+        default=os.path.dirname(os.path.abspath(__file__)),
+        help="directory of stored historical data that requests can name",
+    )
+    parser.add_argument("--cache-size", type=int, default=1024, help="responses kept in the cache")
+    parser.add_argument("--max-batch", type=int, default=256, help="requests evaluated in one batch at most")
+    parser.add_argument("--max-wait-ms", type=float, default=2.0, help="time a batch waits for more requests")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+
+    server = make_server(
+        args.host,
+        args.port,
+        args.data_directory,
+        args.cache_size,
+        args.max_batch,
+        args.max_wait_ms / 1e3,
+        quiet=not args.verbose,
+    )
+    print(f"Serving projections on http://{args.host}:{server.server_port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+import hashlib
+import io
+import os
+import tempfile
+import pandas as pd
+from Schema import PROJECTION_COLUMNS, normalize_column
+
+# Storage formats by file extension. Arrow IPC files are written
+# uncompressed so reads can memory-map them instead of copying. pyarrow is
+# imported by the functions that need it, so CSV-only callers never load it.
+FORMATS = {".csv": "csv", ".parquet": "parquet", ".arrow": "arrow", ".feather": "arrow"}
+COLUMNAR = ["parquet", "arrow"]
+
+# Mode of the files written through temporary files: what open() would give
+# them under the process umask, instead of mkstemp's owner-only 0600, so
+# processes running as another user can read them
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+FILE_MODE = 0o666 & ~_UMASK
+
+
+def storage_format(path):
+    # `path` may also be a file-like object with a name, e.g. an upload
+    name = getattr(path, "name", path)
+    extension = os.path.splitext(str(name))[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Unknown storage format '{extension}', expected one of {', '.join(FORMATS)}")
+    return FORMATS[extension]
+
+
+def source_format(source):
+    # Format of a path or upload, CSV when it cannot be told from the name
+    try:
+        return storage_format(source)
+    except ValueError:
+        return "csv"
+
+
+def read_columns(source):
+    # Column names of a columnar file without reading its data
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if storage_format(source) == "parquet":
+        return list(pq.read_schema(source).names)
+    return list(pa.ipc.open_file(source).schema.names)
+
+
+def iter_batches(source, columns=None, batch_size=100_000):
+    # Frames of at most `batch_size` rows from a columnar file
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    if storage_format(source) == "parquet":
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=batch_size, columns=columns):
+            yield batch.to_pandas()
+        return
+    if isinstance(source, (str, os.PathLike)):
+        source = pa.memory_map(str(source))
+    reader = pa.ipc.open_file(source)
+    for index in range(reader.num_record_batches):
+        batch = reader.get_batch(index)
+        if columns is not None:
+            batch = batch.select(columns)
+        for offset in range(0, batch.num_rows, batch_size):
+            yield batch.slice(offset, batch_size).to_pandas()
+
+
+def write_frame(frame, path, storage=None):
+    storage = storage or storage_format(path)
+    if storage == "csv":
+        frame.to_csv(path, index=False)
+        return
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    if storage == "parquet":
+        pq.write_table(table, path)
+    else:
+        feather.write_feather(table, path, compression="uncompressed")
+
+
+def read_table(path, columns=None):
+    # Columnar file as an Arrow table, memory-mapped when `path` is a file
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+
+    memory_map = isinstance(path, (str, os.PathLike))
+    if storage_format(path) == "parquet":
+        return pq.read_table(path, columns=columns, memory_map=memory_map)
+    return feather.read_table(path, columns=columns, memory_map=memory_map)
+
+
+def read_frame(path, columns=None):
+    if storage_format(path) == "csv":
+        return pd.read_csv(path, usecols=columns)
+    return read_table(path, columns).to_pandas()
+
+
+def frame_bytes(frame, storage="parquet"):
+    # Serialized frame, e.g. for a download button
+    buffer = io.BytesIO()
+    write_frame(frame, buffer, storage)
+    return buffer.getvalue()
+
+
+def frame_from_bytes(content, storage="parquet"):
+    # Inverse of frame_bytes; the frame does not reference `content`'s file
+    if storage == "csv":
+        return pd.read_csv(io.BytesIO(content))
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    import pyarrow.parquet as pq
+
+    if storage == "parquet":
+        return pq.read_table(pa.BufferReader(content)).to_pandas()
+    return feather.read_table(pa.BufferReader(content)).to_pandas()
+
+
+def replace_file(temporary, path):
+    # Move a finished temporary file into place with FILE_MODE
+    os.chmod(temporary, FILE_MODE)
+    os.replace(temporary, path)
+
+
+def sidecar_path(path, stat, directory):
+    # Arrow copy of a CSV file in `directory`, named after the file's path,
+    # mtime and size, so an edited file never reuses an older copy
+    key = f"{os.path.abspath(path)}:{stat.st_mtime_ns}:{stat.st_size}"
+    return os.path.join(directory, f"{hashlib.sha256(key.encode()).hexdigest()}.arrow")
+
+
+def read_historical(path, columns=None, sidecar_directory=None):
+    # Historical data from CSV, Parquet or Arrow. With a `sidecar_directory`
+    # (e.g. the disk cache's), the first read of a CSV file writes an Arrow
+    # copy there and later reads memory-map that copy for as long as the
+    # CSV's mtime and size are unchanged. Nothing is written next to the CSV.
+    if storage_format(path) != "csv":
+        return read_frame(path, columns)
+    if not sidecar_directory:
+        frame = pd.read_csv(path)
+        return frame[columns] if columns is not None else frame
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    stat = os.stat(path)
+    signature = f"{stat.st_mtime_ns}:{stat.st_size}".encode()
+    sidecar = sidecar_path(path, stat, sidecar_directory)
+    try:
+        table = feather.read_table(sidecar, memory_map=True)
+        if (table.schema.metadata or {}).get(b"source") == signature:
+            try:
+                # Mark the copy as recently used for the cache's eviction
+                os.utime(sidecar)
+            except OSError:
+                pass
+            return (table.select(columns) if columns is not None else table).to_pandas()
+    except (OSError, pa.ArrowException):
+        pass
+
+    frame = pd.read_csv(path)
+    temporary = None
+    try:
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), b"source": signature})
+        # Written to a temporary file and renamed into place, so concurrent
+        # readers or an interrupted write never see a truncated copy
+        os.makedirs(sidecar_directory, exist_ok=True)
+        descriptor, temporary = tempfile.mkstemp(dir=sidecar_directory, suffix=".tmp")
+        os.close(descriptor)
+        feather.write_feather(table, temporary, compression="uncompressed")
+        replace_file(temporary, sidecar)
+    except (OSError, pa.ArrowException):
+        # Read-only location or columns Arrow cannot type: keep working from the CSV
+        if temporary is not None and os.path.exists(temporary):
+            os.remove(temporary)
+    return frame[columns] if columns is not None else frame
+
+
+# Types of the columns convert_csv does not infer: the projection inputs and
+# the long layout's values are numbers, its line items and the default entity
+# column are text, however the first block of the file happens to look
+CONVERT_FLOAT_COLUMNS = [*PROJECTION_COLUMNS, "Value"]
+CONVERT_TEXT_COLUMNS = ["Company", "Line Item"]
+
+
+def convert_csv(csv_path, path, block_size=64 << 20, column_types=None):
+    # Stream a CSV into a columnar file batch by batch, so files larger than
+    # memory can be converted once and memory-mapped afterwards. Arrow infers
+    # a column's type from the first block only, so the known columns get
+    # explicit types (plus any `column_types` of raw column name -> Arrow
+    # type), and a column blank or integer-only in the first block cannot
+    # fail on floats or text further down.
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+
+    types = {}
+    for column in pd.read_csv(csv_path, nrows=0).columns:
+        if normalize_column(column) in CONVERT_FLOAT_COLUMNS:
+            types[column] = pa.float64()
+        elif normalize_column(column) in CONVERT_TEXT_COLUMNS:
+            types[column] = pa.string()
+    types.update(column_types or {})
+    reader = pa_csv.open_csv(
+        csv_path,
+        read_options=pa_csv.ReadOptions(block_size=block_size),
+        convert_options=pa_csv.ConvertOptions(column_types=types),
+    )
+    if storage_format(path) == "parquet":
+        writer = pq.ParquetWriter(path, reader.schema)
+    else:
+        writer = pa.ipc.new_file(path, reader.schema)
+    with writer:
+        for batch in reader:
+            writer.write_batch(batch)
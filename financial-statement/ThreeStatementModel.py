@@ -0,0 +1,333 @@
+import numpy as np
+import pandas as pd
+from DebtSchedule import REVOLVER, TERM_LOAN, TRANCHES, UNSECURED_DEBT, DebtSchedule
+
+# Assumption keys used by the linked model with the value used when a
+# scenario table has no such column (the Income Statement sidebar defaults)
+DEFAULTS = {
+    "Revenue Growth Rate": 0.05,
+    "COGS as % of Revenue": 0.4,
+    "SG&A as % of Sales": 0.2,
+    "Depreciation as % of Gross PP&E": 0.02,
+    "Amortization": 0.0,
+    "Other Income / (Expense)": 0.0,
+    "Tax Rate": 0.4,
+    "LIBOR": 0.01,
+    "Revolver": 0.03,
+    "Term Loan": 0.035,
+    "Unsecured Debt": 0.12,
+    "Interest Earned On Cash": 0.0063,
+    "Term of Amortization": 20,
+    "Unsecured Debt Amortization": 0,
+    "Days Accounts Receivable": 30,
+    "Days Inventory": 45,
+    "Days Payable": 50,
+    "Accrued Liabilities as % of COGS": 0.0,
+    "Other Current Liabilities as % of COGS": 0.02,
+    "Other Current Assets": 1,
+    "Other Assets": 0,
+    "Capex as % of sales": 0.05,
+    "Asset Disposition": 0,
+    "Common Stock": 10,
+}
+
+INCOME_STATEMENT = [
+    "Revenue",
+    "Cost of Goods Sold (COGS)",
+    "Gross Profit",
+    "SG&A Expenses",
+    "Depreciation",
+    "Amortization",
+    "Operating Income / EBIT",
+    "Interest Expense",
+    "Interest Income",
+    "Other Income / (Expense)",
+    "Pretax Income",
+    "Taxes",
+    "Net Income",
+]
+BALANCE_SHEET = [
+    "Cash",
+    "Accounts Receivable",
+    "Inventory",
+    "Other Current Assets",
+    "Total Current Assets",
+    "Gross PP&E",
+    "Accumulated Depreciation",
+    "Net PP&E",
+    "Goodwill",
+    "Other Assets",
+    "Total Assets",
+    "Accounts Payable",
+    "Accrued Liabilities",
+    "Other Current Liabilities",
+    "Total Current Liabilities",
+    "Revolving Credit Facility",
+    "Term Loan",
+    "Unsecured Debt",
+    "Other Liabilities",
+    "Total Liabilities",
+    "Retained Earnings",
+    "Common Stock",
+    "Total Shareholders Equity",
+    "Total Liabilities and Equity",
+]
+CASH_FLOW = [
+    "Cash Flow from Operations",
+    "Capital Expenditures",
+    "Asset Dispositions",
+    "Cash Flow from Investing",
+    "Scheduled Debt Repayment",
+    "(Paydown) / Drawdown",
+    "Cash Flow from Financing",
+    "Net Cash Flow",
+    "Cash Flow Before Revolver",
+    "Balance Check",
+]
+LINE_ITEMS = INCOME_STATEMENT + BALANCE_SHEET + CASH_FLOW
+
+# Closing balances of the last historical year the projection opens from
+OPENING_BALANCES = [
+    "Revenue",
+    "Cash",
+    "Total Current Assets",
+    "Total Current Liabilities",
+    "Gross PP&E",
+    "Accumulated Depreciation",
+    "Goodwill",
+    "Other Assets",
+    "Revolving Credit Facility",
+    "Term Loan",
+    "Unsecured Debt",
+    "Other Liabilities",
+    "Retained Earnings",
+    "Common Stock",
+]
+
+
+class ThreeStatementResult:
+    def __init__(self, values, scenarios, years, iterations, residuals, converged):
+        self.values = values  # scenarios x periods x line items
+        self.scenarios = scenarios
+        self.years = years
+        self.iterations = iterations  # iterations each scenario needed
+        self.residuals = residuals  # final residual of each scenario
+        self.converged = converged
+        self.line_items = LINE_ITEMS
+
+    def line(self, name):
+        return self.values[:, :, self.line_items.index(name)]
+
+    def scenario_frame(self, scenario, line_items=None):
+        position = self.scenarios.get_loc(scenario)
+        line_items = line_items or self.line_items
+        columns = [self.line_items.index(name) for name in line_items]
+        projected_data = pd.DataFrame(self.values[position][:, columns], columns=line_items)
+        projected_data.insert(0, "Year", self.years)
+        return projected_data
+
+    def convergence_report(self):
+        return pd.DataFrame(
+            {
+                "Iterations": self.iterations,
+                "Residual": self.residuals,
+                "Converged": self.converged,
+            },
+            index=self.scenarios,
+        )
+
+
+class ThreeStatementModel:
+    # Linked income statement, balance sheet and cash flow statement in which
+    # interest depends on average debt and cash balances and the revolver is
+    # the plug. The interest circularity is solved by fixed-point iteration
+    # on the whole scenarios x periods block at once.
+    def __init__(self, historical_data, periods=5, tol=1e-8, max_iter=50):
+        if periods < 1:
+            raise ValueError("The projection horizon must be at least one period.")
+        if max_iter < 1:
+            raise ValueError("At least one iteration is required.")
+        self.periods = periods
+        self.tol = tol
+        self.max_iter = max_iter
+        last_year = historical_data.iloc[-1]
+        self.opening = {name: float(np.nan_to_num(last_year[name])) for name in OPENING_BALANCES}
+        self.years = historical_data["Year"].iloc[-1] + np.arange(1, periods + 1)
+
+    def _drivers(self, assumption_table):
+        drivers = {}
+        for key, default in DEFAULTS.items():
+            if key in assumption_table.columns:
+                values = pd.to_numeric(assumption_table[key], errors="coerce").fillna(default)
+                drivers[key] = values.to_numpy(dtype=float)[:, np.newaxis]
+            else:
+                drivers[key] = np.full((len(assumption_table), 1), float(default))
+        return drivers
+
+    def run(self, assumption_table):
+        assumption_table = pd.DataFrame(assumption_table)
+        d = self._drivers(assumption_table)
+        opening = self.opening
+        shape = (len(assumption_table), self.periods)
+
+        # Operating lines do not depend on interest
+        revenue = opening["Revenue"] * np.cumprod(np.broadcast_to(1 + d["Revenue Growth Rate"], shape), axis=1)
+        cogs = revenue * d["COGS as % of Revenue"]
+        gross_profit = revenue - cogs
+        sga = revenue * d["SG&A as % of Sales"]
+        capex = revenue * d["Capex as % of sales"]
+        disposition = np.broadcast_to(d["Asset Disposition"], shape)
+        gross_ppe = opening["Gross PP&E"] + np.cumsum(capex - disposition, axis=1)
+        opening_gross_ppe = np.concatenate([np.full((shape[0], 1), opening["Gross PP&E"]), gross_ppe[:, :-1]], axis=1)
+        depreciation = opening_gross_ppe * d["Depreciation as % of Gross PP&E"]
+        amortization = np.broadcast_to(d["Amortization"], shape)
+        ebit = gross_profit - sga - depreciation - amortization
+        other_income = np.broadcast_to(d["Other Income / (Expense)"], shape)
+
+        accumulated_depreciation = opening["Accumulated Depreciation"] + np.cumsum(depreciation, axis=1)
+        net_ppe = gross_ppe - accumulated_depreciation
+        goodwill = opening["Goodwill"] - np.cumsum(amortization, axis=1)
+        other_assets = np.broadcast_to(d["Other Assets"], shape)
+
+        # Working capital
+        receivables = revenue / 365 * d["Days Accounts Receivable"]
+        inventory = cogs / 365 * d["Days Inventory"]
+        other_current_assets = np.broadcast_to(d["Other Current Assets"], shape)
+        payables = cogs / 365 * d["Days Payable"]
+        accrued = cogs * d["Accrued Liabilities as % of COGS"]
+        other_current_liabilities = cogs * d["Other Current Liabilities as % of COGS"]
+        working_capital = (receivables + inventory + other_current_assets) - (
+            payables + accrued + other_current_liabilities
+        )
+        opening_working_capital = (opening["Total Current Assets"] - opening["Cash"]) - opening[
+            "Total Current Liabilities"
+        ]
+        change_in_working_capital = np.diff(working_capital, axis=1, prepend=opening_working_capital)
+
+        # The term loan and unsecured debt do not depend on cash, so their
+        # schedule is computed once
+        debt_schedule = DebtSchedule(
+            {tranche: opening[tranche] for tranche in TRANCHES}, self.periods, opening_cash=opening["Cash"]
+        )
+        scheduled = debt_schedule.schedule(d)
+        term_loan = scheduled.ending[:, :, TERM_LOAN]
+        unsecured_debt = scheduled.ending[:, :, UNSECURED_DEBT]
+        scheduled_repayment = scheduled.amortization.sum(axis=-1)
+        common_stock = np.broadcast_to(d["Common Stock"], shape)
+        stock_issued = np.diff(common_stock, axis=1, prepend=opening["Common Stock"])
+        change_in_other_assets = np.diff(other_assets, axis=1, prepend=opening["Other Assets"])
+
+        cash_flow_from_investing = -capex + disposition - change_in_other_assets
+
+        def statements(interest_expense, interest_income):
+            pretax_income = ebit - interest_expense + interest_income + other_income
+            taxes = pretax_income * d["Tax Rate"]
+            net_income = pretax_income - taxes
+            cash_flow_from_operations = net_income + depreciation + amortization - change_in_working_capital
+            cash_flow_before_revolver = (
+                cash_flow_from_operations + cash_flow_from_investing - scheduled_repayment + stock_issued
+            )
+            return pretax_income, taxes, net_income, cash_flow_from_operations, cash_flow_before_revolver
+
+        # Start from interest on opening balances and iterate to the fixed point
+        interest_expense = scheduled.total_interest()
+        interest_income = np.broadcast_to(d["Interest Earned On Cash"] * opening["Cash"], shape)
+        iterations = np.zeros(shape[0], dtype=int)
+        converged = np.zeros(shape[0], dtype=bool)
+        for iteration in range(1, self.max_iter + 1):
+            (
+                pretax_income,
+                taxes,
+                net_income,
+                cash_flow_from_operations,
+                cash_flow_before_revolver,
+            ) = statements(interest_expense, interest_income)
+
+            # The revolver is drawn only when cash net of the revolver turns negative
+            debt = debt_schedule.schedule(d, cash_flow_before_revolver)
+            cash = debt.cash
+            revolver = debt.ending[:, :, REVOLVER]
+
+            new_interest_expense = debt.total_interest()
+            new_interest_income = d["Interest Earned On Cash"] * average(opening["Cash"], cash)
+            residuals = np.max(
+                np.abs(new_interest_expense - interest_expense) + np.abs(new_interest_income - interest_income),
+                axis=1,
+            )
+            iterations = np.where(converged, iterations, iteration)
+            converged = residuals <= self.tol
+            if converged.all() or iteration == self.max_iter:
+                break
+            interest_expense, interest_income = new_interest_expense, new_interest_income
+
+        drawdown = debt.drawdown[:, :, REVOLVER]
+        cash_flow_from_financing = -scheduled_repayment + drawdown + stock_issued
+
+        retained_earnings = opening["Retained Earnings"] + np.cumsum(net_income, axis=1)
+        total_current_assets = cash + receivables + inventory + other_current_assets
+        total_assets = total_current_assets + net_ppe + goodwill + other_assets
+        total_current_liabilities = payables + accrued + other_current_liabilities
+        other_liabilities = np.full(shape, opening["Other Liabilities"])
+        total_liabilities = total_current_liabilities + revolver + term_loan + unsecured_debt + other_liabilities
+        total_equity = retained_earnings + common_stock
+        total_liabilities_and_equity = total_liabilities + total_equity
+
+        lines = {
+            "Revenue": revenue,
+            "Cost of Goods Sold (COGS)": cogs,
+            "Gross Profit": gross_profit,
+            "SG&A Expenses": sga,
+            "Depreciation": depreciation,
+            "Amortization": amortization,
+            "Operating Income / EBIT": ebit,
+            "Interest Expense": interest_expense,
+            "Interest Income": interest_income,
+            "Other Income / (Expense)": other_income,
+            "Pretax Income": pretax_income,
+            "Taxes": taxes,
+            "Net Income": net_income,
+            "Cash": cash,
+            "Accounts Receivable": receivables,
+            "Inventory": inventory,
+            "Other Current Assets": other_current_assets,
+            "Total Current Assets": total_current_assets,
+            "Gross PP&E": gross_ppe,
+            "Accumulated Depreciation": accumulated_depreciation,
+            "Net PP&E": net_ppe,
+            "Goodwill": goodwill,
+            "Other Assets": other_assets,
+            "Total Assets": total_assets,
+            "Accounts Payable": payables,
+            "Accrued Liabilities": accrued,
+            "Other Current Liabilities": other_current_liabilities,
+            "Total Current Liabilities": total_current_liabilities,
+            "Revolving Credit Facility": revolver,
+            "Term Loan": term_loan,
+            "Unsecured Debt": unsecured_debt,
+            "Other Liabilities": other_liabilities,
+            "Total Liabilities": total_liabilities,
+            "Retained Earnings": retained_earnings,
+            "Common Stock": common_stock,
+            "Total Shareholders Equity": total_equity,
+            "Total Liabilities and Equity": total_liabilities_and_equity,
+            "Cash Flow from Operations": cash_flow_from_operations,
+            "Capital Expenditures": -capex,
+            "Asset Dispositions": disposition,
+            "Cash Flow from Investing": cash_flow_from_investing,
+            "Scheduled Debt Repayment": -scheduled_repayment,
+            "(Paydown) / Drawdown": drawdown,
+            "Cash Flow from Financing": cash_flow_from_financing,
+            "Net Cash Flow": cash_flow_from_operations + cash_flow_from_investing + cash_flow_from_financing,
+            "Cash Flow Before Revolver": cash_flow_before_revolver,
+            "Balance Check": total_assets - total_liabilities_and_equity,
+        }
+        values = np.stack([np.broadcast_to(lines[name], shape) for name in LINE_ITEMS], axis=-1)
+        return ThreeStatementResult(values, assumption_table.index, self.years, iterations, residuals, converged)
+
+
+def average(opening, closing):
+    # Average of each period's opening and closing balance
+    closing = np.asarray(closing, dtype=float)
+    opening = np.broadcast_to(opening, closing.shape[:-1] + (1,))
+    previous = np.concatenate([opening, closing[..., :-1]], axis=-1)
+    return (previous + closing) / 2
@@ -0,0 +1,186 @@
+import numpy as np
+import pandas as pd
+from CashFlowStatement import DEBT
+
+# Outputs of a valuation, in the column order of ValuationResult.to_frame
+MEASURES = ["PV of Cash Flows", "Terminal Value", "PV of Terminal Value", "Enterprise Value", "Equity Value"]
+
+# Terminal value methods with the input each is evaluated over
+TERMINAL_METHODS = {"Gordon Growth": "Terminal Growth", "Exit Multiple": "Exit Multiple"}
+
+
+def net_debt(historical_data):
+    # Debt less cash at the last historical year, the bridge from enterprise
+    # to equity value
+    last_year = historical_data.iloc[-1]
+    debt = sum(float(np.nan_to_num(last_year.get(name, 0.0))) for name in DEBT)
+    return debt - float(np.nan_to_num(last_year.get("Cash", 0.0)))
+
+
+def _line(statement, name):
+    if name not in statement:
+        return 0.0
+    return np.asarray(statement[name], dtype=float)
+
+
+class ValuationResult:
+    # Valuation of every scenario at every WACC and terminal input; each
+    # measure is one scenarios x WACC x terminal input array
+    def __init__(self, method, scenarios, wacc, terminal, measures):
+        self.method = method
+        self.scenarios = scenarios
+        self.wacc = wacc
+        self.terminal = terminal
+        self.measures = measures
+
+    def measure(self, name):
+        return self.measures[name]
+
+    def table(self, measure="Equity Value", scenario=0):
+        # The classic sensitivity table of one scenario: WACC down, terminal
+        # growth (or exit multiple) across
+        position = self.scenarios.get_loc(scenario)
+        return pd.DataFrame(
+            self.measures[measure][position],
+            index=pd.Index(self.wacc, name="WACC"),
+            columns=pd.Index(self.terminal, name=TERMINAL_METHODS[self.method]),
+        )
+
+    def to_frame(self):
+        # One row per scenario, WACC and terminal input
+        scenario, wacc, terminal = np.meshgrid(
+            np.arange(len(self.scenarios)), np.arange(len(self.wacc)), np.arange(len(self.terminal)), indexing="ij"
+        )
+        frame = {
+            "Scenario": np.asarray(self.scenarios)[scenario.ravel()],
+            "WACC": self.wacc[wacc.ravel()],
+            TERMINAL_METHODS[self.method]: self.terminal[terminal.ravel()],
+        }
+        frame.update({name: self.measures[name].ravel() for name in MEASURES})
+        return pd.DataFrame(frame)
+
+
+class DCFValuation:
+    # Discounted cash flow valuation of one projection or a batch of
+    # scenarios. Unlevered free cash flow is NOPAT plus depreciation and
+    # amortization, the cash effect of working capital and capital
+    # expenditures (signed as in CashFlowStatement). It is discounted at an
+    # annual WACC and a terminal value is added at the end of the horizon,
+    # either by growing the last annualized free cash flow (Gordon growth)
+    # or as a multiple of the last annualized EBITDA.
+    #
+    # The statements may be DataFrames or mappings of line item -> array with
+    # periods on the last axis, as for CashFlowStatement. `tax_rate` and
+    # `net_debt` are scalars or one value per scenario. A whole grid of WACC
+    # and terminal inputs for every scenario is valued with broadcasting:
+    # the cash flows are discounted by one matrix product with the WACC x
+    # periods discount factors, and nothing is re-projected per cell.
+    def __init__(
+        self,
+        income_statement,
+        cash_flow,
+        tax_rate,
+        net_debt=0.0,
+        scenarios=None,
+        periods_per_year=1,
+        mid_period=False,
+    ):
+        d_and_a = _line(cash_flow, "Depreciation and Amortization")
+        if "Operating Income / EBIT" in income_statement:
+            ebit = _line(income_statement, "Operating Income / EBIT")
+            ebitda = ebit + d_and_a
+        elif "Operating Income" in income_statement:
+            # IncomeStatement's operating income is gross profit less SG&A,
+            # i.e. before depreciation and amortization
+            ebitda = _line(income_statement, "Operating Income")
+            ebit = ebitda - d_and_a
+        else:
+            raise KeyError("The income statement has no 'Operating Income / EBIT' or 'Operating Income' line")
+
+        tax_rate = np.asarray(tax_rate, dtype=float)
+        if tax_rate.ndim == 1:
+            tax_rate = tax_rate[:, np.newaxis]
+        free_cash_flow = (
+            ebit * (1 - tax_rate)
+            + d_and_a
+            + _line(cash_flow, "Change in Working Capital")
+            + _line(cash_flow, "Capital Expenditures")
+        )
+        self.free_cash_flow = np.atleast_2d(free_cash_flow)  # scenarios x periods
+        self.ebitda = np.broadcast_to(np.atleast_2d(ebitda), self.free_cash_flow.shape)
+        count, self.periods = self.free_cash_flow.shape
+        self.net_debt = np.broadcast_to(np.asarray(net_debt, dtype=float), (count,))
+        self.scenarios = pd.RangeIndex(count) if scenarios is None else pd.Index(scenarios)
+        self.periods_per_year = periods_per_year
+        self.mid_period = mid_period
+
+    @classmethod
+    def from_three_statement(cls, result, net_debt=0.0, mid_period=False):
+        # Valuation of a ThreeStatementResult batch, taxed at each scenario's
+        # effective rate
+        line = result.line
+        d_and_a = line("Depreciation") + line("Amortization")
+        cash_flow = {
+            "Depreciation and Amortization": d_and_a,
+            "Change in Working Capital": line("Cash Flow from Operations") - line("Net Income") - d_and_a,
+            "Capital Expenditures": line("Capital Expenditures") + line("Asset Dispositions"),
+        }
+        pretax_income = line("Pretax Income")
+        with np.errstate(divide="ignore", invalid="ignore"):
+            tax_rate = np.where(pretax_income != 0, line("Taxes") / pretax_income, 0.0)
+        return cls(
+            {"Operating Income / EBIT": line("Operating Income / EBIT")},
+            cash_flow,
+            tax_rate,
+            net_debt,
+            result.scenarios,
+            mid_period=mid_period,
+        )
+
+    def discount_factors(self, wacc):
+        # WACC x periods factors at each period's end, or its middle with
+        # `mid_period`
+        periods = np.arange(1, self.periods + 1) - (0.5 if self.mid_period else 0.0)
+        return (1 + np.asarray(wacc, dtype=float)[:, np.newaxis]) ** (-periods / self.periods_per_year)
+
+    def gordon_growth(self, wacc, growth):
+        # Terminal value growing the last annualized free cash flow at each
+        # terminal growth rate; missing where WACC does not exceed growth
+        wacc, growth = np.atleast_1d(np.asarray(wacc, dtype=float)), np.atleast_1d(np.asarray(growth, dtype=float))
+        last = self.free_cash_flow[:, -1, np.newaxis, np.newaxis] * self.periods_per_year
+        spread = wacc[:, np.newaxis] - growth[np.newaxis, :]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            terminal_value = np.where(spread > 0, last * (1 + growth) / spread, np.nan)
+        return self._value("Gordon Growth", wacc, growth, terminal_value)
+
+    def exit_multiple(self, wacc, multiple):
+        # Terminal value as each multiple of the last annualized EBITDA
+        wacc, multiple = np.atleast_1d(np.asarray(wacc, dtype=float)), np.atleast_1d(np.asarray(multiple, dtype=float))
+        last = self.ebitda[:, -1, np.newaxis, np.newaxis] * self.periods_per_year
+        terminal_value = np.broadcast_to(last * multiple, (len(self.scenarios), len(wacc), len(multiple)))
+        return self._value("Exit Multiple", wacc, multiple, terminal_value)
+
+    def value(self, wacc, terminal, method="Gordon Growth"):
+        if method == "Gordon Growth":
+            return self.gordon_growth(wacc, terminal)
+        if method == "Exit Multiple":
+            return self.exit_multiple(wacc, terminal)
+        raise ValueError(f"Unknown terminal value method '{method}'; use one of {', '.join(TERMINAL_METHODS)}")
+
+    def sensitivity_table(self, wacc, terminal, measure="Equity Value", scenario=0, method="Gordon Growth"):
+        # WACC x terminal growth (or exit multiple) table of one scenario
+        return self.value(wacc, terminal, method).table(measure, scenario)
+
+    def _value(self, method, wacc, terminal, terminal_value):
+        shape = terminal_value.shape
+        pv_cash_flows = self.free_cash_flow @ self.discount_factors(wacc).T  # scenarios x WACC
+        pv_terminal_value = terminal_value * ((1 + wacc) ** (-self.periods / self.periods_per_year))[:, np.newaxis]
+        enterprise_value = pv_cash_flows[:, :, np.newaxis] + pv_terminal_value
+        measures = {
+            "PV of Cash Flows": np.broadcast_to(pv_cash_flows[:, :, np.newaxis], shape),
+            "Terminal Value": terminal_value,
+            "PV of Terminal Value": pv_terminal_value,
+            "Enterprise Value": enterprise_value,
+            "Equity Value": enterprise_value - self.net_debt[:, np.newaxis, np.newaxis],
+        }
+        return ValuationResult(method, self.scenarios, wacc, terminal, measures)